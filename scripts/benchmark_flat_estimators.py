@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+"""
+Script to benchmark the flat level estimators used by the autoflat loop.
+
+Writes a simulated full size flat field, or uses an existing FITS file, then times each estimator
+and compares its clipped mean with that of astropy.stats.sigma_clipped_stats on every pixel.
+"""
+import os
+import argparse
+import tempfile
+import timeit
+
+import numpy as np
+from astropy.io import fits
+
+from huntsman.pocs.utils.flats import frame_stats
+
+# Estimator name & keyword arguments to benchmark
+estimator_kwargs = [("sigma_clip", {}),
+                    ("histogram", {"stride": 1}),
+                    ("histogram", {"stride": 2}),
+                    ("histogram", {"stride": 4}),
+                    ("histogram", {"stride": 8}),
+                    ("histogram", {"stride": 4, "roi": 0.5})]
+
+
+def make_flat(filename, shape, level, seed=42):
+    """Write a simulated flat field with a gradient, Poisson noise & some saturated pixels."""
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(0.9, 1.1, shape[1])[np.newaxis, :]
+    data = rng.poisson(level * gradient, size=shape).astype(np.uint16)
+    data[rng.integers(0, shape[0], 1000), rng.integers(0, shape[1], 1000)] = 2**16 - 1
+    fits.PrimaryHDU(data).writeto(filename, overwrite=True)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--filename", help="FITS file to use instead of a simulated flat")
+    parser.add_argument("--shape", help="shape of the simulated flat", type=int, nargs=2,
+                        default=(3672, 5496))
+    parser.add_argument("--level", help="mean counts of the simulated flat", type=float,
+                        default=11000)
+    parser.add_argument("--bias", help="bias level", type=float, default=32)
+    parser.add_argument("--number", help="number of times to run each estimator", type=int,
+                        default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        filename = args.filename
+        if filename is None:
+            filename = os.path.join(temp_dir, "flat.fits")
+            make_flat(filename, args.shape, args.level)
+
+        reference = frame_stats(filename, bias=args.bias)["mean"]
+        print(f"sigma_clipped_stats mean: {reference:.2f}")
+        for estimator, kwargs in estimator_kwargs:
+            result = frame_stats(filename, bias=args.bias, estimator=estimator, **kwargs)
+            seconds = timeit.timeit(
+                lambda: frame_stats(filename, bias=args.bias, estimator=estimator, **kwargs),
+                number=args.number) / args.number
+            error = result["mean"] - reference
+            print(f"{estimator:<12} {str(kwargs):<28} {1000 * seconds:9.1f} ms"
+                  f"   mean {result['mean']:9.2f}   error {error:+8.2f}"
+                  f" ({100 * error / reference:+.3f}%)")
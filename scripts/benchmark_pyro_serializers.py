@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+"""
+Script to benchmark the custom Pyro serializers for astropy Quantities.
+
+Times the compact Quantity encoding against the YAML encoding used for other astropy objects. With
+--remote it also times calls to the Pyro test server (scripts/pyro_test_server.py), which must be
+running along with the name server.
+"""
+import argparse
+import timeit
+
+import Pyro4
+from astropy import units as u
+
+from huntsman.pocs.utils.pyro import serializers
+
+
+def time_it(name, function, number):
+    seconds = timeit.timeit(function, number=number)
+    print(f"{name:<40} {1e6 * seconds / number:10.1f} us per call")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--number", help="number of calls to time", type=int, default=10000)
+    parser.add_argument("--remote", help="also time calls to the Pyro test server",
+                        action="store_true")
+    args = parser.parse_args()
+
+    quantity = 42 * u.km * u.ng / u.Ms
+    compact = serializers.quantity_to_dict(quantity)
+    yaml = serializers.astropy_to_dict(quantity)
+
+    time_it("compact encode", lambda: serializers.quantity_to_dict(quantity), args.number)
+    time_it("yaml encode", lambda: serializers.astropy_to_dict(quantity), args.number)
+    time_it("compact decode", lambda: serializers.dict_to_quantity(None, compact), args.number)
+    time_it("yaml decode", lambda: serializers.dict_to_astropy(None, yaml), args.number)
+
+    if args.remote:
+        with Pyro4.Proxy("PYRONAME:test_server") as proxy:
+            time_it("TestServer.quantity_argument", lambda: proxy.quantity_argument(quantity),
+                    args.number)
+            time_it("TestServer.quantity_return", proxy.quantity_return, args.number)
@@ -19,7 +19,7 @@ POCS_STARTUP = ["from pocs.mount import create_mount_from_config",
                 "from pocs.scheduler import create_scheduler_from_config",
                 "from huntsman.pocs.camera import create_cameras_from_config",
                 "from huntsman.pocs.observatory import HuntsmanObservatory",
-                "from pocs.core import POCS",
+                "from huntsman.pocs.core import create_pocs",
                 "from huntsman.pocs.utils import load_config",
                 "config = load_config",
                 "cameras = create_cameras_from_config",
@@ -29,7 +29,7 @@ POCS_STARTUP = ["from pocs.mount import create_mount_from_config",
                 "observatory = HuntsmanObservatory(cameras=cameras, "
                 "mount=mount, scheduler=scheduler, with_autoguider=True,"
                 " take_flats=True",
-                "pocs = POCS(observatory, simulator=['power','weather']",
+                "pocs = create_pocs(observatory, simulator=['power','weather']",
                 # Uncomment the following lines for automatic running
                 "#pocs.initialize()",
                 "#pocs.run()"]
@@ -0,0 +1,19 @@
+#!/usr/bin/env python
+"""
+Script to run the image receiver. This must be running on the main control computer if any of the
+distributed cameras stream their images instead of writing them over SSHFS, i.e. if their device
+config has `image_transfer: {mode: stream}`. The image receiver should be started before the
+camera servers.
+"""
+import argparse
+
+from huntsman.pocs.utils.transfer import run_image_receiver
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--images_dir", help="directory to write the received images to")
+    parser.add_argument("--host", help="hostname or IP address to bind the receiver on",
+                        default='')
+    parser.add_argument("--port", help="port number to bind the receiver on", type=int)
+    args = parser.parse_args()
+    run_image_receiver(args.images_dir, args.host, args.port)
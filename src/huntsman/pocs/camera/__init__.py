@@ -1,4 +1,9 @@
+import math
+import time
 from collections import OrderedDict
+from concurrent.futures import Future, wait, FIRST_COMPLETED
+from functools import partial
+from threading import BoundedSemaphore, Thread
 
 import Pyro4
 
@@ -126,7 +131,11 @@ def create_cameras_from_config(config=None, logger=None, **kwargs):
 def create_distributed_cameras(camera_info, logger=None):
     """Create distributed camera object(s) based on detected cameras and config
 
-    Creates a `pocs.camera.pyro.Camera` object for each distributed camera detected.
+    Creates a `pocs.camera.pyro.Camera` object for each distributed camera detected. The cameras
+    are created concurrently, up to `max_parallel_init` at a time. Any camera that fails to
+    initialise, or takes longer than `init_timeout` seconds, is left out. Cameras are created in
+    daemon threads, so a camera that hangs is abandoned rather than blocking interpreter exit. If
+    a camera that timed out is created later its connections to the camera server are released.
 
     Args:
         camera_info: 'cameras' section from POCS config
@@ -144,14 +153,65 @@ def create_distributed_cameras(camera_info, logger=None):
     # Get all distributed cameras
     camera_uris = list_distributed_cameras(ns_host=camera_info.get('name_server_host', None),
                                            logger=logger)
+    if not camera_uris:
+        return OrderedDict()
 
-    # Create the camera objects.
-    # TODO: do this in parallel because initialising cameras can take a while.
-    cameras = OrderedDict()
+    max_workers = int(camera_info.get('max_parallel_init', len(camera_uris)))
+    if max_workers < 1:
+        logger.warning(f"Invalid max_parallel_init of {max_workers}, creating cameras one at a"
+                       " time.")
+        max_workers = 1
+    timeout = camera_info.get('init_timeout', 300)
     primary_id = camera_info.get('primary', '')
+
+    # Create the camera objects in parallel because initialising cameras can take a while.
+    start_times = dict()
+    semaphore = BoundedSemaphore(max_workers)
+
+    def create_camera(cam_name, cam_uri, future):
+        with semaphore:
+            if not future.set_running_or_notify_cancel():
+                return
+            start_times[cam_name] = time.monotonic()
+            logger.debug('Creating camera: {}'.format(cam_name))
+            try:
+                future.set_result(PyroCamera(port=cam_name, uri=cam_uri))
+            except Exception as err:
+                future.set_exception(err)
+
+    pending = dict()
     for cam_name, cam_uri in camera_uris.items():
-        logger.debug('Creating camera: {}'.format(cam_name))
-        cam = PyroCamera(port=cam_name, uri=cam_uri)
+        pending[cam_name] = Future()
+        Thread(target=create_camera, args=(cam_name, cam_uri, pending[cam_name]),
+               name=f'CreateCamera-{cam_name}', daemon=True).start()
+    # Cameras queued behind ones that hang would otherwise never time out.
+    n_batches = math.ceil(len(pending) / max_workers)
+    deadline = time.monotonic() + timeout * n_batches
+
+    created_cameras = dict()
+    while pending:
+        wait(pending.values(), timeout=1, return_when=FIRST_COMPLETED)
+        now = time.monotonic()
+        for cam_name, future in list(pending.items()):
+            if future.done():
+                del pending[cam_name]
+                try:
+                    created_cameras[cam_name] = future.result()
+                except Exception as err:
+                    logger.error(f"Failed to create camera {cam_name}: {err!r}")
+            elif now > deadline or now - start_times.get(cam_name, now) > timeout:
+                del pending[cam_name]
+                logger.error(f"Timeout after {timeout}s while creating camera {cam_name}.")
+                if not future.cancel():
+                    # Already being created, so it can only be released once it's done
+                    future.add_done_callback(partial(_release_late_camera, cam_name,
+                                                     logger=logger))
+
+    cameras = OrderedDict()
+    for cam_name in camera_uris.keys():
+        if cam_name not in created_cameras:
+            continue
+        cam = created_cameras[cam_name]
         if primary_id == cam.uid or primary_id == cam.name:
             cam.is_primary = True
 
@@ -159,4 +219,20 @@ def create_distributed_cameras(camera_info, logger=None):
 
         cameras[cam_name] = cam
 
+    logger.debug(f"Created {len(cameras)} of {len(camera_uris)} distributed cameras.")
+
     return cameras
+
+
+def _release_late_camera(cam_name, future, logger):
+    """Release a distributed camera that was created after create_distributed_cameras gave up."""
+    try:
+        cam = future.result()
+    except Exception as err:
+        logger.error(f"Failed to create camera {cam_name} after timeout: {err!r}")
+        return
+    logger.warning(f"Camera {cam_name} was created after timing out, releasing it.")
+    try:
+        cam.release()
+    except Exception as err:
+        logger.error(f"Failed to release camera {cam_name}: {err!r}")
@@ -1,10 +1,13 @@
 import os
-import requests
+import time
 from warnings import warn
-from threading import Timer
+from threading import Event, Lock, Thread
+from queue import Queue
 from contextlib import suppress
+from functools import partial
 
 from astropy import units as u
+from astropy.io import fits
 import Pyro4
 import Pyro4.util
 import Pyro4.errors
@@ -16,7 +19,13 @@ from pocs.camera import AbstractCamera
 
 from huntsman.pocs.focuser.pyro import Focuser as PyroFocuser
 from huntsman.pocs.filterwheel.pyro import FilterWheel as PyroFilterWheel
-from huntsman.pocs.utils.pyro.event import RemoteEvent
+from huntsman.pocs.utils.pyro.event import RemoteEvent, get_event_listener
+from huntsman.pocs.utils.pyro.cache import PropertyCache
+from huntsman.pocs.utils.pyro.proxy import ProxyPool
+from huntsman.pocs.utils.timeout import get_timeout_scheduler
+from huntsman.pocs.utils.flats import frame_stats
+from huntsman.pocs.utils.ngas import get_ngas_uploader
+from huntsman.pocs.utils.transfer import send_file, DEFAULT_PORT as TRANSFER_PORT
 # This import is needed to set up the custom (de)serializers in the same scope
 # as the CameraServer and the Camera client's proxy.
 from huntsman.pocs.utils.pyro import serializers
@@ -36,6 +45,12 @@ class Camera(AbstractCamera):
                  *args, **kwargs):
         super().__init__(name=name, port=port, model=model, *args, **kwargs)
         self._uri = uri
+        # Handles & tokens of the outstanding local timeouts, see _run_timeout()
+        self._timeouts = dict()
+        # Filename: start skew of exposures started by HuntsmanObservatory.expose_all, see
+        # _process_fits()
+        self._exposure_start_skews = dict()
+        self._snapshot_max_age = self.config.get('pyro', {}).get('snapshot_max_age', 1)
 
         # Obtain the NGAS server IP
         if 'ngas_ip' not in self.config.keys():
@@ -59,7 +74,7 @@ class Camera(AbstractCamera):
         """
         Current temperature of the camera's image sensor.
         """
-        return self._proxy.get("temperature")
+        return self._get_property("temperature")
 
     @property
     def target_temperature(self):
@@ -69,15 +84,16 @@ class Camera(AbstractCamera):
 
         Can be set by assigning an astropy.units.Quantity.
         """
-        return self._proxy.get("target_temperature")
+        return self._get_property("target_temperature")
 
     @target_temperature.setter
     def target_temperature(self, target):
         self._proxy.set("target_temperature", target)
+        self._cache.invalidate("target_temperature", "is_temperature_stable", "is_ready")
 
     @property
     def temperature_tolerance(self):
-        return self._proxy.get("temperature_tolerance")
+        return self._get_property("temperature_tolerance")
 
     @temperature_tolerance.setter
     def temperature_tolerance(self, tolerance):
@@ -85,6 +101,7 @@ class Camera(AbstractCamera):
             # Base class constructor is trying to set a default temperature temperature
             # before self._proxy exists, & it's up to the remote camera to do that anyway.
             self._proxy.set("temperature_tolerance", tolerance)
+            self._cache.invalidate("temperature_tolerance", "is_temperature_stable", "is_ready")
 
     @property
     def cooling_enabled(self):
@@ -93,11 +110,13 @@ class Camera(AbstractCamera):
 
         For some cameras it is possible to change this by assigning a boolean
         """
-        return self._proxy.get("cooling_enabled")
+        return self._get_property("cooling_enabled")
 
     @cooling_enabled.setter
     def cooling_enabled(self, enabled):
         self._proxy.set("cooling_enabled", bool(enabled))
+        self._cache.invalidate("cooling_enabled", "cooling_power", "is_temperature_stable",
+                               "is_ready")
 
     @property
     def cooling_power(self):
@@ -105,42 +124,74 @@ class Camera(AbstractCamera):
         Current power level of the camera's image sensor cooling system (typically as
         a percentage of the maximum).
         """
-        return self._proxy.get("cooling_power")
+        return self._get_property("cooling_power")
 
     @property
     def is_exposing(self):
-        return self._proxy.get("is_exposing")
+        return self._get_property("is_exposing")
 
     @property
     def is_temperature_stable(self):
-        return self._proxy.get("is_temperature_stable")
+        return self._get_property("is_temperature_stable")
 
     @property
     def is_ready(self):
         '''
         True if camera is ready to start another exposure, otherwise False.
         '''
-        return self._proxy.get("is_ready")
+        return self._get_property("is_ready")
+
+    @property
+    def cache_stats(self):
+        """Hit & miss counts of the property caches of the camera and its subcomponents."""
+        stats = {"camera": self._cache.stats}
+        for subcomponent in ("focuser", "filterwheel"):
+            with suppress(AttributeError):
+                stats[subcomponent] = getattr(self, subcomponent)._cache.stats
+        return stats
 
 # Methods
 
+    def refresh_state(self):
+        """
+        Fetch the values of all frequently polled properties from the remote camera and its
+        subcomponents in a single call. Property access will use these values until they are
+        older than the `pyro.snapshot_max_age` config item (in seconds, default 1), or the
+        configured TTL of the property if that is longer.
+        """
+        # A setter or exposure that invalidates a cache while the snapshot is being fetched
+        # makes the snapshot stale, so it is dropped for that cache.
+        caches = {"camera": self._cache}
+        for subcomponent in ("focuser", "filterwheel"):
+            with suppress(AttributeError):
+                caches[subcomponent] = getattr(self, subcomponent)._cache
+        generations = {name: cache.generation for name, cache in caches.items()}
+
+        snapshot = self._proxy.snapshot()
+        for name, cache in caches.items():
+            if name in snapshot:
+                cache.update(snapshot[name], ttl=self._snapshot_max_age,
+                             generation=generations[name])
+
     def connect(self):
         """
         (re)connect to the distributed camera.
         """
         self.logger.debug('Connecting to {} at {}'.format(self.port, self._uri))
 
-        # Get a proxy for the camera
+        # Get a proxy for the camera. Each thread that uses it gets its own Pyro4 proxy, and the
+        # focuser, filterwheel & remote events share the same pool.
         try:
-            self._proxy = Pyro4.Proxy(self._uri)
+            self._proxy = ProxyPool(self._uri)
         except Pyro4.errors.NamingError as err:
             msg = "Couldn't get proxy to camera {}: {}".format(self.port, err)
             warn(msg)
             self.logger.error(msg)
             return
 
-        # Set sync mode
-        Pyro4.asyncproxy(self._proxy, asynchronous=False)
+        # Local cache of the slowly changing remote properties
+        cache_ttls = self.config.get('pyro', {}).get('cache_ttl', {})
+        self._cache = PropertyCache(ttls=cache_ttls.get('camera'))
 
         # Force camera proxy to connect by getting the camera uid.
         # This will trigger the remote object creation & (re)initialise the camera & focuser,
@@ -162,8 +213,23 @@ class Camera(AbstractCamera):
         self._is_cooled_camera = self._proxy.get("is_cooled_camera")
         self._filter_type = self._proxy.get("filter_type")
 
+        # Ask the camera server to push event transitions to this process, if enabled.
+        self._event_listener = None
+        pyro_config = self.config.get('pyro', {})
+        self._event_heartbeat_interval = pyro_config.get('event_heartbeat_interval', 10)
+        if pyro_config.get('push_events', True):
+            try:
+                self._event_listener = get_event_listener(
+                    host=pyro_config.get('event_listener_host'))
+                self._proxy.register_event_listener(self._event_listener.uri, self.port)
+            except Exception as err:
+                msg = f"Couldn't set up pushed events for {self}, falling back to polling: {err}"
+                warn(msg)
+                self.logger.warning(msg)
+                self._event_listener = None
+
         # Set up proxy for remote camera's _exposure_event
-        self._exposure_event = RemoteEvent(self._proxy, event_type="camera")
+        self._exposure_event = self._remote_event("camera")
 
         self._connected = True
         self.logger.debug("{} connected".format(self))
@@ -178,12 +244,24 @@ class Camera(AbstractCamera):
         else:
             self.filterwheel = None
 
+    def release(self):
+        """
+        Stop the camera server pushing events to this process & release the connections to it.
+        """
+        self._connected = False
+        if getattr(self, "_event_listener", None) is not None:
+            with suppress(Pyro4.errors.CommunicationError):
+                self._proxy.unregister_event_listener(self.port)
+        with suppress(AttributeError):
+            self._proxy.release_all()
+
     def take_exposure(self,
                       seconds=1.0 * u.second,
                       filename=None,
                       dark=False,
                       blocking=False,
                       *args,
+                      dispatch_time=None,
                       **kwargs):
         """Take an exposure for given number of seconds and saves to provided filename.
 
@@ -198,6 +276,9 @@ class Camera(AbstractCamera):
                 `IMAGETYP` keyword entirely.
             blocking (bool, optional): If False (default) returns immediately after starting
                 the exposure, if True will block until it completes.
+            dispatch_time (float, optional): Monotonic time the exposure was dispatched, e.g. by
+                HuntsmanObservatory.expose_all. If given the delay until the camera server had
+                started the exposure is recorded in the `STARTSKW` FITS header.
 
         Returns:
             threading.Event: Event that will be set when exposure is complete.
@@ -207,17 +288,33 @@ class Camera(AbstractCamera):
         self.logger.debug(f'Taking {seconds} second exposure on {self}: {filename}')
 
         # Remote method call to start the exposure
-        self._proxy.take_exposure(seconds=seconds,
-                                  filename=filename,
-                                  dark=bool(dark),
-                                  *args,
-                                  **kwargs)
+        event_state = self._proxy.take_exposure(seconds=seconds,
+                                                filename=filename,
+                                                dark=bool(dark),
+                                                *args,
+                                                **kwargs)
+        if filename is not None and dispatch_time is not None:
+            self._exposure_start_skews[filename] = time.monotonic() - dispatch_time
+        self._exposure_event.update(*event_state)
+        self._cache.invalidate("is_exposing", "is_ready")
 
         max_wait = get_quantity_value(seconds, u.second) + self.readout_time + self._timeout
         self._run_timeout("exposure", blocking, max_wait)
 
         return self._exposure_event
 
+    def get_exposure_stats(self):
+        """
+        Get the statistics of the most recent exposure, calculated by the camera server.
+
+        Statistics are only calculated if requested by passing a `stats` dict of keyword arguments
+        for huntsman.pocs.utils.flats.frame_stats to `take_exposure` or `take_observation`.
+
+        Returns:
+            dict: The clipped `mean`, `median` & `std` of the counts, or None if not requested.
+        """
+        return self._proxy.get_exposure_stats()
+
     def autofocus(self, blocking=False, *args, **kwargs):
         """
         Focuses the camera using the specified merit function. Optionally performs
@@ -265,10 +362,13 @@ class Camera(AbstractCamera):
         self.logger.debug(f'Starting autofocus on {self}.')
 
         # Remote method call to start the exposure
-        self._proxy.autofocus(*args, **kwargs)
+        event_state = self._proxy.autofocus(*args, **kwargs)
+        self._cache.invalidate("is_exposing", "is_ready")
+        self.focuser._cache.invalidate()
 
         # Proxy for remote _autofocus_event
-        self._autofocus_event = RemoteEvent(self._proxy, event_type="focuser")
+        self._autofocus_event = self._remote_event("focuser")
+        self._autofocus_event.update(*event_state)
 
         # In general it's very complicated to work out how long an autofocus should take
         # because parameters can be set here or come from remote config. For now just make
@@ -280,6 +380,15 @@ class Camera(AbstractCamera):
 
 # Private Methods
 
+    def _get_property(self, property_name):
+        """Get a property of the remote camera, using the cached value if it hasn't expired."""
+        return self._cache.get(property_name, partial(self._proxy.get, property_name))
+
+    def _remote_event(self, event_type):
+        """Create a RemoteEvent for one of the remote camera's events."""
+        return RemoteEvent(self._proxy, event_type=event_type, listener=self._event_listener,
+                           key=self.port, heartbeat_interval=self._event_heartbeat_interval)
+
     def _start_exposure(self, seconds=None, filename=None, dark=False, header=None):
         """Dummy method on the client required to overwrite @abstractmethod"""
         pass
@@ -290,23 +399,34 @@ class Camera(AbstractCamera):
 
     def _run_timeout(self, timeout_type, blocking, max_wait):
         relevant_event = getattr(self, f"_{timeout_type}_event")
+        scheduler = get_timeout_scheduler()
+        with suppress(KeyError):
+            # Any previous operation of the same type must have finished by now. Events that
+            # aren't pushed only cancel their timeout if polled, so make sure it can't fire.
+            scheduler.cancel(self._timeouts.pop(timeout_type)[0])
         if blocking:
             success = relevant_event.wait(timeout=max_wait)
             if not success:
                 self._timeout_response(timeout_type, relevant_event)
         else:
             # If the remote operation fails after starting in such a way that the event doesn't
-            # get set then calling code could wait forever. Have a local timeout thread
-            # to be safe.
-            timeout_thread = Timer(interval=max_wait,
-                                   function=self._timeout_response,
-                                   args=(timeout_type, relevant_event))
-            timeout_thread.start()
-
-    def _timeout_response(self, timeout_type, timeout_event):
+            # get set then calling code could wait forever. Have a local timeout to be safe.
+            # These share a single scheduler thread, and are cancelled on completion. The
+            # response makes remote calls, so runs on the scheduler's worker threads.
+            # Identifies this timeout in case it fires just as a later operation replaces it.
+            token = object()
+            handle = scheduler.schedule(max_wait, self._timeout_response,
+                                        timeout_type, relevant_event, token)
+            self._timeouts[timeout_type] = (handle, token)
+            relevant_event.add_callback(partial(scheduler.cancel, handle))
+
+    def _timeout_response(self, timeout_type, timeout_event, token=None):
         # This could do more thorough checks for success, e.g. check is_exposing property,
         # check for existence of output file, etc. It's supposed to be a last resort though,
         # and most problems should be caught elsewhere.
+        if token is not None and self._timeouts.get(timeout_type, (None, None))[1] is not token:
+            # A later operation of the same type has started, this timeout is stale.
+            return
         is_set = True
         # Can get a comms error if everything has finished and shutdown before the timeout,
         # e.g. when running tests.
@@ -320,18 +440,39 @@ class Camera(AbstractCamera):
         '''
         Override _process_fits, called by process_exposure in take_observation.
 
-        The difference is that we do an NGAS push following the processing.
+        The difference is that we record the exposure start skew in the FITS header.
         '''
         # Call the super method
         result = super()._process_fits(file_path, info)
 
-        # Do the NGAS push
-        self._ngas_push(file_path, info)
+        # Record the start delay of exposures started with HuntsmanObservatory.expose_all, from
+        # the exposures being dispatched until the camera server had started the exposure.
+        start_skew = self._exposure_start_skews.pop(file_path, None)
+        if start_skew is not None:
+            fits.setval(file_path, 'STARTSKW', value=round(start_skew, 3),
+                        comment='Exposure start skew [s]')
 
         return result
 
-    def _ngas_push(self, filename, metadata, filename_ngas=None, port=7778):
+    def process_exposure(self, info, *args, **kwargs):
         '''
+        Override process_exposure, called in take_observation.
+
+        The difference is that we queue an NGAS push once the file has been processed and
+        compressed, so the final file is pushed.
+        '''
+        result = super().process_exposure(info, *args, **kwargs)
+
+        # Queue the NGAS push
+        self._ngas_push(info['file_path'], info)
+
+        return result
+
+    def _ngas_push(self, filename, metadata, filename_ngas=None, port=None):
+        '''
+        Queue a push to the NGAS server. The push is made in the background by the shared
+        huntsman.pocs.utils.ngas.NgasUploader, which retries failed pushes.
+
         Parameters
         ----------
         filename (str):
@@ -341,36 +482,24 @@ class Camera(AbstractCamera):
         filename_ngas (str, optional):
             The NGAS filename. If None, auto-assign based on metadata.
         port (int, optional):
-            The port of the NGAS server. Defaults to the TCP port.
+            Kept for compatibility. The shared uploader always uses the port from the `ngas`
+            config section, a different port is ignored with a warning.
 
         '''
         # Define the NGAS filename
         if filename_ngas is None:
-            extension = os.path.splitext(filename)[-1]
+            root, extension = os.path.splitext(filename)
+            if extension == '.fz':
+                extension = os.path.splitext(root)[-1] + extension
             filename_ngas = f"{metadata['image_id']}{extension}"
 
-        # Get the IP address of the NGAS server
-        ngas_ip = self.config['ngas_ip']
-
-        # Post the file to the NGAS server
-        url = f'http://{ngas_ip}:{port}/QARCHIVE?filename={filename_ngas}&ignore_arcfile=1'
-        with open(filename, 'rb') as f:
-
-            self.logger.info(
-                f'Pushing {filename} to NGAS as {filename_ngas}: {url}')
-
-            try:
-                # Post the file
-                r = requests.post(url, data=f)
-
-                self.logger.debug(f'NGAS response: {r.text}')
-
-                # Confirm success
-                r.raise_for_status()
-
-            except Exception as e:
-                self.logger.error(f'Error while performing NGAS push: {e}')
-                raise(e)
+        uploader = get_ngas_uploader(self.config, logger=self.logger)
+        if port is not None and port != uploader.port:
+            self.logger.warning(f'Ignoring NGAS port {port}, pushes use port {uploader.port}'
+                                ' from the ngas config.')
+        uploader.enqueue(filename, filename_ngas)
+        self.logger.debug(f'Queued NGAS push of {filename} as {filename_ngas},'
+                          f' {uploader.queue_depth} pushes pending.')
 
 
 @Pyro4.expose
@@ -382,6 +511,28 @@ class CameraServer(object):
     _event_locations = {"camera": ("_exposure_event",),
                         "focuser": ("_autofocus_event",),
                         "filterwheel": ("_camera", "filterwheel", "_move_event")}
+    # Attempts to push each event transition to a listener, the delay before the first retry
+    # in seconds, which doubles after each attempt, & the timeout of each push in seconds.
+    # See _push_event().
+    _event_push_attempts = 3
+    _event_push_delay = 0.1
+    _event_push_timeout = 2
+    # Frequently polled properties returned by snapshot()
+    _snapshot_properties = {"camera": ("temperature",
+                                       "target_temperature",
+                                       "temperature_tolerance",
+                                       "cooling_enabled",
+                                       "cooling_power",
+                                       "is_exposing",
+                                       "is_ready",
+                                       "is_temperature_stable"),
+                            "focuser": ("position",
+                                        "is_moving",
+                                        "is_ready"),
+                            "filterwheel": ("position",
+                                            "current_filter",
+                                            "is_moving",
+                                            "is_ready")}
 
     def __init__(self, config_files=None):
         # Pyro classes ideally have no arguments for the constructor. Do it all from config file.
@@ -395,6 +546,27 @@ class CameraServer(object):
         module = load_module('pocs.camera.{}'.format(camera_config['model']))
         self._camera = module.Camera(**camera_config)
 
+        # Images are either written straight to the control computer's images directory over
+        # SSHFS, or written locally & then streamed to the control computer's image receiver.
+        self._image_transfer = self.config.get('image_transfer', {}).get('mode', 'sshfs')
+        if self._image_transfer not in ('sshfs', 'stream'):
+            raise ValueError(f"Unknown image transfer mode {self._image_transfer}.")
+        if self._image_transfer == 'stream':
+            control_config = query_config_server(key='control')
+            self._receiver_address = (control_config['ip_address'],
+                                      control_config.get('image_receiver_port', TRANSFER_PORT))
+
+        # Statistics of the most recent exposure, if requested. See take_exposure().
+        self._exposure_stats = None
+
+        # Clients that event transitions are pushed to, see register_event_listener()
+        self._event_listeners = dict()
+        self._event_sequence = {event_type: 0 for event_type in self._event_locations}
+        self._event_lock = Lock()
+        # Transitions are pushed from a background thread so RPC calls don't wait on listeners
+        self._event_queue = Queue()
+        Thread(target=self._push_events, daemon=True).start()
+
 # Properties - rather than labouriously wrapping every camera property individually expose
 # them all with generic get and set methods.
 
@@ -410,6 +582,34 @@ class CameraServer(object):
             obj = getattr(obj, subcomponent)
         setattr(obj, property_name, value)
 
+    def get_many(self, property_names, subcomponent=None):
+        """
+        Get the values of several properties in a single call. Properties that are not
+        implemented are left out of the returned dict, so that the client can fall back to
+        requesting them individually & get the NotImplementedError.
+        """
+        obj = self._camera
+        if subcomponent:
+            obj = getattr(obj, subcomponent)
+        values = dict()
+        for property_name in property_names:
+            with suppress(NotImplementedError):
+                values[property_name] = getattr(obj, property_name)
+        return values
+
+    def snapshot(self):
+        """
+        Get the values of all the frequently polled properties of the camera and its
+        subcomponents in a single call.
+        """
+        snapshot = {"camera": self.get_many(self._snapshot_properties["camera"])}
+        if self.has_focuser:
+            snapshot["focuser"] = self.get_many(self._snapshot_properties["focuser"], "focuser")
+        if self.has_filterwheel:
+            snapshot["filterwheel"] = self.get_many(self._snapshot_properties["filterwheel"],
+                                                    "filterwheel")
+        return snapshot
+
 # Methods
 
     def get_uid(self):
@@ -419,17 +619,68 @@ class CameraServer(object):
         """
         return self._camera.uid
 
-    def take_exposure(self, *args, **kwargs):
+    def take_exposure(self, *args, stats=None, **kwargs):
+        """
+        Start an exposure. If `stats` is given then once the image has been read out its
+        statistics are calculated here, on the camera server, & can be retrieved with
+        `get_exposure_stats`. `stats` should be a dict of keyword arguments for
+        huntsman.pocs.utils.flats.frame_stats, e.g. `{"bias": 32}`.
+        """
         # Start the exposure non-blocking so that camera server can still respond to
         # status requests.
         kwargs['blocking'] = False
-        self._exposure_event = self._camera.take_exposure(*args, **kwargs)
+        self._exposure_stats = None
+        stream = self._image_transfer == 'stream'
+        if stream or stats is not None:
+            filename = kwargs['filename']
+            if stream:
+                os.makedirs(os.path.dirname(filename), exist_ok=True)
+            camera_event = self._camera.take_exposure(*args, **kwargs)
+            # The client is only told the exposure is complete once the statistics are ready &
+            # the image has arrived.
+            self._exposure_event = Event()
+            Thread(target=self._process_exposure,
+                   args=(camera_event, filename, stats, stream, self._exposure_event),
+                   daemon=True).start()
+        else:
+            self._exposure_event = self._camera.take_exposure(*args, **kwargs)
+        return self._watch_event("camera")
+
+    def get_exposure_stats(self):
+        """Statistics of the most recent exposure, or None if they weren't requested."""
+        return self._exposure_stats
 
     def autofocus(self, *args, **kwargs):
         # Start the autofocus non-blocking so that camera server can still respond to
         # status requests.
         kwargs['blocking'] = False
         self._autofocus_event = self._camera.autofocus(*args, **kwargs)
+        return self._watch_event("focuser")
+
+    def _process_exposure(self, camera_event, filename, stats, stream, exposure_event):
+        """
+        Wait for an exposure to finish, then calculate the image statistics if requested & stream
+        the image to the control computer's image receiver, deleting the local copy, if in stream
+        mode. Sets `exposure_event` when done, even on failure.
+        """
+        try:
+            camera_event.wait()
+            if stats is not None:
+                try:
+                    self._exposure_stats = frame_stats(filename, **stats)
+                except Exception as err:
+                    self._camera.logger.error(f"Error calculating stats of {filename}: {err!r}")
+            if stream:
+                try:
+                    send_file(filename,
+                              *self._receiver_address,
+                              images_dir=self.config['directories']['images'],
+                              logger=self._camera.logger)
+                    os.remove(filename)
+                except Exception as err:
+                    self._camera.logger.error(f"Error transferring {filename}: {err!r}")
+        finally:
+            exposure_event.set()
 
 # Focuser methods - these are used by the remote focuser client, huntsman.focuser.pyro.Focuser
 
@@ -452,6 +703,7 @@ class CameraServer(object):
 
     def filterwheel_move_to(self, position):
         self._camera.filterwheel._move_to(position)
+        return self._watch_event("filterwheel")
 
 # Event access
 
@@ -463,13 +715,105 @@ class CameraServer(object):
         return obj
 
     def event_set(self, event_type):
-        return self._get_event(event_type).set()
+        self._get_event(event_type).set()
+        return self._notify_event(event_type)
 
     def event_clear(self, event_type):
-        return self._get_event(event_type).clear()
+        self._get_event(event_type).clear()
+        return self._notify_event(event_type)
+
+    def event_state(self, event_type):
+        """Current state & transition sequence number of an event. No event counts as set."""
+        with self._event_lock:
+            try:
+                is_set = self._get_event(event_type).is_set()
+            except AttributeError:
+                is_set = True
+            return is_set, self._event_sequence[event_type]
 
     def event_is_set(self, event_type):
         return self._get_event(event_type).is_set()
 
     def event_wait(self, event_type, timeout):
         return self._get_event(event_type).wait(timeout)
+
+    def register_event_listener(self, uri, key):
+        """
+        Register a client side huntsman.pocs.utils.pyro.event.EventListener. All transitions of
+        the camera, focuser & filterwheel events will be pushed to it, identified by `key`.
+        """
+        self._event_listeners[key] = uri
+
+    def unregister_event_listener(self, key):
+        self._event_listeners.pop(key, None)
+
+    def is_event_listener_registered(self, uri, key):
+        """True if event transitions are being pushed to the listener, see _notify_event()."""
+        return self._event_listeners.get(key) == uri
+
+    def _notify_event(self, event_type):
+        """
+        Queue the current state of an event to be pushed to all the registered listeners.
+
+        Returns:
+            tuple: The state of the event & the sequence number of the transition.
+        """
+        with self._event_lock:
+            self._event_sequence[event_type] += 1
+            sequence = self._event_sequence[event_type]
+            is_set = self._get_event(event_type).is_set()
+        timestamp = time.time()
+
+        for key, uri in list(self._event_listeners.items()):
+            self._event_queue.put((key, uri, event_type, is_set, sequence, timestamp))
+
+        return is_set, sequence
+
+    def _push_events(self):
+        """Push the queued event transitions to the listeners, in order."""
+        while True:
+            key, uri, event_type, *state = self._event_queue.get()
+            try:
+                self._push_event(key, uri, event_type, *state)
+            except Exception as err:
+                warn(f"Error pushing {event_type} event to {uri}: {err!r}")
+
+    def _push_event(self, key, uri, event_type, is_set, sequence, timestamp):
+        """
+        Push an event transition to a listener, retrying with exponential backoff. A listener
+        that can't be reached after `_event_push_attempts` attempts is unregistered, the client
+        notices on its next heartbeat & registers again or falls back to polling.
+        """
+        delay = self._event_push_delay
+        for attempt in range(1, self._event_push_attempts + 1):
+            try:
+                with Pyro4.Proxy(uri) as listener:
+                    listener._pyroTimeout = self._event_push_timeout
+                    listener.event_changed(key, event_type, is_set, sequence, timestamp)
+                return
+            except Pyro4.errors.CommunicationError as err:
+                if attempt == self._event_push_attempts:
+                    warn(f"Unable to push {event_type} event to {uri} after {attempt} attempts,"
+                         f" unregistering it: {err}")
+                    # Only if the client hasn't registered again in the meantime
+                    if self._event_listeners.get(key) == uri:
+                        self.unregister_event_listener(key)
+                    return
+                time.sleep(delay)
+                delay *= 2
+
+    def _watch_event(self, event_type):
+        """
+        Push the current state of an event to the listeners, then push it again from a
+        background thread once the event has been set.
+        """
+        event_state = self._notify_event(event_type)
+
+        def watch(event):
+            event.wait()
+            self._notify_event(event_type)
+
+        if self._event_listeners and not event_state[0]:
+            Thread(target=watch, args=(self._get_event(event_type),), daemon=True).start()
+
+        return event_state
@@ -0,0 +1,21 @@
+from pocs.core import POCS
+
+
+def create_pocs(observatory, *args, **kwargs):
+    """Create a POCS instance to run a HuntsmanObservatory.
+
+    The observatory's efficiency tracker follows the states of the new state machine, so the time
+    spent in each state is accounted for in the nightly efficiency report. Use this rather than
+    creating POCS directly so that the state times aren't left out.
+
+    Args:
+        observatory (huntsman.pocs.observatory.HuntsmanObservatory): The observatory.
+        *args: Passed to POCS.
+        **kwargs: Passed to POCS.
+
+    Returns:
+        pocs.core.POCS: The POCS instance.
+    """
+    pocs = POCS(observatory, *args, **kwargs)
+    observatory.efficiency.track_states(pocs)
+    return pocs
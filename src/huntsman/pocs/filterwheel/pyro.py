@@ -1,8 +1,8 @@
-from threading import Event
+from functools import partial
 
 from pocs.filterwheel import AbstractFilterWheel
 
-from huntsman.pocs.utils.pyro.event import RemoteEvent
+from huntsman.pocs.utils.pyro.cache import PropertyCache
 
 
 class FilterWheel(AbstractFilterWheel):
@@ -26,31 +26,31 @@ class FilterWheel(AbstractFilterWheel):
     @property
     def is_connected(self):
         """ Is the filterwheel available """
-        return self._proxy.get("is_connected", "filterwheel")
+        return self._get_property("is_connected")
 
     @property
     def is_moving(self):
         """ Is the filterwheel currently moving """
-        return self._proxy.get("is_moving", "filterwheel")
+        return self._get_property("is_moving")
 
     @property
     def is_ready(self):
         # A filterwheel is 'ready' if it is connected and isn't currently moving.
-        return self._proxy.get("is_ready", "filterwheel")
+        return self._get_property("is_ready")
 
     @AbstractFilterWheel.position.getter
     def position(self):
         """ Current integer position of the filter wheel """
-        return self._proxy.get("position", "filterwheel")
+        return self._get_property("position")
 
     @AbstractFilterWheel.current_filter.getter
     def current_filter(self):
         """ Name of the filter in the current position """
-        return self._proxy.get("current_filter", "filterwheel")
+        return self._get_property("current_filter")
 
     @property
     def is_unidirectional(self):
-        return self._proxy.get("is_unidirectional", "filterwheel")
+        return self._get_property("is_unidirectional")
 
 ##################################################################################################
 # Methods
@@ -59,9 +59,12 @@ class FilterWheel(AbstractFilterWheel):
     def connect(self):
         # Pyro4 proxy to remote huntsman.camera.pyro.CameraServer instance.
         self._proxy = self.camera._proxy
+        # Local cache of the slowly changing remote properties
+        cache_ttls = self.config.get('pyro', {}).get('cache_ttl', {})
+        self._cache = PropertyCache(ttls=cache_ttls.get('filterwheel'))
         # Replace _move_event created by base class constructor with
         # an interface to the remote one.
-        self._move_event = RemoteEvent(self._proxy, event_type="filterwheel")
+        self._move_event = self.camera._remote_event("filterwheel")
         # Fetch and locally cache properties that won't change.
         self._name = self._proxy.get("name", "filterwheel")
         self._model = self._proxy.get("model", "filterwheel")
@@ -73,5 +76,18 @@ class FilterWheel(AbstractFilterWheel):
 # Private methods
 ##################################################################################################
 
+    def _get_property(self, property_name):
+        """ Get a remote filterwheel property, using the cached value if it hasn't expired """
+        return self._cache.get(property_name,
+                               partial(self._proxy.get, property_name, "filterwheel"))
+
     def _move_to(self, position):
-        self._proxy.filterwheel_move_to(position)
+        try:
+            event_state = self._proxy.filterwheel_move_to(position)
+        finally:
+            # After the move starts, so a concurrent read can't re-cache the pre-move values
+            self._cache.invalidate("position", "current_filter", "is_moving", "is_ready")
+        self._move_event.update(*event_state)
+        # Values read during the move are stale once it has finished
+        self._move_event.add_callback(partial(self._cache.invalidate, "position",
+                                              "current_filter", "is_moving", "is_ready"))
@@ -1,5 +1,11 @@
+from contextlib import contextmanager
+from functools import partial
+from threading import Lock
+
 from pocs.focuser import AbstractFocuser
 
+from huntsman.pocs.utils.pyro.cache import PropertyCache
+
 
 class Focuser(AbstractFocuser):
     """ Class representing the client side interface to the Focuser of a distributed camera. """
@@ -19,108 +25,118 @@ class Focuser(AbstractFocuser):
     @property
     def position(self):
         """ Current encoder position of the focuser """
-        return self._proxy.get("position", "focuser")
+        return self._get_moving_property("position")
 
     @position.setter
     def position(self, position):
         """ Move focusser to new encoder position """
-        self._proxy.set("position", position, "focuser")
+        with self._moving():
+            self._proxy.set("position", position, "focuser")
 
     @property
     def min_position(self):
         """ Get position of close limit of focus travel, in encoder units """
-        return self._proxy.get("min_position", "focuser")
+        return self._get_property("min_position")
 
     @property
     def max_position(self):
         """ Get position of far limit of focus travel, in encoder units """
-        return self._proxy.get("max_position", "focuser")
+        return self._get_property("max_position")
 
     @property
     def is_connected(self):
         """ Is the filterwheel available """
-        return self._proxy.get("is_connected", "focuser")
+        return self._get_property("is_connected")
 
     @property
     def is_moving(self):
         """ True if the focuser is currently moving. """
-        return self._proxy.get("is_moving", "focuser")
+        return self._get_moving_property("is_moving")
 
     @property
     def is_ready(self):
-        return self._proxy.get("is_ready", "focuser")
+        return self._get_moving_property("is_ready")
 
     @property
     def autofocus_range(self):
-        return self._proxy.get("autofocus_range", "focuser")
+        return self._get_property("autofocus_range")
 
     @autofocus_range.setter
     def autofocus_range(self, autofocus_ranges):
         self._proxy.set("autofocus_range", autofocus_ranges, "focuser")
+        self._cache.invalidate("autofocus_range")
 
     @property
     def autofocus_step(self):
-        return self._proxy.get("autofocus_step", "focuser")
+        return self._get_property("autofocus_step")
 
     @autofocus_step.setter
     def autofocus_step(self, steps):
         self._proxy.set("autofocus_step", steps, "focuser")
+        self._cache.invalidate("autofocus_step")
 
     @property
     def autofocus_seconds(self):
-        return self._proxy.get("autofocus_seconds", "focuser")
+        return self._get_property("autofocus_seconds")
 
     @autofocus_seconds.setter
     def autofocus_seconds(self, seconds):
         self._proxy.set("autofocus_seconds", seconds, "focuser")
+        self._cache.invalidate("autofocus_seconds")
 
     @property
     def autofocus_size(self):
-        return self._proxy.get("autofocus_size", "focuser")
+        return self._get_property("autofocus_size")
 
     @autofocus_size.setter
     def autofocus_size(self, size):
         self._proxy.set("autofocus_size", size, "focuser")
+        self._cache.invalidate("autofocus_size")
 
     @property
     def autofocus_keep_files(self):
-        return self._proxy.get("autofocus_keep_files", "focuser")
+        return self._get_property("autofocus_keep_files")
 
     @autofocus_keep_files.setter
     def autofocus_keep_files(self, keep_files):
         self._proxy.set("autofocus_keep_files", keep_files, "focuser")
+        self._cache.invalidate("autofocus_keep_files")
 
     @property
     def autofocus_take_dark(self):
-        return self._proxy.get("autofocus_take_dark", "focuser")
+        return self._get_property("autofocus_take_dark")
 
     @autofocus_take_dark.setter
     def autofocus_take_dark(self, take_dark):
         self._proxy.set("autofocus_take_dark", take_dark, "focuser")
+        self._cache.invalidate("autofocus_take_dark")
 
     @property
     def autofocus_merit_function(self):
-        return self._proxy.get("autofocus_merit_function", "focuser")
+        return self._get_property("autofocus_merit_function")
 
     @autofocus_merit_function.setter
     def autofocus_merit_function(self, merit_function):
         self._proxy.set("autofocus_merit_function", merit_function, "focuser")
+        self._cache.invalidate("autofocus_merit_function")
 
     @property
     def autofocus_merit_function_kwargs(self):
-        return self._proxy.get("autofocus_merit_function_kwargs", "focuser")
+        return self._get_property("autofocus_merit_function_kwargs")
 
     @autofocus_merit_function_kwargs.setter
     def autofocus_merit_function_kwargs(self, kwargs):
         self._proxy.set("autofocus_merit_function_kwargs", kwargs, "focuser")
+        self._cache.invalidate("autofocus_merit_function_kwargs")
 
     @property
     def autofocus_mask_dilations(self):
-        return self._proxy.get("autofocus_mask_dilations", "focuser")
+        return self._get_property("autofocus_mask_dilations")
 
     @autofocus_mask_dilations.setter
     def autofocus_mask_dilations(self, dilations):
         self._proxy.set("autofocus_mask_dilations", dilations, "focuser")
+        self._cache.invalidate("autofocus_mask_dilations")
 
 ##################################################################################################
 # Methods
@@ -129,6 +145,12 @@ class Focuser(AbstractFocuser):
     def connect(self):
         # Pyro4 proxy to remote huntsman.camera.pyro.CameraServer instance.
         self._proxy = self.camera._proxy
+        # Local cache of the slowly changing remote properties
+        cache_ttls = self.config.get('pyro', {}).get('cache_ttl', {})
+        self._cache = PropertyCache(ttls=cache_ttls.get('focuser'))
+        # Number of moves in progress, see _moving()
+        self._n_moves = 0
+        self._moves_lock = Lock()
         self.name = self._proxy.get("name", "focuser")
         self.model = self._proxy.get("model", "focuser")
         self.port = self.camera.port
@@ -137,15 +159,44 @@ class Focuser(AbstractFocuser):
 
     def move_to(self, position):
         """ Move focuser to new encoder position """
-        return self._proxy.focuser_move_to(position)
+        with self._moving():
+            return self._proxy.focuser_move_to(position)
 
     def move_by(self, increment):
         """ Move focuser by a given amount """
-        return self._proxy.focuser_move_by(increment)
+        with self._moving():
+            return self._proxy.focuser_move_by(increment)
 
     def autofocus(self, *args, **kwargs):
         self.camera.autofocus(*args, **kwargs)
 
+    def _get_property(self, property_name):
+        """ Get a property of the remote focuser, using the cached value if it hasn't expired """
+        return self._cache.get(property_name,
+                               partial(self._proxy.get, property_name, "focuser"))
+
+    def _get_moving_property(self, property_name):
+        """ Get a property that changes while the focuser moves. The cache is bypassed during
+        moves, so values read during a move aren't cached for after it """
+        with self._moves_lock:
+            n_moves = self._n_moves
+        if n_moves:
+            return self._proxy.get(property_name, "focuser")
+        return self._get_property(property_name)
+
+    @contextmanager
+    def _moving(self):
+        """ Context manager for a blocking move of the remote focuser """
+        with self._moves_lock:
+            self._n_moves += 1
+        try:
+            yield
+        finally:
+            with self._moves_lock:
+                self._n_moves -= 1
+                # After the move, so a concurrent read can't re-cache the pre-move values
+                self._cache.invalidate("position", "is_moving", "is_ready")
+
     def _set_autofocus_parameters(self, *args, **kwargs):
         """Needed to stop the base class overwriting all the parameters of the remote focuser."""
         pass
@@ -2,26 +2,36 @@ import os
 import sys
 import time
 from contextlib import suppress
+from concurrent.futures import ThreadPoolExecutor, wait
 from functools import partial
 from collections import defaultdict
+from threading import BoundedSemaphore, Event, Lock
 
 from astropy import units as u
-from astropy.io import fits
-from astropy import stats
 
 from pocs.observatory import Observatory
 from pocs.scheduler import constraint
 from pocs.scheduler.observation import Field
 from pocs.utils import error
 from pocs.utils import listify
+from pocs.utils import get_quantity_value
 from pocs import utils
 
 from panoptes.utils.time import wait_for_events
 
+from huntsman.pocs.camera.pyro import Camera as PyroCamera
 from huntsman.pocs.guide.bisque import Guide
 from huntsman.pocs.scheduler.observation import DitheredObservation, DitheredFlatObservation
 from huntsman.pocs.scheduler.dark_observation import DarkObservation
 from huntsman.pocs.utils import load_config
+from huntsman.pocs.utils.analysis import AnalysisService
+from huntsman.pocs.utils.events import ExposureGroup
+from huntsman.pocs.utils.darks import DarkLibrary
+from huntsman.pocs.utils.efficiency import EfficiencyTracker
+from huntsman.pocs.utils.ephemeris import NightEphemeris
+from huntsman.pocs.utils.flats import frame_stats
+from huntsman.pocs.utils.mount import wait_for_slew
+from huntsman.pocs.utils.twilight import TwilightModel
 
 
 class HuntsmanObservatory(Observatory):
@@ -61,6 +71,34 @@ class HuntsmanObservatory(Observatory):
 
         self.flat_fields_required = take_flats
 
+        # Created when first needed, see the analysis, camera_executor, ephemeris,
+        # twilight_model & dark_library properties
+        self._analysis = None
+        self._camera_executor = None
+        self._ephemeris = None
+        self._twilight_model = None
+        self._dark_library = None
+
+        # Where the time goes each night, reported by housekeeping
+        efficiency_dir = None
+        with suppress(KeyError):
+            efficiency_dir = os.path.join(config['directories']['data'], 'efficiency')
+        self.efficiency = EfficiencyTracker(directory=efficiency_dir, logger=self.logger)
+
+        # Durations of the slews made by slew_to_target, in seconds
+        self.slew_durations = list()
+        # Slews to flat fields made & skipped as unnecessary this session
+        self._flat_slew_durations = list()
+        self._n_flat_slews_skipped = 0
+
+        # Offsets from pipelined analysis are recorded by analysis callbacks, see _apply_offset.
+        # Each analysis is numbered when submitted so results that finish out of order are
+        # dropped, rather than replacing the offset of a later exposure.
+        self._offset_lock = Lock()
+        self._offset_observation = None
+        self._offset_sequence = 0
+        self._offset_applied_sequence = 0
+
         # Attributes for focusing
         self.last_focus_time = None
         self._focus_frequency = config['focusing']['coarse']['frequency'] * \
@@ -118,17 +156,122 @@ class HuntsmanObservatory(Observatory):
     @property
     def past_midnight(self):
         """Check if it's morning, useful for going into either morning or evening flats."""
+        return self.ephemeris.past_midnight()
+
+    @property
+    def analysis(self):
+        """Service that plate solves images in worker processes.
+
+        The number of worker processes is set by `analysis.max_workers`, default 1.
+        """
+        if self._analysis is None:
+            analysis_config = self.config.get('analysis', {})
+            self._analysis = AnalysisService(max_workers=analysis_config.get('max_workers', 1),
+                                             location=self.earth_location, logger=self.logger)
+        return self._analysis
+
+    @property
+    def camera_executor(self):
+        """Thread pool that sends commands to all the cameras concurrently.
+
+        The pool lives as long as the observatory, so the cameras' per thread Pyro proxies are
+        reused rather than opened for every command.
+        """
+        if self._camera_executor is None:
+            self._camera_executor = ThreadPoolExecutor(max_workers=max(len(self.cameras), 1),
+                                                       thread_name_prefix="CameraCommand")
+        return self._camera_executor
+
+    @property
+    def ephemeris(self):
+        """Cache of the times of midnight & the sun crossing each `location.*_horizon`."""
+        if self._ephemeris is None:
+            horizons = [horizon for key, horizon in self.config['location'].items()
+                        if key.endswith('_horizon')]
+            self._ephemeris = NightEphemeris(self.observer, horizons=horizons,
+                                             logger=self.logger)
+        return self._ephemeris
+
+    @property
+    def twilight_model(self):
+        """Model of the twilight sky brightness used to choose flat field exposure times.
+
+        The fitted model is saved to the `flat_fields.twilight_model_file` config item, default
+        `twilight_model.json` in the data directory.
+        """
+        if self._twilight_model is None:
+            filename = self.config['flat_fields'].get('twilight_model_file')
+            if filename is None:
+                filename = os.path.join(self.config['directories']['data'],
+                                        'twilight_model.json')
+            self._twilight_model = TwilightModel(self.observer, filename=filename,
+                                                 logger=self.logger)
+        return self._twilight_model
 
-        # Get the time of the nearest midnight to now
-        midnight = self.observer.midnight(utils.current_time(), which='nearest')
+    @property
+    def dark_library(self):
+        """Catalogue of previously taken dark frames that can be reused.
 
-        # If the nearest midnight is in the past, it's the morning...
-        return midnight < utils.current_time()
+        Configured by the `darks` config section. The catalogue is saved to `darks.library_file`,
+        default `dark_library.json` in the data directory.
+        """
+        if self._dark_library is None:
+            darks_config = self.config.get('darks', {})
+            filename = darks_config.get('library_file')
+            if filename is None:
+                filename = os.path.join(self.config['directories']['data'], 'dark_library.json')
+            self._dark_library = DarkLibrary(filename,
+                                             temperature_bin=darks_config.get('temperature_bin', 2),
+                                             max_age=darks_config.get('max_age', 30),
+                                             logger=self.logger)
+            self._dark_library.prune()
+        return self._dark_library
 
 ##########################################################################
 # Methods
 ##########################################################################
 
+    def status(self):
+        """Get the observatory status.
+
+        The state of each distributed camera is refreshed with a single remote call first, so
+        that the status doesn't require a separate network round trip for every camera property.
+        The cameras are refreshed concurrently on `camera_executor`. The running totals of the
+        efficiency tracker are added as the `efficiency` item.
+        """
+        futures = {cam_name: self.camera_executor.submit(cam.refresh_state)
+                   for cam_name, cam in self.cameras.items() if isinstance(cam, PyroCamera)}
+        for cam_name, future in futures.items():
+            try:
+                future.result()
+            except Exception as err:
+                self.logger.warning(f'Unable to refresh state of {cam_name}: {err}')
+        status = super().status()
+        # The status may be requested before the tracker has been created
+        if getattr(self, 'efficiency', None) is not None:
+            status['efficiency'] = self.efficiency.counters()
+        return status
+
+    def is_dark(self, horizon='observe', default_dark=-18 * u.degree, at_time=None):
+        """If the sun is below a horizon.
+
+        Uses the cached ephemeris, so this is a comparison with the crossing times for the night.
+
+        Args:
+            horizon (str, optional): Which horizon to use, 'flat', 'focus', or 'observe' (default),
+                i.e. the `location.<horizon>_horizon` config entry.
+            default_dark (Quantity, optional): Horizon to use if there is no config entry,
+                default -18 degrees.
+            at_time (astropy.time.Time, optional): Time to check, default now.
+
+        Returns:
+            bool: True if the sun is below the horizon.
+        """
+        horizon_deg = self.config['location'].get(f'{horizon}_horizon', default_dark)
+        is_dark = self.ephemeris.is_dark(horizon_deg, at_time)
+        self._is_dark = is_dark
+        return is_dark
+
     def initialize(self):
         """Initialize the observatory and connected hardware """
         super().initialize()
@@ -195,24 +338,42 @@ class HuntsmanObservatory(Observatory):
         This is convenience method to slew to the target and turn on the guiding
         given a large separation.
 
+        The slew times out after `mount.slew_timeout` seconds from the config, default 300.
+
+        Returns:
+            float: The duration of the slew in seconds, which is also added to `slew_durations`.
         """
         separation_limit = 0.5 * u.degree
 
-        # Slew to target
-        self.mount.slew_to_target()
+        with self.efficiency.timing('slewing'):
+            # Slew to target
+            self.mount.slew_to_target()
 
-        self.status()  # Send status update and update `is_tracking`
+            self.status()  # Send status update and update `is_tracking`
 
-        # WARNING: Some kind of timeout needed
-        while not self.mount.is_tracking and self.mount.distance_from_target() >= separation_limit:
-            self.logger.debug("Slewing to target")
-            time.sleep(1)
+            duration = wait_for_slew(self.mount, separation_limit=separation_limit,
+                                     timeout=self.config['mount'].get('slew_timeout', 300),
+                                     logger=self.logger)
+        self.slew_durations.append(duration)
+        self.logger.debug(f'Slewed to target in {duration:.2f} seconds.')
+        return duration
 
     def analyze_recent(self):
         """Analyze the most recent exposure.
 
-        This is a small wrapper around the POCS version which just ensures that
-        there is a "pointing" image to use as a reference for solving.
+        Ensures that there is a "pointing" image to use as a reference, then plate solves the
+        image in a worker process of the analysis service, so that astrometry never runs on the
+        state machine's thread. The offset is recorded in `current_offset_info` & the
+        `offset_info` collection.
+
+        If the `analysis.mode` config item is `serial` (the default) this waits up to
+        `analysis.timeout` seconds, default 10, for the offset, so that it is the offset of this
+        exposure. An analysis that takes longer carries on in the background, as in pipelined
+        mode, so the state machine never waits long for astrometry. If it is `pipelined` this
+        returns immediately & the offset is recorded once the analysis is done. It is cleared
+        when another analysis is submitted, so it is never older than the analysis in progress.
+        In both modes the offset isn't applied to the mount, as the analyzing state moves on to
+        dithering rather than tracking.
 
         Returns:
             dict: Offset information
@@ -223,11 +384,54 @@ class HuntsmanObservatory(Observatory):
             self.current_observation.pointing_images[image_id] = file_path
             self.logger.debug(f'Pointing image set to {self.current_observation.pointing_image}')
 
-        # Now call the main analyze
-        super().analyze_recent()
-
+        analysis_config = self.config.get('analysis', {})
+        pipelined = analysis_config.get('mode', 'serial') == 'pipelined'
+
+        observation = self.current_observation
+        _, pointing_path = observation.pointing_image
+        image_id, image_path = observation.last_exposure
+        with self._offset_lock:
+            offset_info = self.current_offset_info
+            if observation is not self._offset_observation:
+                offset_info = None
+                self._offset_observation = observation
+                self._offset_applied_sequence = self._offset_sequence
+            self.current_offset_info = None
+            self._offset_sequence += 1
+            sequence = self._offset_sequence
+        submit_time = time.monotonic()
+        future = self.analysis.offset(image_path, pointing_path, key=observation)
+
+        if pipelined:
+            # Analyse while the next exposure is taken. The offset is recorded when the analysis
+            # is done, so the offset returned is from an earlier exposure.
+            future.add_done_callback(
+                partial(self._apply_offset, observation, image_id, sequence, submit_time))
+            return offset_info
+
+        timeout = analysis_config.get('timeout', 10)
+        with self.efficiency.timing('solving'):
+            done = wait([future], timeout=timeout).done
+        if not done:
+            self.logger.warning(f'Analysis of {image_id} not done after {timeout} seconds,'
+                                ' finishing it in the background')
+            # Only the time after the wait is saved by not waiting
+            future.add_done_callback(
+                partial(self._apply_offset, observation, image_id, sequence, time.monotonic()))
+            return self.current_offset_info
+        self._apply_offset(observation, image_id, sequence, submit_time, future,
+                           background=False)
         return self.current_offset_info
 
+    def power_down(self):
+        """Power down the observatory, stopping any image analysis worker processes."""
+        if self._analysis is not None:
+            self._analysis.shutdown()
+        if self._camera_executor is not None:
+            self._camera_executor.shutdown()
+            self._camera_executor = None
+        super().power_down()
+
     def autofocus_cameras(self, *args, **kwargs):
         '''
         Override autofocus_cameras to update the last focus time.
@@ -240,6 +444,91 @@ class HuntsmanObservatory(Observatory):
 
         return result
 
+    def expose_all(self, cameras, observation, exptimes, headers=None, filenames=None,
+                   dark=False, max_workers=None, camera_kwargs=None, **kwargs):
+        """Start exposures on several cameras at once.
+
+        The start commands are sent to the cameras concurrently, so that all the cameras start
+        exposing as close to the common `start_time` as possible. The delay between dispatch
+        and each camera acknowledging the start of its exposure is returned as its start skew.
+        The dispatch time is passed to distributed cameras as the `dispatch_time` argument of
+        `take_observation`, so that they can record their skew in the `STARTSKW` FITS header.
+
+        Args:
+            cameras (dict): Dict of camera name: Camera pairs.
+            observation (Observation): The observation that the exposures are part of.
+            exptimes (dict|float|Quantity): Exposure time for all cameras, or a dict of
+                camera name: exposure time pairs.
+            headers (dict, optional): FITS headers common to all cameras. Default `None` will
+                use `get_standard_headers`. The dict isn't modified.
+            filenames (dict, optional): Dict of camera name: filename pairs. Default `None` will
+                let the cameras choose the filenames.
+            dark (bool, optional): Take dark frames, default False.
+            max_workers (int, optional): Maximum number of concurrent start commands, default
+                `None` will start all cameras concurrently, up to the size of
+                `camera_executor`.
+            camera_kwargs (dict, optional): Dict of camera name: dict pairs of additional keyword
+                arguments for `take_observation` on individual cameras.
+            **kwargs: Passed to `take_observation` for each camera.
+
+        Returns:
+            huntsman.pocs.utils.events.ExposureGroup: Completion handle for the exposures,
+                containing the cameras that started exposing successfully.
+        """
+        if headers is None:
+            headers = self.get_standard_headers(observation=observation)
+        else:
+            headers = headers.copy()
+        headers.setdefault('start_time', utils.flatten_time(utils.current_time()))
+        if not isinstance(exptimes, dict):
+            exptimes = {cam_name: exptimes for cam_name in cameras.keys()}
+        if filenames is None:
+            filenames = dict()
+        if camera_kwargs is None:
+            camera_kwargs = dict()
+
+        if max_workers is None:
+            max_workers = max(len(cameras), 1)
+        start_limit = BoundedSemaphore(max_workers)
+        dispatch_time = time.monotonic()
+
+        def start_exposure(cam_name, cam):
+            exptime = exptimes[cam_name]
+            with suppress(AttributeError):
+                exptime = exptime.to_value(u.second)
+            take_kwargs = dict(kwargs, **camera_kwargs.get(cam_name, {}))
+            if isinstance(cam, PyroCamera):
+                take_kwargs['dispatch_time'] = dispatch_time
+            with start_limit:
+                event = cam.take_observation(observation, headers.copy(),
+                                             filename=filenames.get(cam_name), exptime=exptime,
+                                             dark=dark, **take_kwargs)
+            # The exposure has started once take_observation returns
+            return event, time.monotonic() - dispatch_time
+
+        futures = {cam_name: self.camera_executor.submit(start_exposure, cam_name, cam)
+                   for cam_name, cam in cameras.items()}
+        wait(futures.values())
+
+        events = dict()
+        start_skew = dict()
+        for cam_name, future in futures.items():
+            try:
+                events[cam_name], start_skew[cam_name] = future.result()
+            except Exception as err:
+                self.logger.error(f'Unable to start exposure on {cam_name}: {err!r}')
+                continue
+            exptime = exptimes[cam_name]
+            with suppress(AttributeError):
+                exptime = exptime.to_value(u.second)
+            self.efficiency.track_event(events[cam_name], cam_name, exptime=exptime)
+
+        exposure = ExposureGroup(events, filenames={c: filenames.get(c) for c in events},
+                                 start_skew=start_skew)
+        self.logger.debug(f'Started exposures on {len(exposure)} of {len(cameras)} cameras'
+                          f' with maximum start skew of {exposure.max_start_skew:.3f}s.')
+        return exposure
+
     def take_flat_fields(self, camera_names=None, alt=None, az=None,
                          safety_func=None, **kwargs):
         """
@@ -321,7 +610,8 @@ class HuntsmanObservatory(Observatory):
         for exptime in exptimes_dark:
             self._take_flat_field_darks(exptimes_dark, obs, safety_func, **flat_field_config)
 
-        self.logger.info('Finished flat-fielding.')
+        self.logger.info(f'Finished flat-fielding. Made {len(self._flat_slew_durations)} slews'
+                         f' to flat fields & skipped {self._n_flat_slews_skipped} this session.')
 
     def take_dark_fields(self,
                          exptimes,
@@ -329,11 +619,16 @@ class HuntsmanObservatory(Observatory):
                          camera_names=None,
                          n_darks=10,
                          imtype='dark',
+                         use_library=True,
                          *args, **kwargs
                          ):
         """Take n_darks for each exposure time specified,
            for each camera.
 
+        Cameras that already have n_darks recent enough darks with the same exposure time &
+        sensor temperature in the dark library are skipped, unless `use_library` is False. The
+        new darks are added to the library.
+
         Args:
             exptimes (list): List of exposure times for darks
             sleep (float, optional): Time in seconds to sleep between dark sequences.
@@ -344,6 +639,7 @@ class HuntsmanObservatory(Observatory):
                 take_dark_fields(exptimes=[1*u.s, 60*u.s, 15*u.s], n_darks=[30, 10, 20])
                 will take 30x1s, 10x60s, and 20x15s darks
             imtype (str, optional): type of image
+            use_library (bool, optional): Skip darks already in the dark library, default True.
         """
 
         if camera_names is None:
@@ -374,6 +670,20 @@ class HuntsmanObservatory(Observatory):
             with suppress(AttributeError):
                 exptime = exptime.to_value(u.second)
 
+            # Only use cameras that don't already have enough recent darks. The same sensor
+            # temperatures are used to look up & add the darks, so they land in the same bucket.
+            temperatures = {cam_name: self._camera_temperature(cam)
+                            for cam_name, cam in cameras_list.items()}
+            cameras_exptime = cameras_list
+            if use_library:
+                cameras_exptime = {cam_name: cam for cam_name, cam in cameras_list.items()
+                                   if not self.dark_library.has_darks(
+                                       cam.uid, exptime, temperatures[cam_name], num_darks)}
+                if not cameras_exptime:
+                    self.logger.debug(f'Dark library already has {num_darks} darks of exposure'
+                                      f' time {exptime}s for all cameras.')
+                    continue
+
             dark_obs = self._create_dark_observation(exptime)
 
             # Loop over exposure times for each camera.
@@ -381,50 +691,38 @@ class HuntsmanObservatory(Observatory):
 
                 self.logger.debug(f'Darks sequence #{num} of exposure time {exptime}s')
 
-                camera_events = dict()
-
-                # Take a given number of exposures for each exposure time.
-                for camera in cameras_list.values():
-
-                    # Create dark observation
-                    fits_headers = self.get_standard_headers(observation=dark_obs)
-                    # Common start time for cameras
-                    fits_headers['start_time'] = utils.flatten_time(start_time)
+                # Create dark observation
+                fits_headers = self.get_standard_headers(observation=dark_obs)
+                # Common start time for cameras
+                fits_headers['start_time'] = utils.flatten_time(start_time)
 
-                    # Create filename
+                # Create filenames
+                filenames = dict()
+                for cam_name, camera in cameras_exptime.items():
                     path = os.path.join(image_dir,
                                         'darks',
                                         camera.uid,
                                         dark_obs.seq_time)
-
-                    filename = os.path.join(
+                    filenames[cam_name] = os.path.join(
                         path, f'{imtype}_{num:02d}.{camera.file_extension}')
 
-                    # Take picture and get event
-                    camera_event = camera.take_observation(
-                        dark_obs,
-                        fits_headers,
-                        filename=filename,
-                        exptime=exptime,
-                        dark=True,
-                        blocking=False
-                    )
-
-                    self.logger.debug(f'Camera {camera.uid} is exposing for {exptime}s')
-
-                    camera_events[camera] = {
-                        'event': camera_event,
-                        'filename': filename,
-                    }
-
-                    darks_filenames.append(filename)
-
-                    self.logger.debug(camera_events)
+                # Take a given number of exposures for each exposure time.
+                exposure = self.expose_all(cameras_exptime, dark_obs, exptime,
+                                           headers=fits_headers, filenames=filenames,
+                                           dark=True, blocking=False)
+                darks_filenames.extend(exposure.filenames.values())
 
                 # Block until done exposing on all cameras
-                while not all([info['event'].is_set() for info in camera_events.values()]):
+                while not exposure.is_set():
                     self.logger.debug('Waiting for dark-field images...')
                     time.sleep(sleep)
+
+                for cam_name, filename in exposure.filenames.items():
+                    if not self._dark_written(cam_name, exposure[cam_name], filename):
+                        continue
+                    self.dark_library.add(cameras_exptime[cam_name].uid, exptime,
+                                          temperatures[cam_name], filename)
+            self.dark_library.save()
         self.logger.debug(darks_filenames)
         return darks_filenames
 
@@ -433,84 +731,214 @@ class HuntsmanObservatory(Observatory):
         Activate camera cooling for all cameras.
         """
         self.logger.debug('Activating camera cooling for all cameras.')
-        for cam in self.cameras.values():
-            if cam.is_cooled_camera:
-                cam.cooling_enabled = True
+        self._set_camera_cooling(True)
 
     def deactivate_camera_cooling(self):
         """
         Deactivate camera cooling for all cameras.
         """
         self.logger.debug('Deactivating camera cooling for all cameras.')
-        for cam in self.cameras.values():
-            if cam.is_cooled_camera:
-                cam.cooling_enabled = False
+        self._set_camera_cooling(False)
 
-    def prepare_cameras(self, sleep=60, max_attempts=5, require_all_cameras=False):
+    def prepare_cameras(self, sleep=60, max_attempts=5, require_all_cameras=False, min_sleep=5):
         """
         Make sure cameras are all cooled and ready.
 
+        The cameras are checked concurrently. The time until the next check is estimated from
+        the rate the temperature of each camera that isn't ready yet is converging on its target,
+        between `min_sleep` & `sleep` seconds, so the checks finish soon after the last camera is
+        ready. Cameras are given up on after `sleep * (max_attempts - 1)` seconds.
+
         Arguments:
-            sleep (float): Time in seconds to sleep between checking readiness. Default 60.
-            max_attempts (int): Maximum number of ready checks. See `require_all_cameras`.
+            sleep (float): Maximum time in seconds to sleep between checking readiness.
+                Default 60.
+            max_attempts (int): Together with `sleep` sets the time to wait for the cameras to be
+                ready. See `require_all_cameras`. If 1 the cameras are only checked once.
             require_all_cameras (bool): `True` if all cameras are required to be ready.
-                If `True` and max_attempts is reached, a `PanError` will be raised. If `False`,
-                any camera that has failed to become ready will be dropped from the Observatory.
+                If `True` and the cameras aren't ready in time, a `PanError` will be raised. If
+                `False`, any camera that has failed to become ready will be dropped from the
+                Observatory.
+            min_sleep (float): Minimum time in seconds to sleep between checking readiness.
+                Default 5.
+
+        Returns:
+            dict: Dictionary of camera name: time in seconds taken to become ready.
         """
         # Make sure camera cooling is enabled
         self.activate_camera_cooling()
 
         # Wait for cameras to be ready
         n_cameras = len(self.cameras)
-        cameras_to_drop = []
+        start_time = time.monotonic()
+        deadline = start_time + sleep * (max_attempts - 1)
+        ready_times = dict()
+        temperatures = dict()
         self.logger.debug('Waiting for cameras to be ready.')
-        for i in range(1, max_attempts+1):
-
-            num_cameras_ready = 0
-            for cam_name, cam in self.cameras.items():
-
-                if cam.is_ready:
-                    num_cameras_ready += 1
+        executor = self.camera_executor
+        while True:
+            futures = {cam_name: executor.submit(self._camera_readiness, cam)
+                       for cam_name, cam in self.cameras.items()
+                       if cam_name not in ready_times}
+
+            delays = list()
+            for cam_name, future in futures.items():
+                is_ready, temperature_error = future.result()
+                check_time = time.monotonic()
+                if is_ready:
+                    ready_times[cam_name] = check_time - start_time
+                    self.logger.info(f'{cam_name} ready after {ready_times[cam_name]:.1f}'
+                                     ' seconds.')
                     continue
-
-                # If max attempts have been reached...
-                if (i == max_attempts):
-                    msg = f'Max attempts reached while waiting for {cam_name} to be ready.'
-
-                    # Raise PanError if we need all cameras
-                    if require_all_cameras:
-                        raise error.PanError(msg)
-
-                    # Drop the camera if we don't need all cameras
-                    else:
-                        self.logger.error(msg)
-                        cameras_to_drop.append(cam_name)
-
-            # Terminate loop if all cameras are ready
-            self.logger.debug(f'Number of ready cameras after {i} of {max_attempts} checks:'
-                              f' {num_cameras_ready} of {n_cameras}.')
-            if num_cameras_ready == n_cameras:
+                delays.append(self._camera_ready_delay(temperatures.get(cam_name),
+                                                       (check_time, temperature_error),
+                                                       min_sleep=min_sleep,
+                                                       max_sleep=sleep))
+                temperatures[cam_name] = (check_time, temperature_error)
+
+            self.logger.debug(f'Number of ready cameras after'
+                              f' {time.monotonic() - start_time:.1f} seconds:'
+                              f' {len(ready_times)} of {n_cameras}.')
+            if len(ready_times) == n_cameras:
                 self.logger.debug('All cameras are ready.')
                 break
-            elif i < max_attempts:
-                self.logger.debug('Not all cameras are ready yet, '
-                                  f'waiting another {sleep} seconds before checking again.')
-                time.sleep(sleep)
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # Check again when the first camera is expected to be ready
+            delay = min(min(delays), remaining)
+            self.logger.debug('Not all cameras are ready yet, '
+                              f'waiting another {delay:.1f} seconds before checking again.')
+            with self.efficiency.timing('waiting'):
+                time.sleep(delay)
 
         # Remove cameras that didn't become ready in time
         # This must be done outside of the main loop to avoid a RuntimeError
-        for cam_name in cameras_to_drop:
+        for cam_name in list(self.cameras.keys()):
+            if cam_name in ready_times:
+                continue
+            msg = f'Timed out while waiting for {cam_name} to be ready.'
+
+            # Raise PanError if we need all cameras
+            if require_all_cameras:
+                raise error.PanError(msg)
+
+            # Drop the camera if we don't need all cameras
+            self.logger.error(msg)
             self.logger.debug(f'Removing {cam_name} from {self} for not being ready.')
             self.remove_camera(cam_name)
 
         # Raise a `PanError` if no cameras are ready.
-        if num_cameras_ready == 0:
+        if not ready_times:
             raise error.PanError('No cameras ready after maximum attempts reached.')
 
+        return ready_times
+
 ##########################################################################
 # Private Methods
 ##########################################################################
 
+    def _apply_offset(self, observation, image_id, sequence, submit_time, future,
+                      background=True):
+        """Record the result of an image analysis run in a worker process.
+
+        Results for an observation other than the current one are stale & ignored, as are results
+        that finish after the result of a later analysis has been recorded. If `background` is
+        True the analysis ran in parallel with the state machine.
+        """
+        if future.cancelled():
+            return
+        try:
+            offset_info = future.result()
+        except error.SolveError:
+            self.logger.warning(f"Can't solve field of {image_id}, skipping")
+            return
+        except Exception as err:
+            self.logger.warning(f'Problem in analyzing {image_id}: {err!r}')
+            return
+        duration = time.monotonic() - submit_time
+        if background:
+            # Serial mode would have blocked the state machine for all of this time
+            self.efficiency.record('solving', duration, background=True)
+            self.efficiency.record('solving_saved', duration, background=True)
+        self.logger.debug(f'Analysis of {image_id} done after {duration:.1f} seconds'
+                          f'{" in the background" if background else ""}.')
+        with self._offset_lock:
+            if observation is not self.current_observation or \
+                    observation is not self._offset_observation:
+                self.logger.debug(f'Ignoring offset of {image_id} from a previous observation.')
+                return
+            if sequence <= self._offset_applied_sequence:
+                self.logger.debug(f'Ignoring offset of {image_id}, a later one is recorded.')
+                return
+            self._offset_applied_sequence = sequence
+            self.current_offset_info = offset_info
+
+        self.logger.debug(f'Offset Info: {offset_info}')
+        self.db.insert('offset_info', {
+            'image_id': image_id,
+            'd_ra': offset_info.delta_ra.value,
+            'd_dec': offset_info.delta_dec.value,
+            'magnitude': offset_info.magnitude.value,
+            'unit': 'arcsec',
+        })
+
+    def _set_camera_cooling(self, enabled):
+        """Enable or disable cooling of all the cooled cameras concurrently."""
+        def set_cooling(cam):
+            if cam.is_cooled_camera:
+                cam.cooling_enabled = enabled
+
+        futures = {cam_name: self.camera_executor.submit(set_cooling, cam)
+                   for cam_name, cam in self.cameras.items()}
+        wait(futures.values())
+        for cam_name, future in futures.items():
+            try:
+                future.result()
+            except Exception as err:
+                self.logger.error(f'Unable to set cooling of {cam_name} to {enabled}: {err!r}')
+
+    def _camera_readiness(self, cam):
+        """Check whether a camera is ready.
+
+        Returns:
+            tuple: True if the camera is ready & how far the camera's temperature is from being
+                within tolerance of its target in degrees Celsius, or None if unknown.
+        """
+        try:
+            if cam.is_ready:
+                return True, None
+            if not cam.is_cooled_camera:
+                return False, None
+            temperature = get_quantity_value(cam.temperature, u.Celsius)
+            target = get_quantity_value(cam.target_temperature, u.Celsius)
+            tolerance = get_quantity_value(cam.temperature_tolerance, u.Celsius)
+        except Exception as err:
+            self.logger.warning(f'Unable to check whether {cam.name} is ready: {err!r}')
+            return False, None
+        return False, abs(temperature - target) - tolerance
+
+    def _camera_ready_delay(self, previous, current, min_sleep, max_sleep):
+        """Estimate the time until a camera is ready from two temperature measurements.
+
+        Args:
+            previous (tuple|None): Time & temperature error of the previous check, if any.
+            current (tuple): Time & temperature error of the current check.
+            min_sleep (float): Minimum delay in seconds.
+            max_sleep (float): Maximum delay in seconds.
+
+        Returns:
+            float: The delay in seconds until the camera should be checked again.
+        """
+        # Check again soon to measure the rate the temperature is converging
+        if previous is None:
+            return min_sleep
+        (previous_time, previous_error), (current_time, current_error) = previous, current
+        if previous_error is None or current_error is None or current_error >= previous_error:
+            return max_sleep
+        rate = (previous_error - current_error) / (current_time - previous_time)
+        return min(max(current_error / rate, min_sleep), max_sleep)
+
     def _create_scheduler(self):
         """ Sets up the scheduler that will be used by the observatory """
 
@@ -586,164 +1014,245 @@ class HuntsmanObservatory(Observatory):
 
     def _take_autoflats(self, cameras, observation, safety_func, tolerance=0.05,
                         target_scaling=0.17, bias=32, min_exptime=1*u.second,
-                        max_exptime=60*u.second, max_num_exposures=10, max_attempts=20, **kwargs):
+                        max_exptime=60*u.second, max_num_exposures=10, max_attempts=20,
+                        estimator=None, safety_interval=10, slew_tolerance=1*u.degree,
+                        **kwargs):
         """Take flat fields iteratively by automatically estimating exposure times.
 
+        Each camera runs its own expose, measure & adjust loop concurrently, so cameras that need
+        short exposures don't wait for cameras that need long ones. The telescope is slewed to the
+        flat field once, before the loops start, & the safety checks are shared by the loops.
+
+        The loops share `observation`. This is safe as the cameras only read it: the filenames
+        & exposure numbers of the flat fields are given to `take_observation`, so it doesn't use
+        the observation's exposure list.
+
         Args:
             cameras (dict): Dict of camera name: Camera pairs.
             filter_names (dict): Dict of filter name for each camera.
             safety_func (func): Boolean function that returns True only if safe to continue.
+            estimator (dict, optional): Keyword arguments for huntsman.pocs.utils.flats.frame_stats
+                selecting & configuring the flat level estimator, e.g. `{'estimator': 'histogram',
+                'stride': 4}`. Default `None` uses sigma_clipped_stats on every pixel.
+            safety_interval (float, optional): Minimum time in seconds between calls to
+                `safety_func`, default 10.
+            slew_tolerance (float|Quantity, optional): The slew to the flat field is skipped if the
+                mount is already pointing within this distance of it, default 1 degree.
         """
-        # Get the target counts and tolerance for each camera
-        target_counts = {}
-        counts_tolerance = {}
-        for cam_name, cam in cameras.items():
-            try:
-                bit_depth = cam.bit_depth.to_value(u.bit)
-            except NotImplementedError:
-                self.logger.debug(f'No bit_depth property for {cam_name}. Using 16.')
-                bit_depth = 16
-            target_counts[cam_name] = target_scaling * 2**bit_depth
-            counts_tolerance[cam_name] = tolerance * 2**bit_depth
-            self.logger.debug(f'Target counts for {cam_name}: '
-                              f'{target_counts[cam_name]}±{counts_tolerance[cam_name]}.')
-
-        # Setup containers with initial values
+        stats_kwargs = {'bias': bias}
+        if estimator is not None:
+            stats_kwargs.update(estimator)
+
+        # Slew to the flat field once for all cameras
+        self._slew_to_flat_field(observation, tolerance=slew_tolerance)
+
+        # Shared by the camera loops. Once it is no longer safe all the loops stop.
+        stop_event = Event()
+        safety_lock = Lock()
+        header_lock = Lock()
+        last_safety_check = None
+
+        def is_safe():
+            nonlocal last_safety_check
+            with safety_lock:
+                if stop_event.is_set():
+                    return False
+                now = time.monotonic()
+                if last_safety_check is None or now - last_safety_check >= safety_interval:
+                    last_safety_check = now
+                    if not safety_func():
+                        self.logger.info('Stopping flat-fielding as no longer safe.')
+                        stop_event.set()
+                        return False
+                return True
+
+        start_time = time.monotonic()
         exptimes = {cam_name: [1. * u.second] for cam_name in cameras.keys()}
-        finished = {cam_name: False for cam_name in cameras.keys()}
         n_good_exposures = {cam_name: 0 for cam_name in cameras.keys()}
+        with ThreadPoolExecutor(max_workers=max(len(cameras), 1)) as executor:
+            futures = {cam_name: executor.submit(
+                self._autoflat_camera_loop, cam_name, cam, observation,
+                exptimes=exptimes[cam_name], n_good_exposures=n_good_exposures,
+                is_safe=is_safe, stop_event=stop_event, header_lock=header_lock,
+                stats_kwargs=stats_kwargs, tolerance=tolerance, target_scaling=target_scaling,
+                min_exptime=min_exptime, max_exptime=max_exptime,
+                max_num_exposures=max_num_exposures, max_attempts=max_attempts, **kwargs)
+                for cam_name, cam in cameras.items()}
+        for cam_name, future in futures.items():
+            try:
+                future.result()
+            except Exception as err:
+                self.logger.error(f'Error while flat-fielding with {cam_name}: {err!r}')
 
-        # Loop until conditions are met to finish flat-fielding
-        for attempt_number in range(max_attempts):
+        self.twilight_model.save()
 
-            if all(finished.values()):
-                self.logger.info(f'All cameras have finished flat-fielding in'
-                                 f' {observation.filter_name} filter.')
-                break
+        elapsed_minutes = (time.monotonic() - start_time) / 60
+        n_good = sum(n_good_exposures.values())
+        self.logger.info(f'Finished flat-fielding in {observation.filter_name} filter:'
+                         f' {n_good} acceptable flat-fields from {len(cameras)} cameras in'
+                         f' {elapsed_minutes:.1f} minutes'
+                         f' ({n_good / max(elapsed_minutes, 1e-3):.1f} per minute).')
 
-            if not safety_func():
-                self.logger.info('Stopping flat-fielding as no longer safe.')
-                break
+        # Return the exposure times
+        return exptimes
 
-            # Get the FITS headers with a common start time
-            start_time = utils.current_time()
-            fits_headers = self.get_standard_headers(observation=observation)
-            fits_headers['start_time'] = utils.flatten_time(start_time)
+    def _autoflat_camera_loop(self, cam_name, cam, observation, exptimes, n_good_exposures,
+                              is_safe, stop_event, header_lock, stats_kwargs, tolerance,
+                              target_scaling, min_exptime, max_exptime, max_num_exposures,
+                              max_attempts, **kwargs):
+        """Expose, measure & adjust loop of a single camera, see `_take_autoflats`.
 
-            # Take the flat field observations (blocking)
-            current_exptimes = {c: exptimes[c][-1] for c in cameras.keys() if not finished[c]}
-            # Only cameras with successful exposures are kept in camera_events
-            camera_events = self._take_flat_observation(current_exptimes, observation,
-                                                        fits_headers=fits_headers, **kwargs)
-
-            # Check whether each camera has finished
-            all_too_bright = True
-            all_too_faint = True
-            for cam_name, meta in camera_events.items():
-                current_exptime = current_exptimes[cam_name]
-
-                # Calculate mean counts of last image
-                mean_counts = self._autoflat_mean_counts(meta['filename'], bias)
-                self.logger.debug(f'Mean flat-field counts for {cam_name} following'
-                                  f' {current_exptime} exposure: {mean_counts:.0f}.'
-                                  f' Target counts: {target_counts[cam_name]:.0f}.')
-
-                # Check if the current exposure is good enough to keep
-                max_counts = target_counts[cam_name] + counts_tolerance[cam_name]
-                min_counts = target_counts[cam_name] - counts_tolerance[cam_name]
-                self.logger.debug(f'Valid flat-field counts range for {cam_name}: '
-                                  f'{min_counts:.0f}, {max_counts:.0f}.')
-
-                is_too_bright = mean_counts > max_counts
-                is_too_faint = mean_counts < min_counts
-                all_too_bright &= is_too_bright
-                all_too_faint &= is_too_faint
-                if is_too_bright:
-                    self.logger.debug(f'Counts too high for flat-field'
-                                      f' image on {cam_name}: {mean_counts:.0f}>{max_counts:.0f}.')
-                elif is_too_faint:
-                    self.logger.debug(f'Counts too low for flat-field'
-                                      f' image on {cam_name}: {mean_counts:.0f}<{min_counts:.0f}.')
-                    # TODO Need to prevent NGAS push...
-                    # os.remove(meta['filename'])
-                else:
-                    n_good_exposures[cam_name] += 1
-                self.logger.debug(f'Current acceptable flat-field exposures for {cam_name} '
-                                  f'in {observation.filter_name} filter after {attempt_number+1} '
-                                  f'attempts: {n_good_exposures[cam_name]} of {max_num_exposures}.')
-
-                # Check if we have enough good flats for this camera
-                if n_good_exposures[cam_name] >= max_num_exposures:
-                    self.logger.debug('Enough acceptable flat-field exposures acquired for '
-                                      f'{cam_name} in {observation.filter_name} filter.')
-                    finished[cam_name] = True
-                    continue
+        Args:
+            exptimes (list): The camera's list of exposure times, appended to in place.
+            n_good_exposures (dict): Dict of camera name: number of acceptable exposures, updated
+                in place.
+            is_safe (func): Shared function returning True only if safe to continue.
+            stop_event (threading.Event): Set when all the loops should stop.
+            header_lock (threading.Lock): Serialises getting the FITS headers.
+        """
+        # Get the target counts and tolerance for the camera
+        try:
+            bit_depth = cam.bit_depth.to_value(u.bit)
+        except NotImplementedError:
+            self.logger.debug(f'No bit_depth property for {cam_name}. Using 16.')
+            bit_depth = 16
+        target_counts = target_scaling * 2**bit_depth
+        counts_tolerance = tolerance * 2**bit_depth
+        max_counts = target_counts + counts_tolerance
+        min_counts = target_counts - counts_tolerance
+        self.logger.debug(f'Target counts for {cam_name}: {target_counts}±{counts_tolerance}.')
+        self.logger.debug(f'Valid flat-field counts range for {cam_name}: '
+                          f'{min_counts:.0f}, {max_counts:.0f}.')
+
+        # Exposure times may be given as Quantities or numbers of seconds
+        min_exptime = get_quantity_value(min_exptime, u.second) * u.second
+        max_exptime = get_quantity_value(max_exptime, u.second) * u.second
+        exptimes[-1] = get_quantity_value(exptimes[-1], u.second) * u.second
+
+        # Start with the exposure time predicted by the twilight model, if there is one
+        initial_exptime = self.twilight_model.predict_exptime(
+            cam_name, observation.filter_name, target_counts, utils.current_time())
+        if initial_exptime is not None:
+            exptimes[-1] = min(max(round(initial_exptime.to_value(u.second)) * u.second,
+                                   min_exptime), max_exptime)
+            self.logger.debug(f'Initial flat-field exposure time for {cam_name} from twilight'
+                              f' model: {exptimes[-1]}.')
+
+        n_good_exposures[cam_name] = 0
+        for attempt_number in range(max_attempts):
 
-                # Calculate next exposure time
-                elapsed_time = (utils.current_time() - start_time).sec
-                next_exptime = self._autoflat_next_exptime(
-                        current_exptime, elapsed_time, target_counts[cam_name], mean_counts)
-                self.logger.debug('Suggested flat-field exposure time for '
-                                  f'{cam_name}: {next_exptime}.')
-
-                # Check the next exposure time is within limits
-                if next_exptime >= max_exptime:
-                    self.logger.debug(f'Suggested flat-field exposure time for {cam_name}'
-                                      f' is too long: {next_exptime}.')
-                    if not self.past_midnight:
-                        finished[cam_name] = True  # It's getting darker, so finish
-                        self.logger.debug('Premature termination of flat-field exposures for '
-                                          f'{cam_name} in {observation.filter_name}.')
-                        continue
-                    next_exptime = max_exptime
-                elif next_exptime < min_exptime:
-                    self.logger.debug(f'Suggested flat-field exposure time for {cam_name}'
-                                      f' is too short: {next_exptime}.')
-                    if self.past_midnight:
-                        finished[cam_name] = True  # It's getting lighter, so finish
-                        self.logger.debug('Premature termination of flat-field exposures for '
-                                          f'{cam_name} in {observation.filter_name}.')
-                        continue
-                    next_exptime = min_exptime
+            if not is_safe():
+                self.logger.info(f'Stopping flat-fielding with {cam_name} as no longer safe.')
+                return
 
-                # Update the next exposure time
-                exptimes[cam_name].append(next_exptime)
+            # Get the FITS headers
+            with header_lock:
+                start_time = utils.current_time()
+                fits_headers = self.get_standard_headers(observation=observation)
+            fits_headers['start_time'] = utils.flatten_time(start_time)
 
-            # Check if all the exposures in this loop are too bright
-            if self.past_midnight:
-                if all_too_faint:
-                    self.logger.debug('All flat-field exposures are too faint. '
-                                      'Waiting 30 seconds...')
-                    time.sleep(30)
+            # Take the flat field observation (blocking)
+            current_exptime = exptimes[-1]
+            camera_events = self._take_flat_observation(
+                {cam_name: current_exptime}, observation, fits_headers=fits_headers,
+                stats=stats_kwargs, slew=False, exp_num=attempt_number, **kwargs)
+            if cam_name not in camera_events:
+                continue
+            meta = camera_events[cam_name]
+
+            # Calculate mean counts of last image
+            mean_counts = self._autoflat_mean_counts(meta['filename'], stats_kwargs,
+                                                     stats=meta['stats'])
+            self.logger.debug(f'Mean flat-field counts for {cam_name} following'
+                              f' {current_exptime} exposure: {mean_counts:.0f}.'
+                              f' Target counts: {target_counts:.0f}.')
+
+            # Update the twilight model, unless the image is close to saturation
+            if 1 < mean_counts < 0.8 * 2**bit_depth:
+                self.twilight_model.add_measurement(
+                    cam_name, observation.filter_name, start_time + current_exptime / 2,
+                    mean_counts / current_exptime.to_value(u.second))
+
+            # Check if the current exposure is good enough to keep
+            is_too_bright = mean_counts > max_counts
+            is_too_faint = mean_counts < min_counts
+            if is_too_bright:
+                self.logger.debug(f'Counts too high for flat-field'
+                                  f' image on {cam_name}: {mean_counts:.0f}>{max_counts:.0f}.')
+            elif is_too_faint:
+                self.logger.debug(f'Counts too low for flat-field'
+                                  f' image on {cam_name}: {mean_counts:.0f}<{min_counts:.0f}.')
+                # TODO Need to prevent NGAS push...
+                # os.remove(meta['filename'])
             else:
-                if all_too_bright:
-                    self.logger.debug('All flat-field exposures are too bright. '
-                                      'Waiting 30 seconds...')
-                    time.sleep(30)
-
-            if attempt_number == max_attempts-1:
-                self.logger.debug('Max attempts have been reached for flat-fielding '
-                                  f'in {observation.filter_name} filter. Aborting.')
-
-        # Return the exposure times
-        return exptimes
+                n_good_exposures[cam_name] += 1
+            self.logger.debug(f'Current acceptable flat-field exposures for {cam_name} '
+                              f'in {observation.filter_name} filter after {attempt_number+1} '
+                              f'attempts: {n_good_exposures[cam_name]} of {max_num_exposures}.')
+
+            # Check if we have enough good flats for this camera
+            if n_good_exposures[cam_name] >= max_num_exposures:
+                self.logger.debug('Enough acceptable flat-field exposures acquired for '
+                                  f'{cam_name} in {observation.filter_name} filter.')
+                return
 
-    def _autoflat_mean_counts(self, filename, bias, min_counts=1):
+            # Calculate next exposure time
+            elapsed_time = (utils.current_time() - start_time).sec
+            next_exptime = self._autoflat_next_exptime(
+                    current_exptime, elapsed_time, target_counts, mean_counts,
+                    cam_name=cam_name, filter_name=observation.filter_name)
+            self.logger.debug('Suggested flat-field exposure time for '
+                              f'{cam_name}: {next_exptime}.')
+
+            # Check the next exposure time is within limits
+            if next_exptime >= max_exptime:
+                self.logger.debug(f'Suggested flat-field exposure time for {cam_name}'
+                                  f' is too long: {next_exptime}.')
+                if not self.past_midnight:
+                    # It's getting darker, so finish
+                    self.logger.debug('Premature termination of flat-field exposures for '
+                                      f'{cam_name} in {observation.filter_name}.')
+                    return
+                next_exptime = max_exptime
+            elif next_exptime < min_exptime:
+                self.logger.debug(f'Suggested flat-field exposure time for {cam_name}'
+                                  f' is too short: {next_exptime}.')
+                if self.past_midnight:
+                    # It's getting lighter, so finish
+                    self.logger.debug('Premature termination of flat-field exposures for '
+                                      f'{cam_name} in {observation.filter_name}.')
+                    return
+                next_exptime = min_exptime
+
+            # Update the next exposure time
+            exptimes.append(next_exptime)
+
+            # Wait for the sky to change if the exposure was too bright or faint to adjust for
+            if (is_too_faint if self.past_midnight else is_too_bright):
+                self.logger.debug(f'Flat-field exposure on {cam_name} is too '
+                                  f'{"faint" if is_too_faint else "bright"}. '
+                                  'Waiting 30 seconds...')
+                stop_event.wait(30)
+
+        self.logger.debug(f'Max attempts have been reached for flat-fielding with {cam_name} '
+                          f'in {observation.filter_name} filter. Aborting.')
+
+    def _autoflat_mean_counts(self, filename, stats_kwargs, min_counts=1, stats=None):
         """ Read the data and calculate a clipped-mean count rate.
 
         Args:
             filename (str): The filename containing the data.
-            bias (float): The bias level to subtract from the image.
+            stats_kwargs (dict): Keyword arguments for frame_stats, including the `bias` level
+                to subtract from the image.
             min_counts (float): The minimum count rate returned by this funtion.
+            stats (dict, optional): Statistics of the bias subtracted image already calculated
+                by the camera server. If given the file is not read.
         """
-        try:
-            data = fits.getdata(filename)
-        except FileNotFoundError:
-            data = fits.getdata(filename + '.fz')
-        data = data.astype('int32')
+        if stats is None:
+            stats = frame_stats(filename, **stats_kwargs)
 
         # Calculate average counts per pixel
-        mean_counts, _, _ = stats.sigma_clipped_stats(data-bias)
+        mean_counts = stats['mean']
         if mean_counts < min_counts:
             self.logger.warning('Truncating mean flat-field counts to minimum value: '
                                 f'{mean_counts}<{min_counts}.')
@@ -751,10 +1260,29 @@ class HuntsmanObservatory(Observatory):
 
         return mean_counts
 
-    def _autoflat_next_exptime(self, previous_exptime, elapsed_time, target_counts, mean_counts):
+    def _autoflat_next_exptime(self, previous_exptime, elapsed_time, target_counts, mean_counts,
+                               cam_name=None, filter_name=None):
         """Calculate the next exposure time for the flat fields, accounting
-        for changes in sky brightness."""
+        for changes in sky brightness.
+
+        If `cam_name` & `filter_name` are given & the twilight model has been fitted for them the
+        change in sky brightness is predicted by the model. The model's prediction is corrected by
+        the ratio of the exposure time the measured counts needed to the exposure time the model
+        predicted for the previous exposure, so it tracks e.g. clouds the model can't know about.
+        Otherwise the sky brightness is assumed to change by a factor of 2 every 3 minutes."""
+        # Exposure time that would have given the target counts for the previous exposure
         exptime = previous_exptime * (target_counts / mean_counts)
+
+        if cam_name is not None:
+            now = utils.current_time()
+            model_exptime = self.twilight_model.predict_exptime(cam_name, filter_name,
+                                                                target_counts, now)
+            model_previous_exptime = self.twilight_model.predict_exptime(
+                cam_name, filter_name, target_counts, now - elapsed_time * u.second)
+            if model_exptime is not None and model_previous_exptime is not None:
+                exptime = model_exptime * (exptime / model_previous_exptime).decompose()
+                return round(exptime.to_value(u.second)) * u.second
+
         sky_factor = 2.0 ** (elapsed_time / 180.0)
         if self.past_midnight:
             exptime = exptime / sky_factor
@@ -763,7 +1291,8 @@ class HuntsmanObservatory(Observatory):
         return round(exptime.to_value(u.second)) * u.second
 
     def _take_flat_observation(self, exptimes, observation, fits_headers=None, dark=False,
-                               flat_field_timeout=120, **kwargs):
+                               flat_field_timeout=120, stats=None, slew=True, exp_num=None,
+                               slew_tolerance=1*u.degree, **kwargs):
         """
         Slew to flat field, take exposures and wait for them to complete.
         Returns a list of camera events for each camera.
@@ -771,47 +1300,107 @@ class HuntsmanObservatory(Observatory):
         args:
             exptimes: dict of camera_name: list of exposure times.
             observation: Flat field Observation object.
+            stats: optional dict of keyword arguments for frame_stats. If given the distributed
+                cameras calculate the image statistics, returned in the `stats` item of each
+                camera's dict. It is None for other cameras.
+            slew: slew to the flat field first, default True. The slew is skipped for darks
+                or if the mount is already within `slew_tolerance` of the flat field.
+            exp_num: exposure number used in the filenames, default the observation's current
+                exposure number.
         """
         imtype = 'dark' if dark else 'flat'
         if fits_headers is None:
             fits_headers = self.get_standard_headers(observation=observation)
+        if exp_num is None:
+            exp_num = observation.current_exp_num
 
-        # Slew to field
-        self.logger.debug(f'Slewing to flat-field coords: {observation.field}.')
-        self.mount.set_target_coordinates(observation.field)
-        self.mount.slew_to_target()
-        self.status()  # Seems to help with reading coords
+        if slew:
+            self._slew_to_flat_field(observation, dark=dark, tolerance=slew_tolerance)
 
-        # Loop over cameras...
-        camera_events = {}
-        for cam_name, exptime in exptimes.items():
-            cam = self.cameras[cam_name]
-
-            # Create filename
+        # Create filenames
+        cameras = {cam_name: self.cameras[cam_name] for cam_name in exptimes.keys()}
+        filenames = dict()
+        for cam_name, cam in cameras.items():
             path = os.path.join(observation.directory, cam.uid, observation.seq_time)
-            filename = os.path.join(
-                path, f'{imtype}_{observation.current_exp_num:02d}.{cam.file_extension}')
+            filenames[cam_name] = os.path.join(
+                path, f'{imtype}_{exp_num:02d}.{cam.file_extension}')
 
-            # Take exposure and get event
-            exptime = exptime.to_value(u.second)
-            camera_event = cam.take_observation(observation, fits_headers, filename=filename,
-                                                exptime=exptime, dark=dark)
-            camera_events[cam_name] = {'event': camera_event, 'filename': filename}
+        # Distributed cameras can calculate the image statistics themselves
+        camera_kwargs = dict()
+        if stats is not None:
+            camera_kwargs = {cam_name: {'stats': stats} for cam_name, cam in cameras.items()
+                             if isinstance(cam, PyroCamera)}
+
+        # Take exposures and get events
+        exposure = self.expose_all(cameras, observation, exptimes, headers=fits_headers,
+                                   filenames=filenames, dark=dark, camera_kwargs=camera_kwargs)
 
         # Block until done exposing on all cameras
         timeout = max(exptimes.values()).to_value(u.second) + flat_field_timeout
         self.logger.debug(f"Waiting for flat-fields with timeout of {timeout}.")
-        if not wait_for_events([c["event"] for c in camera_events.values()], timeout=timeout,
+        if not wait_for_events(list(exposure.events.values()), timeout=timeout,
                                sleep_delay=1):
             self.logger.error("Timeout while waiting for flat fields.")
 
         # Remove camera_events that timed out, removing them from the remaining flat-fielding
-        camera_events = {cam_name: value for cam_name, value in camera_events.items(
-                         ) if value["event"].is_set()}
+        camera_events = {cam_name: {'event': event, 'filename': exposure.filenames[cam_name],
+                                    'stats': None}
+                         for cam_name, event in exposure.events.items() if event.is_set()}
+        for cam_name in camera_events.keys() & camera_kwargs.keys():
+            try:
+                camera_events[cam_name]['stats'] = cameras[cam_name].get_exposure_stats()
+            except Exception as err:
+                self.logger.warning(f'Unable to get image statistics from {cam_name}: {err!r}')
         return camera_events
 
+    def _slew_to_flat_field(self, observation, dark=False, tolerance=1*u.degree):
+        """Slew to the field of a flat field observation, unless the slew isn't needed.
+
+        Darks don't need a pointing, so the slew is skipped for them. Otherwise the slew is
+        skipped if the mount is already within `tolerance` of the field. The number of skipped
+        slews & an estimate of the time saved, from the mean duration of the slews that were
+        made, are logged.
+
+        Returns:
+            bool: True if the mount was slewed.
+        """
+        if dark:
+            reason = 'dark flat fields'
+        elif self._mount_near(observation.field.coord, tolerance):
+            reason = f'mount already within {tolerance} of {observation.field}'
+        else:
+            self.logger.debug(f'Slewing to flat-field coords: {observation.field}.')
+            start_time = time.monotonic()
+            self.mount.set_target_coordinates(observation.field)
+            self.mount.slew_to_target()
+            self.status()  # Seems to help with reading coords
+            duration = time.monotonic() - start_time
+            self._flat_slew_durations.append(duration)
+            self.efficiency.record('slewing', duration)
+            return True
+
+        self._n_flat_slews_skipped += 1
+        seconds_saved = 0
+        if self._flat_slew_durations:
+            seconds_saved = self._n_flat_slews_skipped * (sum(self._flat_slew_durations) /
+                                                          len(self._flat_slew_durations))
+        self.logger.debug(f'Not slewing to flat field: {reason}. Skipped'
+                          f' {self._n_flat_slews_skipped} slews this session, saving about'
+                          f' {seconds_saved:.0f} seconds.')
+        return False
+
+    def _mount_near(self, coord, tolerance):
+        """True if the mount is pointing within a distance of some coordinates."""
+        try:
+            current_coord = self.mount.get_current_coordinates()
+            return current_coord.separation(coord) < get_quantity_value(tolerance,
+                                                                        u.degree) * u.degree
+        except Exception as err:
+            self.logger.debug(f'Unable to compare mount position with target: {err!r}')
+            return False
+
     def _take_flat_field_darks(self, exptimes, observation, safety_func, **kwargs):
-        """Take the dark flat fields for each camera.
+        """Take the dark flat fields for each camera, except those already in the dark library.
 
         args:
             exptimes: dict of camera_name: list of exposure times.
@@ -828,9 +1417,45 @@ class HuntsmanObservatory(Observatory):
             if not next_exptimes:
                 break
 
+            # Skip darks that the dark library already has
+            temperatures = {cam_name: self._camera_temperature(self.cameras[cam_name])
+                            for cam_name in next_exptimes.keys()}
+            next_exptimes = {cam_name: exptime for cam_name, exptime in next_exptimes.items()
+                             if not self.dark_library.has_darks(self.cameras[cam_name].uid,
+                                                                exptime, temperatures[cam_name])}
+            if not next_exptimes:
+                continue
+
             # Take the exposures, break out if safety fails
             if safety_func():
-                self._take_flat_observation(next_exptimes, observation, dark=True, **kwargs)
+                camera_events = self._take_flat_observation(next_exptimes, observation,
+                                                            dark=True, **kwargs)
+                for cam_name, meta in camera_events.items():
+                    if not self._dark_written(cam_name, meta['event'], meta['filename']):
+                        continue
+                    self.dark_library.add(self.cameras[cam_name].uid, next_exptimes[cam_name],
+                                          temperatures[cam_name], meta['filename'])
+                self.dark_library.save()
             else:
                 self.logger.debug('Aborting flat-field dark observations as no longer safe.')
                 return
+
+    def _dark_written(self, cam_name, event, filename):
+        """True if a dark exposure finished & wrote its file, so it can go in the dark library.
+
+        Timed out exposures have their events set too, but leave no file.
+        """
+        if not event.is_set():
+            return False
+        if not (os.path.exists(filename) or os.path.exists(filename + '.fz')):
+            self.logger.warning(f'Dark {filename} from {cam_name} not found, not adding it to'
+                                ' the dark library.')
+            return False
+        return True
+
+    def _camera_temperature(self, cam):
+        """Sensor temperature of a camera, or None if it doesn't have a temperature sensor."""
+        try:
+            return cam.temperature
+        except NotImplementedError:
+            return None
@@ -10,6 +10,7 @@ from astropy import units as u
 from pocs.utils import error
 
 from huntsman.pocs.utils import get_own_ip
+from huntsman.pocs.utils.pyro import serializers
 
 
 def test_get_own_ip():
@@ -54,6 +55,22 @@ def test_quantity_return(test_proxy):
     assert q == 42 * u.km * u.ng / u.Ms
 
 
+@pytest.mark.parametrize("quantity, class_name",
+                         [(550 * u.nm, "astropy_quantity"),
+                          (42 * u.km * u.ng / u.Ms, "astropy_quantity"),
+                          ([1, 2, 3] * u.s, "astropy_yaml"),
+                          (float('nan') * u.deg_C, "astropy_yaml")])
+def test_quantity_serializer(quantity, class_name):
+    d = serializers.quantity_to_dict(quantity)
+    assert d["__class__"] == class_name
+    if class_name == "astropy_quantity":
+        q = serializers.dict_to_quantity(class_name, d)
+    else:
+        q = serializers.dict_to_astropy(class_name, d)
+    assert q.unit == quantity.unit
+    assert u.allclose(q, quantity, equal_nan=True)
+
+
 def test_builtin_exception(test_proxy):
     with pytest.raises(RuntimeError):
         test_proxy.raise_runtimeerror()
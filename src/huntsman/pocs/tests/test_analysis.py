@@ -0,0 +1,83 @@
+from concurrent.futures import ThreadPoolExecutor
+from threading import Event
+
+import pytest
+from astropy import units as u
+from astropy.coordinates import SkyCoord
+
+from huntsman.pocs.utils import analysis
+from huntsman.pocs.utils.analysis import AnalysisService
+
+POINTINGS = {"pointing.fits": SkyCoord(ra=10 * u.deg, dec=-30 * u.deg),
+             "image.fits": SkyCoord(ra=10 * u.deg, dec=-29.99 * u.deg)}
+
+
+@pytest.fixture
+def solves(monkeypatch):
+    """Replace plate solving with a lookup, recording the files solved."""
+    solved = list()
+    release = Event()
+    release.set()
+
+    def fake_solve_image(filename, location=None, **kwargs):
+        release.wait()
+        solved.append(filename)
+        return {"pointing": POINTINGS.get(filename), "pointing_error": None, "wcs": None}
+
+    monkeypatch.setattr(analysis, "solve_image", fake_solve_image)
+    return solved, release
+
+
+@pytest.fixture
+def service():
+    # Threads instead of processes so that plate solving can be replaced
+    service = AnalysisService()
+    service._executor = ThreadPoolExecutor(max_workers=1)
+    yield service
+    service.shutdown()
+
+
+def test_solve_cached(service, solves):
+    solved, _ = solves
+    future = service.solve("pointing.fits")
+    assert future.result(timeout=5)["pointing"] == POINTINGS["pointing.fits"]
+    assert service.solve("pointing.fits") is future
+    assert solved == ["pointing.fits"]
+
+
+def test_offset(service, solves):
+    offset = service.offset("image.fits", "pointing.fits").result(timeout=5)
+    assert offset.delta_dec.to_value(u.arcsec) == pytest.approx(36)
+    assert offset.magnitude.to_value(u.arcsec) == pytest.approx(36)
+    assert service.n_pending == 0
+
+
+def test_cancel_stale(service, solves):
+    solved, release = solves
+    release.clear()
+    running = service.solve("a.fits", key="first")
+    waiting = service.solve("b.fits", key="first")
+    # A job for a new observation cancels the stale job that hasn't started
+    current = service.solve("c.fits", key="second")
+    release.set()
+    assert waiting.cancelled()
+    assert running.result(timeout=5) is not None
+    assert current.result(timeout=5) is not None
+    assert solved == ["a.fits", "c.fits"]
+    # Cancelled solves aren't cached
+    assert service.solve("b.fits", key="second").result(timeout=5) is not None
+
+
+def test_offset_superseded(service, solves):
+    solved, release = solves
+    release.clear()
+    key = object()
+    service.solve("pointing.fits", key=key)
+    first = service.offset("first.fits", "pointing.fits", key=key)
+    # A newer offset for the same key cancels the one that hasn't started, but not the
+    # reference solve it shares
+    second = service.offset("image.fits", "pointing.fits", key=key)
+    release.set()
+    assert first.cancelled()
+    assert second.result(timeout=5).magnitude.to_value(u.arcsec) == pytest.approx(36)
+    assert solved == ["pointing.fits", "image.fits"]
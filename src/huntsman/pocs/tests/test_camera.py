@@ -10,6 +10,8 @@ import time
 import glob
 import sys
 import shutil
+from concurrent.futures import ThreadPoolExecutor
+from threading import Thread, active_count
 
 import astropy.units as u
 from astropy.io import fits
@@ -22,7 +24,9 @@ from pocs.scheduler.observation import Observation
 from pocs.utils.images import fits as fits_utils
 from pocs.utils import error
 
+from huntsman.pocs import camera as camera_module
 from huntsman.pocs.camera.pyro import Camera as PyroCamera
+from huntsman.pocs.utils.pyro.event import RemoteEvent
 
 sys.excepthook = Pyro4.util.excepthook
 
@@ -148,6 +152,50 @@ def test_is_temperature_stable(camera):
         assert not camera.is_temperature_stable
 
 
+def test_get_many(camera):
+    values = camera._proxy.get_many(["is_exposing", "is_ready"])
+    assert set(values.keys()) == {"is_exposing", "is_ready"}
+    assert values["is_ready"] == camera._proxy.get("is_ready")
+
+
+def test_refresh_state(camera):
+    camera.refresh_state()
+    hits = camera._cache.hits
+    assert not camera.is_exposing
+    assert camera._cache.hits == hits + 1
+    if camera.is_cooled_camera:
+        # Setting a property should invalidate the related cached values
+        camera.cooling_enabled = camera.cooling_enabled
+        hits = camera._cache.hits
+        camera.is_temperature_stable
+        assert camera._cache.hits == hits
+
+
+def test_property_cache(camera):
+    camera._cache.ttls["is_ready"] = 60
+    try:
+        camera._cache.invalidate()
+        hits = camera._cache.hits
+        misses = camera._cache.misses
+        is_ready = camera.is_ready
+        assert camera.is_ready == is_ready
+        assert camera._cache.hits == hits + 1
+        assert camera._cache.misses == misses + 1
+        assert camera.cache_stats["camera"] == camera._cache.stats
+    finally:
+        del camera._cache.ttls["is_ready"]
+        camera._cache.invalidate()
+
+
+def test_property_cache_stale_update(camera):
+    cache = camera._cache
+    generation = cache.generation
+    cache.invalidate("is_ready")
+    assert not cache.update({"is_ready": False}, ttl=60, generation=generation)
+    assert cache.update({"is_ready": False}, ttl=60, generation=cache.generation)
+    cache.invalidate()
+
+
 def test_exposure(camera, tmpdir):
     """
     Tests basic take_exposure functionality
@@ -176,6 +224,113 @@ def test_exposure(camera, tmpdir):
     assert header['IMAGETYP'] == 'Light Frame'
 
 
+def test_exposure_event_pushed(camera, tmpdir):
+    """
+    Tests that the end of an exposure is pushed to the client side event
+    """
+    fits_path = str(tmpdir.join('test_exposure_event_pushed.fits'))
+    exp_event = camera.take_exposure(filename=fits_path)
+    assert exp_event.is_pushed
+    assert not exp_event.is_set()
+    # Wait on the local copy of the event, should return soon after the exposure finishes.
+    assert exp_event.wait(timeout=10)
+    assert camera._proxy.event_is_set("camera")
+    assert os.path.exists(fits_path)
+
+
+def test_exposure_event_listener_dropped(camera, tmpdir):
+    """
+    Tests that the client registers its listener again if the camera server drops it
+    """
+    fits_path = str(tmpdir.join('test_exposure_event_listener_dropped.fits'))
+    camera._proxy.unregister_event_listener(camera.port)
+    heartbeat_interval = camera._exposure_event.heartbeat_interval
+    camera._exposure_event.heartbeat_interval = 0.5
+    try:
+        exp_event = camera.take_exposure(filename=fits_path)
+        assert exp_event.is_pushed
+        assert exp_event.wait(timeout=10)
+        assert camera._proxy.is_event_listener_registered(camera._event_listener.uri,
+                                                          camera.port)
+    finally:
+        camera._exposure_event.heartbeat_interval = heartbeat_interval
+
+
+def test_event_push_unreachable_listener(camera):
+    """
+    Tests that an unreachable listener doesn't hold up the camera server's RPC calls
+    """
+    camera._proxy.register_event_listener("PYRO:unreachable@localhost:1", "unreachable")
+    try:
+        start_time = time.monotonic()
+        camera._proxy.event_set("filterwheel")
+        # Pushing to the listener is retried for at least 0.3 seconds in the background
+        assert time.monotonic() - start_time < 0.3
+    finally:
+        camera._proxy.unregister_event_listener("unreachable")
+
+
+def test_exposure_event_polled_callback(camera, tmpdir):
+    """
+    Tests that callbacks of an event that isn't pushed run once polling finds it set
+    """
+    fits_path = str(tmpdir.join('test_exposure_event_polled_callback.fits'))
+    camera.take_exposure(filename=fits_path)
+    exp_event = RemoteEvent(camera._proxy, "camera")
+    assert not exp_event.is_pushed
+    called = list()
+    exp_event.add_callback(lambda: called.append(True))
+    assert not called
+    assert exp_event.wait(timeout=10)
+    assert called == [True]
+
+
+def test_exposure_stats(camera, tmpdir):
+    """
+    Tests image statistics calculated by the camera server
+    """
+    fits_path = str(tmpdir.join('test_exposure_stats.fits'))
+    exp_event = camera.take_exposure(filename=fits_path, stats={'bias': 32})
+    assert exp_event.wait(timeout=10)
+    stats = camera.get_exposure_stats()
+    assert set(stats.keys()) == {'mean', 'median', 'std'}
+    data = fits.getdata(fits_path).astype('int32') - 32
+    assert abs(stats['mean'] - data.mean()) < 5 * data.std()
+
+    # Statistics are only calculated when requested
+    camera.take_exposure(filename=str(tmpdir.join('test_no_stats.fits')), blocking=True)
+    assert camera.get_exposure_stats() is None
+
+
+def test_concurrent_proxy_use(camera, tmpdir):
+    """
+    Stress test remote calls from many threads at once while an exposure is in progress
+    """
+    fits_path = str(tmpdir.join('test_concurrent_proxy_use.fits'))
+    camera._cache.invalidate()
+
+    def poll(i):
+        for _ in range(20):
+            camera.is_exposing
+            camera._proxy.get("is_ready")
+            camera._proxy.event_state("camera")
+        return id(camera._proxy.claim())
+
+    exp_event = camera.take_exposure(filename=fits_path)
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        proxy_ids = set(executor.map(poll, range(64)))
+    # Each thread should have used its own proxy
+    assert len(proxy_ids) > 1
+    assert exp_event.wait(timeout=30)
+    assert os.path.exists(fits_path)
+    # The proxies of the exited worker threads are released by the next thread to claim one
+    proxies = set()
+    thread = Thread(target=lambda: proxies.add(camera._proxy.claim()))
+    thread.start()
+    thread.join()
+    assert camera._proxy.n_open <= active_count() + 1
+
+
 def test_exposure_blocking(camera, tmpdir):
     """
     Tests blocking take_exposure functionality. At least for now only SBIG cameras do this.
@@ -270,6 +425,40 @@ def test_exposure_moving(camera, tmpdir):
     assert not os.path.exists(fits_path_2)
 
 
+def test_filterwheel_position_cache(camera):
+    if not camera.filterwheel:
+        pytest.skip("Camera does not have a filterwheel")
+    filterwheel = camera.filterwheel
+    filterwheel._cache.ttls["position"] = 60
+    try:
+        filterwheel.position = 1
+        move_event = filterwheel.move_to(2)
+        # Read the position during the move, it mustn't be cached for after the move
+        filterwheel.position
+        move_event.wait()
+        assert filterwheel.position == 2
+    finally:
+        del filterwheel._cache.ttls["position"]
+        filterwheel._cache.invalidate()
+
+
+def test_focuser_position_cache(camera):
+    if not camera.focuser:
+        pytest.skip("Camera does not have a focuser")
+    focuser = camera.focuser
+    focuser._cache.ttls["position"] = 60
+    try:
+        move = Thread(target=focuser.move_by, args=(10,))
+        move.start()
+        # Read the position during the move, it mustn't be cached for after the move
+        focuser.position
+        move.join()
+        assert focuser.position == focuser._proxy.get("position", "focuser")
+    finally:
+        del focuser._cache.ttls["position"]
+        focuser._cache.invalidate()
+
+
 def test_exposure_timeout(camera, tmpdir, caplog):
     """
     Tests response to an exposure timeout
@@ -495,3 +684,81 @@ def test_autofocus_no_focuser(camera):
         camera.autofocus()
     camera.focuser = focuser
     assert camera.focuser.position == initial_focus
+
+
+class MockPyroCamera(object):
+    """Stands in for a distributed camera, without a camera server."""
+    released = []
+
+    def __init__(self, port, uri):
+        if uri == 'fail':
+            raise error.PanError(f"Couldn't connect to {port}")
+        if uri == 'hang':
+            time.sleep(60)
+        if uri == 'late':
+            time.sleep(3)
+        self.uid = port
+        self.name = port
+        self.is_primary = False
+
+    def release(self):
+        self.released.append(self.name)
+
+
+@pytest.fixture
+def mock_distributed_cameras(monkeypatch):
+    def set_uris(camera_uris):
+        monkeypatch.setattr(camera_module, 'list_distributed_cameras',
+                            lambda *args, **kwargs: camera_uris)
+    monkeypatch.setattr(camera_module, 'PyroCamera', MockPyroCamera)
+    monkeypatch.setattr(MockPyroCamera, 'released', [])
+    return set_uris
+
+
+def test_create_distributed_cameras(mock_distributed_cameras):
+    mock_distributed_cameras({'camera_b': 'ok', 'camera_a': 'ok'})
+    cameras = camera_module.create_distributed_cameras({'primary': 'camera_b'})
+    assert list(cameras.keys()) == ['camera_b', 'camera_a']
+    assert cameras['camera_b'].is_primary
+    assert not cameras['camera_a'].is_primary
+
+
+def test_create_distributed_cameras_failure(mock_distributed_cameras):
+    mock_distributed_cameras({'camera_a': 'ok', 'camera_b': 'fail', 'camera_c': 'ok'})
+    cameras = camera_module.create_distributed_cameras({'max_parallel_init': 2})
+    assert list(cameras.keys()) == ['camera_a', 'camera_c']
+
+
+def test_create_distributed_cameras_timeout(mock_distributed_cameras):
+    mock_distributed_cameras({'camera_a': 'hang', 'camera_b': 'ok'})
+    start_time = time.monotonic()
+    cameras = camera_module.create_distributed_cameras({'init_timeout': 2})
+    assert time.monotonic() - start_time < 10
+    assert list(cameras.keys()) == ['camera_b']
+
+
+def test_create_distributed_cameras_timeout_queued(mock_distributed_cameras):
+    # Cameras queued behind one that hangs still time out
+    mock_distributed_cameras({'camera_a': 'hang', 'camera_b': 'hang'})
+    start_time = time.monotonic()
+    cameras = camera_module.create_distributed_cameras({'init_timeout': 2,
+                                                        'max_parallel_init': 1})
+    assert time.monotonic() - start_time < 10
+    assert list(cameras.keys()) == []
+
+
+def test_create_distributed_cameras_late(mock_distributed_cameras):
+    # A camera created after timing out is released
+    mock_distributed_cameras({'camera_a': 'late', 'camera_b': 'ok'})
+    cameras = camera_module.create_distributed_cameras({'init_timeout': 1})
+    assert list(cameras.keys()) == ['camera_b']
+    deadline = time.monotonic() + 10
+    while not MockPyroCamera.released and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert MockPyroCamera.released == ['camera_a']
+
+
+def test_create_distributed_cameras_max_parallel_init(mock_distributed_cameras):
+    mock_distributed_cameras({'camera_a': 'ok', 'camera_b': 'ok'})
+    cameras = camera_module.create_distributed_cameras({'max_parallel_init': 0})
+    assert list(cameras.keys()) == ['camera_a', 'camera_b']
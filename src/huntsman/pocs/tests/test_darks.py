@@ -0,0 +1,63 @@
+import time
+
+import pytest
+from astropy import units as u
+
+from huntsman.pocs.utils.darks import DarkLibrary
+
+
+@pytest.fixture
+def library(tmpdir):
+    return DarkLibrary(str(tmpdir.join("darks.json")), temperature_bin=2, max_age=1)
+
+
+def test_add_find(library):
+    assert not library.has_darks("uid", 10, 0)
+    library.add("uid", 10 * u.second, 0.4 * u.Celsius, "dark_00.fits")
+    library.add("uid", 10, 0.6, "dark_01.fits")
+    assert len(library) == 2
+    assert [d["filename"] for d in library.find("uid", 10, 0)] == ["dark_00.fits",
+                                                                   "dark_01.fits"]
+    assert library.has_darks("uid", 10, 0, n_darks=2)
+    assert not library.has_darks("uid", 10, 0, n_darks=3)
+    assert not library.has_darks("uid", 10, 5)
+    assert not library.has_darks("uid", 20, 0)
+    assert not library.has_darks("other", 10, 0)
+
+
+def test_temperature_buckets(library):
+    # Buckets are 2 degrees wide & include their lower edge
+    library.add("uid", 10, 1.0, "dark_00.fits")
+    assert library.has_darks("uid", 10, 2.9)
+    assert not library.has_darks("uid", 10, 0.9)
+    assert not library.has_darks("uid", 10, 3.0)
+
+
+def test_no_temperature(library):
+    library.add("uid", 10, None, "dark_00.fits")
+    assert library.has_darks("uid", 10, None)
+    assert not library.has_darks("uid", 10, 0)
+
+
+def test_max_age(library):
+    library.add("uid", 10, 0, "dark_00.fits", taken_time=time.time() - 2 * 86400)
+    library.add("uid", 10, 0, "dark_01.fits")
+    assert library.has_darks("uid", 10, 0)
+    assert not library.has_darks("uid", 10, 0, n_darks=2)
+    assert library.has_darks("uid", 10, 0, n_darks=2, max_age=3 * u.day)
+    assert len(library.find("uid", 10, 0)) == 1
+
+
+def test_save_prune(library, tmpdir):
+    dark_file = tmpdir.join("dark_00.fits")
+    dark_file.write("")
+    library.add("uid", 10, 0, str(dark_file))
+    library.add("uid", 10, 0, str(tmpdir.join("missing.fits")))
+    library.add("uid", 10, 0, str(dark_file), taken_time=time.time() - 2 * 86400)
+    library.save()
+
+    new_library = DarkLibrary(library.filename, temperature_bin=2, max_age=1)
+    assert len(new_library) == 3
+    new_library.prune()
+    assert len(new_library) == 1
+    assert new_library.has_darks("uid", 10, 0)
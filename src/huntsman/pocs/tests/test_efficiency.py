@@ -0,0 +1,116 @@
+import json
+import threading
+import time
+from threading import Event
+
+import pytest
+
+from huntsman.pocs.utils.efficiency import EfficiencyTracker
+
+
+@pytest.fixture
+def tracker(tmpdir):
+    return EfficiencyTracker(directory=str(tmpdir), poll_interval=0.01)
+
+
+def test_states(tracker):
+    tracker.enter_state('slewing')
+    with tracker.timing('slewing'):
+        time.sleep(0.1)
+    time.sleep(0.05)
+    tracker.enter_state('observing')
+    tracker.record('waiting', 2)
+
+    report = tracker.report()
+    slewing = report['states']['slewing']
+    assert slewing['slewing'] == pytest.approx(0.1, abs=0.05)
+    assert slewing['total'] == pytest.approx(0.15, abs=0.05)
+    assert slewing['idle'] == pytest.approx(0.05, abs=0.05)
+    # More time recorded than spent in the state so far, so not idle
+    assert report['states']['observing']['idle'] == 0
+
+
+def test_track_event(tracker):
+    event = Event()
+    tracker.track_event(event, 'dslr.00', exptime=0.1)
+    time.sleep(0.2)
+    event.set()
+    time.sleep(0.1)
+
+    cameras = tracker.report()['cameras']
+    assert cameras['dslr.00']['exposing'] == pytest.approx(0.1)
+    assert cameras['dslr.00']['readout'] == pytest.approx(0.1, abs=0.05)
+    assert 0 < cameras['dslr.00']['shutter_open_fraction'] < 1
+    counters = tracker.counters()
+    assert counters['exposing'] == pytest.approx(0.1)
+    assert counters['elapsed'] > 0.3
+
+
+def test_track_event_shared_poller(tracker):
+    n_threads = threading.active_count()
+    events = [Event() for _ in range(5)]
+    for i, event in enumerate(events):
+        tracker.track_event(event, f'dslr.0{i}', exptime=0.1)
+    # One thread polls all the events
+    assert threading.active_count() == n_threads + 1
+    for event in events:
+        event.set()
+    time.sleep(0.1)
+    assert len(tracker.report()['cameras']) == 5
+    assert not tracker._polled
+
+
+def test_track_event_timeout(tracker):
+    event = Event()
+    tracker.track_event(event, 'dslr.00', exptime=0.1, timeout=0.1)
+    time.sleep(0.3)
+    event.set()
+    time.sleep(0.1)
+    assert 'dslr.00' not in tracker.report()['cameras']
+
+
+def test_reset_drops_stale(tracker):
+    event = Event()
+    tracker.track_event(event, 'dslr.00', exptime=0.1)
+    with tracker.timing('slewing', background=True):
+        tracker.reset()
+    event.set()
+    time.sleep(0.1)
+    report = tracker.report()
+    assert not report['cameras']
+    assert not report['background']
+
+
+def test_track_states(tracker):
+    class Machine(object):
+        state = 'sleeping'
+        before_state_change = 'before_state'
+
+    class EventData(object):
+        class transition(object):
+            dest = 'ready'
+
+    machine = Machine()
+    tracker.track_states(machine)
+    # Hooking the same machine again doesn't add another callback
+    tracker.track_states(machine)
+    assert len(machine.before_state_change) == 2
+    assert machine.before_state_change[0] == 'before_state'
+    machine.before_state_change[-1](EventData())
+    states = tracker.report()['states']
+    assert set(states.keys()) == {'sleeping', 'ready'}
+
+
+def test_save(tracker, tmpdir):
+    tracker.enter_state('observing')
+    tracker.record('exposing', 10, camera='dslr.00')
+    tracker.record('solving', 5, background=True)
+    report = tracker.save()
+    filenames = tmpdir.listdir()
+    assert len(filenames) == 1
+    with open(filenames[0]) as f:
+        assert json.load(f) == json.loads(json.dumps(report))
+    assert report['background']['solving'] == 5
+
+    tracker.reset()
+    assert not tracker.report()['cameras']
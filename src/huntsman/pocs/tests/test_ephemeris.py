@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+from astropy import units as u
+from astropy.coordinates import EarthLocation
+from astropy.time import Time
+from astroplan import Observer
+
+from huntsman.pocs.utils.ephemeris import NightEphemeris
+
+
+@pytest.fixture(scope="module")
+def observer():
+    location = EarthLocation(lon=149.13 * u.deg, lat=-31.16 * u.deg, height=1160 * u.m)
+    return Observer(location=location)
+
+
+@pytest.fixture
+def ephemeris(observer):
+    return NightEphemeris(observer, horizons=[-6, -12 * u.deg, -18])
+
+
+def test_is_dark(observer, ephemeris):
+    start_time = Time("2020-06-01T00:00:00")
+    for hours in np.arange(0, 48, 1.7):
+        time = start_time + hours * u.hour
+        for horizon in (-6, -12, -18):
+            assert ephemeris.is_dark(horizon, time) == observer.is_night(
+                time, horizon=horizon * u.deg)
+
+
+def test_past_midnight(observer, ephemeris):
+    start_time = Time("2020-06-01T00:00:00")
+    for hours in np.arange(0, 48, 1.7):
+        time = start_time + hours * u.hour
+        midnight = observer.midnight(time, which="nearest")
+        assert ephemeris.past_midnight(time) == (midnight < time)
+
+
+def test_next_crossing(observer, ephemeris):
+    time = Time("2020-06-01T06:00:00")  # Afternoon at Siding Spring
+    sunset = observer.sun_set_time(time, which="next", horizon=-12 * u.deg)
+    assert ephemeris.next_crossing(-12, time) == pytest.approx(sunset.unix, abs=60)
+    assert not ephemeris.is_dark(-12, time)
+    sunrise = observer.sun_rise_time(sunset, which="next", horizon=-12 * u.deg)
+    assert ephemeris.next_crossing(-12, sunset + 1 * u.minute) == pytest.approx(sunrise.unix,
+                                                                                abs=60)
+
+
+def test_polar_night():
+    observer = Observer(location=EarthLocation(lon=0 * u.deg, lat=-89 * u.deg))
+    ephemeris = NightEphemeris(observer)
+    # The sun never sets in the Antarctic summer or rises in the winter
+    assert not ephemeris.is_dark(-6, Time("2020-01-01T00:00:00"))
+    assert ephemeris.is_dark(-6, Time("2020-07-01T00:00:00"))
@@ -0,0 +1,49 @@
+import time
+from threading import Event, Timer
+
+from huntsman.pocs.utils.events import EventGroup, wait_for_all
+
+
+def test_event_group():
+    events = {"a": Event(), "b": Event()}
+    group = EventGroup(events)
+    assert len(group) == 2
+    assert "a" in group
+    assert not group.is_set()
+    assert not group.wait(timeout=0.01)
+    events["a"].set()
+    events["b"].set()
+    assert group.is_set()
+    assert group.wait(timeout=0.01)
+
+
+def test_wait_for_all_returns_promptly():
+    events = [Event(), Event()]
+    Timer(0.1, events[0].set).start()
+    Timer(0.2, events[1].set).start()
+    heartbeats = list()
+    start_time = time.monotonic()
+    assert wait_for_all(events, heartbeat=lambda: heartbeats.append(1), heartbeat_interval=10)
+    # Returns as soon as the last event is set, not at the next heartbeat.
+    assert time.monotonic() - start_time < 1
+    assert not heartbeats
+
+
+def test_wait_for_all_heartbeat():
+    event = Event()
+    Timer(0.35, event.set).start()
+    heartbeats = list()
+    assert wait_for_all({"a": event}, heartbeat=lambda: heartbeats.append(1),
+                        heartbeat_interval=0.1)
+    assert 2 <= len(heartbeats) <= 4
+
+
+def test_wait_for_all_timeout():
+    events = [Event(), Event()]
+    events[0].set()
+    heartbeats = list()
+    start_time = time.monotonic()
+    assert not wait_for_all(events, timeout=0.2, heartbeat=lambda: heartbeats.append(1),
+                            heartbeat_interval=0.05)
+    assert 0.2 <= time.monotonic() - start_time < 1
+    assert heartbeats
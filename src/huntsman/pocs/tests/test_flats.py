@@ -0,0 +1,45 @@
+import numpy as np
+import pytest
+from astropy.io import fits
+from astropy import stats
+
+from huntsman.pocs.utils.flats import frame_stats, get_estimator, subsample
+
+
+@pytest.fixture(scope='module')
+def flat_file(tmpdir_factory):
+    rng = np.random.default_rng(42)
+    data = rng.normal(20000, 300, size=(500, 600)).astype(np.uint16)
+    data[::37, ::41] = 2**16 - 1
+    filename = str(tmpdir_factory.mktemp('flats').join('flat.fits'))
+    fits.PrimaryHDU(data).writeto(filename)
+    return filename
+
+
+def test_subsample():
+    data = np.arange(100).reshape(10, 10)
+    assert subsample(data, stride=2).shape == (5, 5)
+    assert subsample(data, roi=0.5).shape == (6, 6)
+    assert subsample(data, stride=2, roi=0.5)[0, 0] == data[2, 2]
+
+
+def test_histogram_exact(flat_file):
+    data = fits.getdata(flat_file).astype('int32') - 32
+    mean, median, std = stats.sigma_clipped_stats(data)
+    result = frame_stats(flat_file, bias=32, estimator='histogram', stride=1)
+    assert result['mean'] == pytest.approx(mean)
+    assert result['median'] == pytest.approx(median)
+    assert result['std'] == pytest.approx(std)
+
+
+@pytest.mark.parametrize("kwargs", [{'stride': 4}, {'stride': 2, 'roi': 0.5}])
+def test_histogram_subsampled(flat_file, kwargs):
+    reference = frame_stats(flat_file, bias=32)
+    result = frame_stats(flat_file, bias=32, estimator='histogram', **kwargs)
+    assert result['mean'] == pytest.approx(reference['mean'], abs=20)
+    assert result['std'] == pytest.approx(reference['std'], rel=0.1)
+
+
+def test_unknown_estimator():
+    with pytest.raises(ValueError):
+        get_estimator('nonsense')
@@ -0,0 +1,49 @@
+import time
+
+import pytest
+from astropy import units as u
+
+from pocs.utils import error
+
+from huntsman.pocs.utils.mount import wait_for_slew
+
+
+class FakeMount(object):
+    """Slews towards its target at a constant rate, starting tracking when it arrives."""
+
+    def __init__(self, distance=10, rate=50, tracks=True):
+        self.start_time = time.monotonic()
+        self.distance = distance
+        self.rate = rate
+        self.tracks = tracks
+        self.n_polls = 0
+
+    def distance_from_target(self):
+        self.n_polls += 1
+        elapsed = time.monotonic() - self.start_time
+        return max(self.distance - self.rate * elapsed, 0) * u.degree
+
+    @property
+    def is_tracking(self):
+        return self.tracks and self.distance_from_target() == 0
+
+
+def test_wait_for_slew():
+    mount = FakeMount(distance=10, rate=50)
+    duration = wait_for_slew(mount, timeout=5)
+    # Finished within the separation limit, 0.19 s after the start
+    assert 0.18 < duration < 0.5
+    # Polled more often than once a second
+    assert mount.n_polls > 2
+
+
+def test_wait_for_slew_not_tracking():
+    mount = FakeMount(distance=1, rate=5, tracks=False)
+    duration = wait_for_slew(mount, separation_limit=0.5, timeout=5)
+    assert 0.1 < duration < 0.5
+
+
+def test_wait_for_slew_timeout():
+    mount = FakeMount(distance=10, rate=0)
+    with pytest.raises(error.Timeout):
+        wait_for_slew(mount, timeout=0.5, max_interval=0.1)
@@ -0,0 +1,141 @@
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from threading import Thread
+
+import pytest
+
+from huntsman.pocs.utils.ngas import NgasUploader
+
+
+class NgasHandler(BaseHTTPRequestHandler):
+
+    def do_POST(self):
+        self.server.headers.append(self.headers)
+        if 'Content-Length' in self.headers:
+            data = self.rfile.read(int(self.headers['Content-Length']))
+        else:
+            # Chunked transfer encoding
+            data = b""
+            while True:
+                length = int(self.rfile.readline().strip(), 16)
+                data += self.rfile.read(length)
+                self.rfile.readline()
+                if length == 0:
+                    break
+        self.server.received.append(data)
+        checksum = self.server.checksum if self.server.checksum is not None else zlib.crc32(data)
+        self.send_response(self.server.responses.pop(0) if self.server.responses else 200)
+        self.end_headers()
+        self.wfile.write(f'<FileStatus Checksum="{checksum}" ChecksumPlugIn="crc32"/>'.encode())
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def ngas_server():
+    server = HTTPServer(('localhost', 0), NgasHandler)
+    server.received = []
+    server.headers = []
+    server.responses = []
+    server.checksum = None
+    Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def wait_for(condition, timeout=10):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+
+
+def test_upload(ngas_server, tmpdir):
+    filename = tmpdir.join("image.fits")
+    filename.write_binary(b"image data")
+    uploader = NgasUploader('localhost', str(tmpdir.join("journal.sqlite")),
+                            port=ngas_server.server_port, chunk_size=3)
+    uploader.enqueue(str(filename), "image.fits")
+    wait_for(lambda: uploader.queue_depth == 0)
+    uploader.stop()
+    assert ngas_server.received == [b"image data"]
+    assert uploader.metrics["n_uploaded"] == 1
+    assert uploader.metrics["bytes_uploaded"] == len(b"image data")
+
+
+def test_content_length(ngas_server, tmpdir):
+    filename = tmpdir.join("image.fits")
+    filename.write_binary(b"image data")
+    uploader = NgasUploader('localhost', str(tmpdir.join("journal.sqlite")),
+                            port=ngas_server.server_port, chunk_size=3)
+    uploader.enqueue(str(filename), "image.fits")
+    wait_for(lambda: uploader.queue_depth == 0)
+    uploader.stop()
+    headers = ngas_server.headers[0]
+    assert headers['Content-Length'] == str(len(b"image data"))
+    assert 'Transfer-Encoding' not in headers
+
+
+def test_retry(ngas_server, tmpdir):
+    filename = tmpdir.join("image.fits")
+    filename.write_binary(b"image data")
+    ngas_server.responses = [500]
+    uploader = NgasUploader('localhost', str(tmpdir.join("journal.sqlite")),
+                            port=ngas_server.server_port, min_backoff=0.1)
+    uploader.enqueue(str(filename), "image.fits")
+    wait_for(lambda: uploader.metrics["n_uploaded"] == 1)
+    uploader.stop()
+    assert len(ngas_server.received) == 2
+    assert uploader.queue_depth == 0
+
+
+def test_compressed_after_queued(ngas_server, tmpdir):
+    filename = tmpdir.join("image.fits")
+    uploader = NgasUploader('localhost', str(tmpdir.join("journal.sqlite")),
+                            port=ngas_server.server_port, min_backoff=0.1)
+    # The file is missing at first, e.g. while being compressed, so the push is retried.
+    uploader.enqueue(str(filename), "image.fits")
+
+    def attempts():
+        with uploader._condition:
+            return uploader._db.execute("SELECT attempts FROM pushes").fetchone()[0]
+
+    wait_for(lambda: attempts() > 0)
+    tmpdir.join("image.fits.fz").write_binary(b"compressed data")
+    wait_for(lambda: uploader.metrics["n_uploaded"] == 1)
+    uploader.stop()
+    assert ngas_server.received == [b"compressed data"]
+    assert uploader.metrics["n_failed"] == 0
+
+
+def test_journal(ngas_server, tmpdir):
+    filename = tmpdir.join("image.fits")
+    filename.write_binary(b"image data")
+    journal = str(tmpdir.join("journal.sqlite"))
+    # Queue a push without starting any workers, as if POCS stopped before it was made.
+    uploader = NgasUploader('localhost', journal, port=ngas_server.server_port, max_workers=0)
+    uploader.enqueue(str(filename), "image.fits")
+    assert uploader.queue_depth == 1
+
+    uploader = NgasUploader('localhost', journal, port=ngas_server.server_port)
+    assert uploader.queue_depth == 1
+    uploader.start()
+    wait_for(lambda: uploader.queue_depth == 0)
+    uploader.stop()
+    assert ngas_server.received == [b"image data"]
+
+
+def test_checksum_mismatch(ngas_server, tmpdir):
+    filename = tmpdir.join("image.fits")
+    filename.write_binary(b"image data")
+    ngas_server.checksum = 42
+    uploader = NgasUploader('localhost', str(tmpdir.join("journal.sqlite")),
+                            port=ngas_server.server_port, max_attempts=2, min_backoff=0.1)
+    uploader.enqueue(str(filename), "image.fits")
+    wait_for(lambda: uploader.metrics["n_failed"] == 1)
+    uploader.stop()
+    assert len(ngas_server.received) == 2
+    assert uploader.metrics["n_uploaded"] == 0
@@ -1,14 +1,24 @@
 import os
+import time
 import pytest
+from concurrent.futures import Future
+from threading import Event
+
+from astropy import units as u
 
 from pocs.core import POCS
+from pocs.scheduler.field import Field
+from pocs.scheduler.observation import Observation
 from pocs.utils.location import create_location_from_config
 from pocs.scheduler import create_scheduler_from_config
 from pocs.dome import create_dome_from_config
+from pocs.images import OffsetError
 from pocs.mount import create_mount_from_config
 
 from huntsman.pocs.camera import create_cameras_from_config
+from huntsman.pocs.core import create_pocs
 from huntsman.pocs.observatory import HuntsmanObservatory as Observatory
+from huntsman.pocs.utils.darks import DarkLibrary
 
 
 @pytest.fixture(scope='function')
@@ -60,6 +70,286 @@ def test_prepare_cameras_dropping(observatory):
     assert len(observatory.cameras) == len(camera_names)-1
 
 
+def test_prepare_cameras_ready_times(observatory):
+    """Test that the time each camera took to become ready is reported."""
+    ready_times = observatory.prepare_cameras(sleep=1, max_attempts=2)
+    assert set(ready_times.keys()) == set(observatory.cameras.keys())
+    assert all(ready_time >= 0 for ready_time in ready_times.values())
+
+
+def test_camera_ready_delay(observatory):
+    """Test the time until the next readiness check is estimated from the temperature."""
+    kwargs = {'min_sleep': 5, 'max_sleep': 60}
+    # First check, no rate yet
+    assert observatory._camera_ready_delay(None, (0, 10), **kwargs) == 5
+    # Converging at 0.5 degrees per second, 10 degrees to go
+    assert observatory._camera_ready_delay((0, 15), (10, 10), **kwargs) == 20
+    # Not converging
+    assert observatory._camera_ready_delay((0, 10), (10, 10), **kwargs) == 60
+    assert observatory._camera_ready_delay((0, None), (10, None), **kwargs) == 60
+    # Nearly there
+    assert observatory._camera_ready_delay((0, 1), (10, 0.1), **kwargs) == 5
+
+
+def test_expose_all(observatory, tmpdir, monkeypatch):
+    """Test that all cameras are started & the start skews are recorded."""
+    cameras = observatory.cameras
+    # Delay starting the exposure on one camera
+    slow_name, slow_camera = sorted(cameras.items())[0]
+    take_observation = slow_camera.take_observation
+    camera_headers = list()
+
+    def slow_take_observation(observation, headers, *args, **kwargs):
+        camera_headers.append(headers)
+        time.sleep(0.5)
+        return take_observation(observation, headers, *args, **kwargs)
+
+    monkeypatch.setattr(slow_camera, 'take_observation', slow_take_observation)
+    field = Field('Test Observation', '20h00m43.7135s +22d42m39.0645s')
+    observation = Observation(field, exptime=1 * u.second)
+    observation.seq_time = '19991231T235959'
+    filenames = {cam_name: str(tmpdir.join(f'{cam_name}.fits')) for cam_name in cameras}
+    headers = observatory.get_standard_headers(observation=observation)
+    original_headers = headers.copy()
+    exposure = observatory.expose_all(cameras, observation, 1 * u.second, headers=headers,
+                                      filenames=filenames)
+    # The caller's headers aren't modified & the dispatch time isn't a header
+    assert headers == original_headers
+    assert 'dispatch_time' not in camera_headers[0]
+    assert len(exposure) == len(cameras)
+    assert exposure.wait(timeout=30)
+    assert exposure.is_set()
+    assert set(exposure.start_skew.keys()) == set(cameras.keys())
+    assert exposure.start_skew[slow_name] >= 0.5
+    assert exposure.max_start_skew == exposure.start_skew[slow_name]
+    assert min(exposure.start_skew.values()) >= 0
+    # Commands to the cameras share one long lived thread pool
+    executor = observatory.camera_executor
+    observatory.activate_camera_cooling()
+    assert observatory.camera_executor is executor
+
+
+def test_slew_to_flat_field_skipped(observatory, monkeypatch):
+    """Test that slews to the flat field are skipped for darks & when already there."""
+    observation = observatory._create_flat_field_observation(alt=60, az=90)
+    assert not observatory._slew_to_flat_field(observation, dark=True)
+    monkeypatch.setattr(observatory, '_mount_near', lambda coord, tolerance: True)
+    assert not observatory._slew_to_flat_field(observation)
+    assert observatory._n_flat_slews_skipped == 2
+    assert not observatory._flat_slew_durations
+
+
+def test_autoflat_next_exptime(observatory, monkeypatch):
+    """Test that the twilight model's prediction is corrected by the measured counts."""
+    # Without a model the exposure time is scaled by the measured counts
+    monkeypatch.setattr(observatory.twilight_model, 'predict_exptime', lambda *args: None)
+    exptime = observatory._autoflat_next_exptime(10 * u.second, 0, 1000, 500,
+                                                 cam_name='camera', filter_name='g')
+    assert exptime == 20 * u.second
+
+    # The model predicts the sky is twice as faint now as for the previous exposure, & the
+    # previous exposure was twice as faint as the model predicted.
+    predictions = iter([20 * u.second, 10 * u.second])
+    monkeypatch.setattr(observatory.twilight_model, 'predict_exptime',
+                        lambda *args: next(predictions))
+    exptime = observatory._autoflat_next_exptime(10 * u.second, 60, 1000, 500,
+                                                 cam_name='camera', filter_name='g')
+    assert exptime == 40 * u.second
+
+
+def test_flat_field_darks_timeout(observatory, monkeypatch, tmpdir):
+    """Test that timed out flat field darks, which leave no file, aren't catalogued."""
+    library = DarkLibrary(str(tmpdir.join('dark_library.json')))
+    monkeypatch.setattr(observatory, '_dark_library', library)
+    cam_name = sorted(observatory.cameras.keys())[0]
+    written = tmpdir.join('dark_written.fits')
+    written.write_binary(b'dark')
+    filenames = {1: str(written), 2: str(tmpdir.join('dark_timed_out.fits'))}
+
+    def take_flat_observation(exptimes, observation, **kwargs):
+        # Timed out exposures have their events set by the timeout response
+        event = Event()
+        event.set()
+        filename = filenames[exptimes[cam_name].to_value(u.second)]
+        return {cam_name: {'event': event, 'filename': filename, 'stats': None}}
+
+    monkeypatch.setattr(observatory, '_take_flat_observation', take_flat_observation)
+    exptimes = {cam_name: [1 * u.second, 2 * u.second]}
+    observation = observatory._create_flat_field_observation(alt=60, az=90)
+    observatory._take_flat_field_darks(exptimes, observation, lambda: True)
+
+    darks = [dark['filename'] for darks in library._index.values() for dark in darks]
+    assert darks == [str(written)]
+
+
+def _autoflat_simulation(observatory, monkeypatch, target_exptimes, time_scale=0.05):
+    """Simulate flat fields that reach the target counts at a different exposure time for
+    each camera, returning a list of (camera name, exposure time, end time) of the exposures."""
+    monkeypatch.setattr(type(observatory), 'past_midnight', False)
+    monkeypatch.setattr(observatory, '_slew_to_flat_field', lambda *args, **kwargs: False)
+    monkeypatch.setattr(observatory.twilight_model, 'predict_exptime', lambda *args: None)
+    monkeypatch.setattr(observatory.twilight_model, 'add_measurement', lambda *args: None)
+    monkeypatch.setattr(observatory.twilight_model, 'save', lambda: None)
+
+    target_counts = dict()
+    for cam_name in target_exptimes.keys():
+        try:
+            bit_depth = observatory.cameras[cam_name].bit_depth.to_value(u.bit)
+        except NotImplementedError:
+            bit_depth = 16
+        target_counts[cam_name] = 0.17 * 2**bit_depth
+
+    exposures = list()
+    start_time = time.monotonic()
+
+    def take_flat_observation(exptimes, observation, **kwargs):
+        (cam_name, exptime), = exptimes.items()
+        exptime = exptime.to_value(u.second)
+        time.sleep(exptime * time_scale)
+        exposures.append((cam_name, exptime, time.monotonic() - start_time))
+        mean = target_counts[cam_name] * exptime / target_exptimes[cam_name]
+        return {cam_name: {'event': None, 'filename': None, 'stats': {'mean': mean}}}
+
+    monkeypatch.setattr(observatory, '_take_flat_observation', take_flat_observation)
+    return exposures
+
+
+def test_take_autoflats_independent(observatory, monkeypatch):
+    """Test that the exposure times of each camera converge separately."""
+    fast_name, slow_name = sorted(observatory.cameras.keys())[:2]
+    exposures = _autoflat_simulation(observatory, monkeypatch, {fast_name: 2, slow_name: 8})
+    cameras = {cam_name: observatory.cameras[cam_name] for cam_name in (fast_name, slow_name)}
+    observation = observatory._create_flat_field_observation(alt=60, az=90)
+    exptimes = observatory._take_autoflats(cameras, observation, lambda: True,
+                                           max_num_exposures=3)
+
+    assert [t.to_value(u.second) for t in exptimes[fast_name]] == [1, 2, 2, 2]
+    assert [t.to_value(u.second) for t in exptimes[slow_name]] == [1, 8, 8, 8]
+    # The fast camera doesn't wait for the slow camera's exposures, so it finishes all of its
+    # flat fields before the slow camera finishes its second. In lockstep it would take as
+    # long as the slow camera.
+    end_times = {cam_name: [end for name, _, end in exposures if name == cam_name]
+                 for cam_name in cameras.keys()}
+    assert end_times[fast_name][-1] < end_times[slow_name][1]
+    print(f'Flat fields finished after {end_times[fast_name][-1]:.2f}s on {fast_name} &'
+          f' {end_times[slow_name][-1]:.2f}s on {slow_name}.')
+
+
+def test_take_autoflats_stop(observatory, monkeypatch):
+    """Test that all the camera loops stop once it is no longer safe, without waiting for the
+    sky to change."""
+    bright_name, other_name = sorted(observatory.cameras.keys())[:2]
+    # The bright camera's flat fields are too bright at the minimum exposure time, so it
+    # waits for the sky to get darker.
+    exposures = _autoflat_simulation(observatory, monkeypatch, {bright_name: 0.1, other_name: 8})
+    cameras = {cam_name: observatory.cameras[cam_name] for cam_name in (bright_name, other_name)}
+    observation = observatory._create_flat_field_observation(alt=60, az=90)
+    safety_checks = list()
+
+    def safety_func():
+        safety_checks.append(time.monotonic())
+        return len(safety_checks) < 4
+
+    start_time = time.monotonic()
+    observatory._take_autoflats(cameras, observation, safety_func, safety_interval=0,
+                                max_num_exposures=10)
+    assert time.monotonic() - start_time < 10
+    assert len(safety_checks) == 4
+    # Each loop stops at its next safety check
+    assert len(exposures) <= 3
+
+
+def test_analyze_recent_serial(observatory, monkeypatch):
+    """Test that serial mode waits for the analysis service & records the offset."""
+    field = Field('Test Observation', '20h00m43.7135s +22d42m39.0645s')
+    observation = Observation(field, exptime=1 * u.second)
+    observation.exposure_list['image_1'] = 'image_1.fits'
+    observatory.current_observation = observation
+    offset = OffsetError(1 * u.arcsec, 1 * u.arcsec, 1.4 * u.arcsec)
+
+    class Analysis(object):
+        def offset(self, filename, reference_filename, key=None):
+            assert key is observation
+            future = Future()
+            future.set_result(offset)
+            return future
+
+    inserted = list()
+    monkeypatch.setitem(observatory.config, 'analysis', {'mode': 'serial'})
+    monkeypatch.setattr(observatory, '_analysis', Analysis())
+    monkeypatch.setattr(observatory.db, 'insert',
+                        lambda collection, item: inserted.append(item['image_id']))
+    assert observatory.analyze_recent() is offset
+    assert observatory.current_offset_info is offset
+    assert inserted == ['image_1']
+
+
+def test_analyze_recent_serial_timeout(observatory, monkeypatch):
+    """Test that serial mode only waits briefly & slow analyses finish in the background."""
+    field = Field('Test Observation', '20h00m43.7135s +22d42m39.0645s')
+    observation = Observation(field, exptime=1 * u.second)
+    observation.exposure_list['image_1'] = 'image_1.fits'
+    observatory.current_observation = observation
+    offset = OffsetError(1 * u.arcsec, 1 * u.arcsec, 1.4 * u.arcsec)
+    future = Future()
+
+    class Analysis(object):
+        def offset(self, filename, reference_filename, key=None):
+            return future
+
+    inserted = list()
+    monkeypatch.setitem(observatory.config, 'analysis', {'mode': 'serial', 'timeout': 0.1})
+    monkeypatch.setattr(observatory, '_analysis', Analysis())
+    monkeypatch.setattr(observatory.db, 'insert',
+                        lambda collection, item: inserted.append(item['image_id']))
+    assert observatory.analyze_recent() is None
+    assert not future.cancelled()
+    future.set_result(offset)
+    assert observatory.current_offset_info is offset
+    assert inserted == ['image_1']
+
+
+def test_apply_offset_stale(observatory):
+    """Test that pipelined analysis results from a previous observation are ignored."""
+    future = Future()
+    future.set_result('offset')
+    observatory.current_offset_info = None
+    observatory._apply_offset(object(), 'image_id', 1, time.monotonic(), future)
+    assert observatory.current_offset_info is None
+
+
+def test_apply_offset_out_of_order(observatory, monkeypatch):
+    """Test that pipelined analysis results finishing out of order don't replace later ones."""
+    field = Field('Test Observation', '20h00m43.7135s +22d42m39.0645s')
+    observation = Observation(field, exptime=1 * u.second)
+    observatory.current_observation = observation
+    observatory._offset_observation = observation
+    observatory._offset_sequence = 2
+    observatory._offset_applied_sequence = 0
+    inserted = list()
+    monkeypatch.setattr(observatory.db, 'insert',
+                        lambda collection, item: inserted.append(item['image_id']))
+
+    offset = OffsetError(1 * u.arcsec, 1 * u.arcsec, 1.4 * u.arcsec)
+    future = Future()
+    future.set_result(offset)
+    observatory._apply_offset(observation, 'image_2', 2, time.monotonic(), future)
+    observatory._apply_offset(observation, 'image_1', 1, time.monotonic(), future)
+    assert observatory.current_offset_info is offset
+    assert inserted == ['image_2']
+    # The time the pipelined analyses saved the state machine is recorded
+    assert observatory.efficiency.report()['background']['solving_saved'] > 0
+
+
+def test_create_pocs(config_with_simulated_stuff, observatory):
+    """Test that the efficiency tracker follows the states of POCS made by create_pocs."""
+    pocs = create_pocs(observatory, run_once=True, config=config_with_simulated_stuff)
+    try:
+        assert pocs.state in observatory.efficiency.report()['states']
+    finally:
+        pocs.power_down()
+
+
 def test_bad_observatory(config):
     huntsman_pocs = os.environ['HUNTSMAN_POCS']
     try:
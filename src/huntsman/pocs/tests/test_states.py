@@ -3,6 +3,7 @@ import pytest
 
 from pocs.core import POCS
 from pocs import utils
+from pocs.utils import load_module
 from pocs.utils.location import create_location_from_config
 from pocs.scheduler import create_scheduler_from_config
 from pocs.dome import create_dome_from_config
@@ -231,3 +232,80 @@ def test_morning_coarse_focusing_parking(pocs):
             assert pocs.is_dark(horizon='flat')
         pocs.goto_next_state()
         assert pocs.state == state
+
+
+def mock_twilight(pocs, monkeypatch, is_dark, crossings, is_safe=True, past_midnight=True):
+    """Mock the sun's position, returning the list the delays slept for are appended to.
+
+    `is_dark` is a dict of horizon: list of successive results of `is_dark` for the horizon, &
+    `crossings` a dict of horizon: seconds until the sun next crosses it.
+    """
+    monkeypatch.setenv('POCSTIME', '2020-04-29 19:30:00')
+    monkeypatch.setattr(pocs, '_safe_delay', 600)
+    monkeypatch.setattr(pocs, 'is_safe', lambda *args, **kwargs: is_safe)
+    monkeypatch.setattr(pocs, 'is_weather_safe', lambda *args, **kwargs: is_safe)
+    monkeypatch.setattr(type(pocs.observatory), 'past_midnight', past_midnight)
+    is_dark = {horizon: iter(results) for horizon, results in is_dark.items()}
+    monkeypatch.setattr(pocs, 'is_dark',
+                        lambda horizon='observe', **kwargs: next(is_dark[horizon]))
+    horizons = {pocs.config['location'][f'{horizon}_horizon']: horizon
+                for horizon in ('flat', 'focus')}
+    now = utils.current_time().unix
+
+    def next_crossing(horizon, *args, **kwargs):
+        seconds = crossings.get(horizons[horizon])
+        return None if seconds is None else now + seconds
+
+    monkeypatch.setattr(pocs.observatory.ephemeris, 'next_crossing', next_crossing)
+    delays = list()
+    monkeypatch.setattr(pocs, 'sleep', lambda delay=None, **kwargs: delays.append(delay))
+    return delays
+
+
+@pytest.mark.parametrize('seconds_to_crossing,delay', [(30, 30), (7200, 600), (-10, 0),
+                                                       (None, 600)])
+def test_wait_for_twilight_sleep(pocs, monkeypatch, seconds_to_crossing, delay):
+    """Test that the wait for morning twilight sleeps until the focus horizon is crossed, but
+    not for longer than the safe delay."""
+    state = load_module('states.huntsman.twilight_flat_fielding')
+    delays = mock_twilight(pocs, monkeypatch, {'flat': [True, True], 'focus': [True, False]},
+                           {'focus': seconds_to_crossing})
+    assert state.wait_for_twilight(pocs)
+    assert delays == [pytest.approx(delay)]
+
+
+def test_wait_for_twilight_evening(pocs, monkeypatch):
+    """Test that there is no wait in the evening once the flat horizon has been crossed."""
+    state = load_module('states.huntsman.twilight_flat_fielding')
+    # The next crossing is of the focus horizon, later in the evening
+    delays = mock_twilight(pocs, monkeypatch, {'flat': [True], 'focus': [False]},
+                           {'focus': 1800}, past_midnight=False)
+    assert state.wait_for_twilight(pocs)
+    assert delays == []
+
+
+def test_wait_for_twilight_evening_early(pocs, monkeypatch):
+    """Test that the wait for evening twilight sleeps until the flat horizon is crossed."""
+    state = load_module('states.huntsman.twilight_flat_fielding')
+    delays = mock_twilight(pocs, monkeypatch, {'flat': [False, False, True], 'focus': [False]},
+                           {'flat': 1000, 'focus': 2800}, past_midnight=False)
+    assert state.wait_for_twilight(pocs)
+    # Woken to check it is still safe before the flat horizon is crossed
+    assert delays == [pytest.approx(600), pytest.approx(600)]
+
+
+def test_wait_for_twilight_morning_finished(pocs, monkeypatch):
+    """Test that there is no wait in the morning once the flat horizon has been crossed."""
+    state = load_module('states.huntsman.twilight_flat_fielding')
+    delays = mock_twilight(pocs, monkeypatch, {'flat': [False]}, {'flat': 30})
+    assert not state.wait_for_twilight(pocs)
+    assert delays == []
+
+
+def test_wait_for_twilight_unsafe(pocs, monkeypatch):
+    """Test that the wait for twilight stops without sleeping if it isn't safe."""
+    state = load_module('states.huntsman.twilight_flat_fielding')
+    delays = mock_twilight(pocs, monkeypatch, {'flat': [True], 'focus': [True]},
+                           {'focus': 30}, is_safe=False)
+    assert not state.wait_for_twilight(pocs)
+    assert delays == []
@@ -0,0 +1,64 @@
+import time
+from threading import Event
+
+from huntsman.pocs.utils.timeout import TimeoutScheduler
+
+
+def test_schedule():
+    scheduler = TimeoutScheduler()
+    event = Event()
+    scheduler.schedule(0.1, event.set)
+    assert scheduler.n_pending == 1
+    assert event.wait(timeout=5)
+    assert scheduler.n_pending == 0
+
+
+def test_order():
+    scheduler = TimeoutScheduler()
+    calls = []
+    done = Event()
+    scheduler.schedule(0.3, done.set)
+    scheduler.schedule(0.2, calls.append, 2)
+    scheduler.schedule(0.1, calls.append, 1)
+    assert done.wait(timeout=5)
+    assert calls == [1, 2]
+
+
+def test_cancel():
+    scheduler = TimeoutScheduler()
+    cancelled = Event()
+    done = Event()
+    handle = scheduler.schedule(0.1, cancelled.set)
+    scheduler.schedule(0.2, done.set)
+    assert scheduler.cancel(handle)
+    assert not scheduler.cancel(handle)
+    assert scheduler.n_pending == 1
+    assert done.wait(timeout=5)
+    assert not cancelled.is_set()
+
+
+def test_blocking_function():
+    scheduler = TimeoutScheduler()
+    release = Event()
+    done = Event()
+    scheduler.schedule(0.1, release.wait, 5)
+    scheduler.schedule(0.2, done.set)
+    # A function that blocks shouldn't hold up the next deadline
+    assert done.wait(timeout=1)
+    assert not release.is_set()
+    release.set()
+
+
+def test_exception(caplog):
+    scheduler = TimeoutScheduler()
+    done = Event()
+
+    def fail():
+        raise RuntimeError("This is a test RuntimeError.")
+
+    scheduler.schedule(0.1, fail)
+    scheduler.schedule(0.2, done.set)
+    # The scheduler thread should survive the exception
+    assert done.wait(timeout=5)
+    time.sleep(0.1)
+    assert any(record.levelname == "ERROR" for record in caplog.records)
@@ -0,0 +1,36 @@
+import os
+
+import pytest
+
+from huntsman.pocs.utils.transfer import ImageReceiver, send_file
+
+
+@pytest.fixture
+def receiver(tmpdir):
+    receiver = ImageReceiver(str(tmpdir.mkdir("received")), host='localhost', port=0,
+                             chunk_size=1000)
+    receiver.start()
+    yield receiver
+    receiver.stop()
+
+
+def test_send_file(receiver, tmpdir):
+    images_dir = tmpdir.mkdir("local")
+    local_file = images_dir.mkdir("flats").join("image.fits")
+    data = os.urandom(12345)
+    local_file.write_binary(data)
+
+    result = send_file(str(local_file), *receiver.address, images_dir=str(images_dir))
+    assert result["bytes"] == len(data)
+
+    received_file = os.path.join(receiver.images_dir, "flats", "image.fits")
+    with open(received_file, 'rb') as f:
+        assert f.read() == data
+    assert not os.path.exists(received_file + '.part')
+
+
+def test_send_file_outside_images_dir(receiver, tmpdir):
+    local_file = tmpdir.join("image.fits")
+    local_file.write_binary(b"data")
+    with pytest.raises(ValueError):
+        send_file(str(local_file), *receiver.address, images_dir=str(tmpdir.mkdir("local")))
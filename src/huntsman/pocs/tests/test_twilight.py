@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+from astropy import units as u
+from astropy.coordinates import AltAz, SkyCoord
+from astropy.time import Time
+
+from huntsman.pocs.utils.twilight import TwilightModel
+
+START_TIME = Time("2020-06-01 08:00:00")
+
+
+class FakeObserver(object):
+    """Sun sets at 0.25 degrees per minute."""
+
+    def sun_altaz(self, time):
+        alt = -5 - 0.25 * (time - START_TIME).to_value(u.minute)
+        return SkyCoord(alt=alt * u.deg, az=270 * u.deg, frame=AltAz())
+
+
+def count_rate(time, intercept=10, slope=0.5):
+    return np.exp(intercept + slope * FakeObserver().sun_altaz(time).alt.to_value(u.deg))
+
+
+@pytest.fixture
+def model(tmpdir):
+    return TwilightModel(FakeObserver(), filename=str(tmpdir.join("twilight.json")))
+
+
+def test_no_model(model):
+    assert model.coefficients("camera", "g") is None
+    assert model.predict_exptime("camera", "g", 10000, START_TIME) is None
+
+
+def test_fit(model):
+    for minutes in range(0, 10, 2):
+        time = START_TIME + minutes * u.minute
+        model.add_measurement("camera", "g", time, count_rate(time))
+    intercept, slope = model.coefficients("camera", "g")
+    assert intercept == pytest.approx(10)
+    assert slope == pytest.approx(0.5)
+    assert model.coefficients("camera", "r") is None
+
+    # The predicted exposure should give the target counts
+    start_time = START_TIME + 12 * u.minute
+    exptime = model.predict_exptime("camera", "g", 10000, start_time)
+    times = start_time + np.linspace(0, 1, 101) * exptime
+    counts = count_rate(times).mean() * exptime.to_value(u.second)
+    assert counts == pytest.approx(10000, rel=0.01)
+
+
+def test_save(model):
+    for minutes in range(0, 10, 2):
+        time = START_TIME + minutes * u.minute
+        model.add_measurement("camera", "g", time, count_rate(time))
+    model.save()
+
+    # The saved slope is used with the intercept matched to the first new measurement
+    new_model = TwilightModel(FakeObserver(), filename=model.filename)
+    assert new_model.coefficients("camera", "g") == pytest.approx((10, 0.5))
+    new_model.add_measurement("camera", "g", START_TIME, count_rate(START_TIME, intercept=11))
+    assert new_model.coefficients("camera", "g") == pytest.approx((11, 0.5))
@@ -0,0 +1,206 @@
+"""Image analysis run in worker processes, so that the state machine doesn't block on astrometry.
+
+Plate solving is submitted to an `AnalysisService`, which runs it in a process pool & returns a
+`concurrent.futures.Future` for the result. The functions run by the worker processes only take
+& return picklable arguments.
+"""
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import suppress
+from threading import RLock
+
+from astropy import units as u
+
+from pocs.images import Image, OffsetError
+from pocs.utils import logger as logger_module
+
+
+def solve_image(filename, location=None, **kwargs):
+    """Plate solve an image.
+
+    Args:
+        filename (str): Filename of the image.
+        location (astropy.coordinates.EarthLocation, optional): Location of the observatory.
+        **kwargs: Passed to `pocs.images.Image.solve_field`.
+
+    Returns:
+        dict: The `pointing` of the image centre as a SkyCoord, the `pointing_error` from the
+            coordinates in the header, or None if it can't be calculated, & the `wcs` header as a
+            string.
+    """
+    image = Image(filename, location=location)
+    image.solve_field(**kwargs)
+    pointing_error = None
+    with suppress(Exception):
+        pointing_error = image.pointing_error
+    return {"pointing": image.pointing,
+            "pointing_error": pointing_error,
+            "wcs": image.wcs.to_header().tostring() if image.wcs is not None else None}
+
+
+def pointing_offset(pointing, reference_pointing):
+    """Offset between the pointings of two images.
+
+    Args:
+        pointing (astropy.coordinates.SkyCoord): Pointing of the image.
+        reference_pointing (astropy.coordinates.SkyCoord): Pointing of the reference image.
+
+    Returns:
+        pocs.images.OffsetError: The offset in arcseconds.
+    """
+    magnitude = pointing.separation(reference_pointing)
+    delta_dec = pointing.dec - reference_pointing.dec
+    delta_ra = pointing.ra - reference_pointing.ra
+    return OffsetError(delta_ra.to(u.arcsec), delta_dec.to(u.arcsec), magnitude.to(u.arcsec))
+
+
+class AnalysisService(object):
+    """Runs plate solves in a pool of worker processes.
+
+    Jobs return futures & never block the caller. The result of solving each file is cached, so
+    e.g. the pointing image of an observation is only solved once. Each job can be tagged with a
+    key, such as the observation it is part of. Submitting a job with a different key cancels
+    the jobs with other keys that haven't started yet, as their results would be stale. Computing
+    a new offset also cancels the offsets with the same key that haven't started, as they are
+    superseded.
+
+    Args:
+        max_workers (int, optional): Number of worker processes, default 1.
+        location (astropy.coordinates.EarthLocation, optional): Location of the observatory.
+        cache_size (int, optional): Maximum number of solved files to cache, default 256.
+        logger (logging.Logger, optional): logger to use for messages, if not given will
+            use the root logger.
+    """
+
+    def __init__(self, max_workers=1, location=None, cache_size=256, logger=None):
+        if not logger:
+            logger = logger_module.get_root_logger()
+        self.logger = logger
+        self.max_workers = max_workers
+        self.location = location
+        self.cache_size = cache_size
+        self._executor = None
+        # Filename: future of solve_image, least recently used first
+        self._cache = OrderedDict()
+        # Future: key of the jobs that haven't finished
+        self._pending = dict()
+        # Reentrant as callbacks of futures that are already done run immediately
+        self._lock = RLock()
+
+    @property
+    def n_pending(self):
+        """Number of jobs that haven't finished."""
+        with self._lock:
+            return len(self._pending)
+
+    def solve(self, filename, key=None, **kwargs):
+        """Plate solve an image in a worker process.
+
+        Args:
+            filename (str): Filename of the image.
+            key (object, optional): Key of the job, see `cancel_stale`.
+            **kwargs: Passed to `pocs.images.Image.solve_field`.
+
+        Returns:
+            concurrent.futures.Future: Future for the dict returned by `solve_image`.
+        """
+        with self._lock:
+            self.cancel_stale(key)
+            future = self._cache.get(filename)
+            if future is not None:
+                self._cache.move_to_end(filename)
+                return future
+
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'))
+            self.logger.debug(f'Submitting plate solve of {filename}.')
+            future = self._executor.submit(solve_image, filename, location=self.location,
+                                           **kwargs)
+            self._pending[future] = key
+            self._cache[filename] = future
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        future.add_done_callback(lambda f: self._job_done(filename, f))
+        return future
+
+    def offset(self, filename, reference_filename, key=None):
+        """Compute the offset of an image from a reference image, e.g. the pointing image.
+
+        Both images are plate solved in worker processes, if they haven't been already. Solves
+        of earlier images with the same key that haven't started are cancelled, along with their
+        offsets, as this offset supersedes them.
+
+        Args:
+            filename (str): Filename of the image.
+            reference_filename (str): Filename of the reference image.
+            key (object, optional): Key of the job, see `cancel_stale`.
+
+        Returns:
+            concurrent.futures.Future: Future for the `pocs.images.OffsetError`.
+        """
+        with self._lock:
+            reference_future = self.solve(reference_filename, key=key)
+            self._cancel_superseded(key, keep=reference_future)
+            image_future = self.solve(filename, key=key, skip_solved=False)
+        result = Future()
+        result_lock = RLock()
+
+        def set_result(_):
+            with result_lock:
+                if result.done():
+                    return
+                if image_future.cancelled() or reference_future.cancelled():
+                    result.cancel()
+                    return
+                if not (image_future.done() and reference_future.done()):
+                    return
+                try:
+                    result.set_result(pointing_offset(image_future.result()["pointing"],
+                                                      reference_future.result()["pointing"]))
+                except BaseException as err:
+                    result.set_exception(err)
+
+        image_future.add_done_callback(set_result)
+        reference_future.add_done_callback(set_result)
+        return result
+
+    def cancel_stale(self, key):
+        """Cancel the jobs that haven't started & have a key other than `key`.
+
+        Args:
+            key (object): The current key, e.g. observation. If None nothing is cancelled.
+        """
+        if key is None:
+            return
+        with self._lock:
+            for future, job_key in list(self._pending.items()):
+                if job_key is not None and job_key is not key and future.cancel():
+                    self.logger.debug('Cancelled stale analysis job.')
+
+    def _cancel_superseded(self, key, keep=None):
+        """Cancel the jobs that haven't started & have the same key, other than `keep`."""
+        if key is None:
+            return
+        with self._lock:
+            for future, job_key in list(self._pending.items()):
+                if job_key is key and future is not keep and future.cancel():
+                    self.logger.debug('Cancelled superseded analysis job.')
+
+    def shutdown(self):
+        """Cancel the jobs that haven't started & stop the worker processes."""
+        with self._lock:
+            for future in list(self._pending.keys()):
+                future.cancel()
+            if self._executor is not None:
+                self._executor.shutdown(wait=False)
+                self._executor = None
+
+    def _job_done(self, filename, future):
+        with self._lock:
+            self._pending.pop(future, None)
+            # Only successful solves are cached
+            if (future.cancelled() or future.exception() is not None) and \
+                    self._cache.get(filename) is future:
+                del self._cache[filename]
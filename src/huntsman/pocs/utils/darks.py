@@ -0,0 +1,140 @@
+import os
+import json
+import math
+import time
+from collections import defaultdict
+from threading import Lock
+
+from astropy import units as u
+
+from pocs.utils import get_quantity_value
+from pocs.utils import logger as logger_module
+
+
+class DarkLibrary(object):
+    """On-disk catalogue of dark frames, so that darks can be reused across nights.
+
+    Darks are indexed by camera uid, exposure time & sensor temperature bucket. Each index entry
+    is a list of darks in the order they were taken, so checking whether there are enough darks
+    younger than the maximum age only needs the index lookup & a look at the nth newest dark.
+
+    Args:
+        filename (str): JSON file the catalogue is saved to & loaded from.
+        temperature_bin (float, optional): Width of the sensor temperature buckets in degrees
+            Celsius, default 2.
+        max_age (float|Quantity, optional): Maximum age of darks that can be reused, default 30
+            days. Floats are in days.
+        logger (logging.Logger, optional): logger to use for messages, if not given will
+            use the root logger.
+    """
+
+    def __init__(self, filename, temperature_bin=2, max_age=30 * u.day, logger=None):
+        if not logger:
+            logger = logger_module.get_root_logger()
+        self.logger = logger
+        self.filename = filename
+        self.temperature_bin = temperature_bin
+        self.max_age = get_quantity_value(max_age, u.day) * u.day
+        self._index = defaultdict(list)
+        self._lock = Lock()
+
+        if os.path.exists(filename):
+            try:
+                with open(filename) as f:
+                    for dark in json.load(f):
+                        self._index[self._key(dark["uid"], dark["exptime"],
+                                              dark["temperature"])].append(dark)
+            except Exception as err:
+                self.logger.warning(f"Unable to load dark library from {filename}: {err!r}")
+            for darks in self._index.values():
+                darks.sort(key=lambda dark: dark["time"])
+
+    def __len__(self):
+        with self._lock:
+            return sum(len(darks) for darks in self._index.values())
+
+    def add(self, uid, exptime, temperature, filename, taken_time=None):
+        """Add a dark frame to the catalogue.
+
+        Args:
+            uid (str): uid of the camera that took the dark.
+            exptime (float|Quantity): Exposure time, floats are in seconds.
+            temperature (float|Quantity|None): Sensor temperature, floats are in Celsius.
+            filename (str): Filename of the dark.
+            taken_time (float, optional): Unix time the dark was taken, default now.
+        """
+        dark = {"uid": uid,
+                "exptime": get_quantity_value(exptime, u.second),
+                "temperature": self._temperature_value(temperature),
+                "filename": filename,
+                "time": time.time() if taken_time is None else taken_time}
+        with self._lock:
+            darks = self._index[self._key(uid, dark["exptime"], dark["temperature"])]
+            darks.append(dark)
+            if len(darks) > 1 and darks[-2]["time"] > dark["time"]:
+                darks.sort(key=lambda d: d["time"])
+
+    def find(self, uid, exptime, temperature, max_age=None):
+        """Get the darks matching a camera, exposure time & sensor temperature.
+
+        Args:
+            uid (str): uid of the camera.
+            exptime (float|Quantity): Exposure time, floats are in seconds.
+            temperature (float|Quantity|None): Sensor temperature, floats are in Celsius.
+            max_age (float|Quantity, optional): Maximum age, default the library's `max_age`.
+
+        Returns:
+            list: Dicts describing the matching darks, newest last.
+        """
+        min_time = self._min_time(max_age)
+        with self._lock:
+            darks = self._index.get(self._key(uid, exptime, temperature), [])
+            return [dark for dark in darks if dark["time"] >= min_time]
+
+    def has_darks(self, uid, exptime, temperature, n_darks=1, max_age=None):
+        """True if there are at least `n_darks` darks matching a camera, exposure time & sensor
+        temperature that are younger than the maximum age."""
+        min_time = self._min_time(max_age)
+        with self._lock:
+            darks = self._index.get(self._key(uid, exptime, temperature), [])
+            return len(darks) >= n_darks and darks[-n_darks]["time"] >= min_time
+
+    def prune(self):
+        """Remove darks that are older than the maximum age or whose files no longer exist."""
+        min_time = self._min_time()
+        with self._lock:
+            for key, darks in list(self._index.items()):
+                darks[:] = [dark for dark in darks if dark["time"] >= min_time and (
+                    os.path.exists(dark["filename"]) or os.path.exists(dark["filename"] + '.fz'))]
+                if not darks:
+                    del self._index[key]
+
+    def save(self):
+        """Save the catalogue to its JSON file."""
+        with self._lock:
+            darks = [dark for darks in self._index.values() for dark in darks]
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.filename)), exist_ok=True)
+            temp_filename = self.filename + '.tmp'
+            with open(temp_filename, 'w') as f:
+                json.dump(darks, f)
+            os.replace(temp_filename, self.filename)
+        except Exception as err:
+            self.logger.warning(f"Unable to save dark library to {self.filename}: {err!r}")
+
+    def _min_time(self, max_age=None):
+        if max_age is None:
+            max_age = self.max_age
+        return time.time() - get_quantity_value(max_age, u.day) * 86400
+
+    def _temperature_value(self, temperature):
+        if temperature is None:
+            return None
+        return get_quantity_value(temperature, u.Celsius)
+
+    def _key(self, uid, exptime, temperature):
+        temperature = self._temperature_value(temperature)
+        if temperature is not None:
+            # Round half up, as round() rounds half to even & so makes buckets of uneven width
+            temperature = math.floor(temperature / self.temperature_bin + 0.5)
+        return uid, round(get_quantity_value(exptime, u.second), 3), temperature
@@ -0,0 +1,271 @@
+import os
+import json
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from threading import Condition, Lock, Thread
+
+from pocs.utils import listify
+from pocs.utils import logger as logger_module
+
+
+class EfficiencyTracker(object):
+    """Accounts for where the observing time goes, so overheads can be tracked night by night.
+
+    Time is recorded per camera, e.g. exposing, reading out & focusing, and per state of the
+    state machine, e.g. slewing, solving & waiting on events. Time spent in a state that isn't
+    accounted for by any of its categories is reported as idle. Time spent in background work,
+    e.g. plate solving in worker processes, is reported separately as it overlaps the rest.
+    States are followed by hooking the state machine once with `track_states`, which
+    huntsman.pocs.core.create_pocs does for the POCS it creates.
+
+    Args:
+        directory (str, optional): Directory the nightly reports are saved to. If not given the
+            reports are only logged.
+        poll_interval (float, optional): Time in seconds between checks of the events tracked
+            by `track_event` that can't call back when they are set, default 1.
+        logger (logging.Logger, optional): logger to use for messages, if not given will
+            use the root logger.
+    """
+
+    def __init__(self, directory=None, poll_interval=1, logger=None):
+        if not logger:
+            logger = logger_module.get_root_logger()
+        self.logger = logger
+        self.directory = directory
+        self.poll_interval = poll_interval
+        self._lock = Lock()
+        self._generation = 0
+        # (event, deadline, done function) of the events checked by the shared poller thread
+        self._polled = list()
+        self._poll_condition = Condition()
+        self._poll_thread = None
+        self.reset()
+
+    @property
+    def generation(self):
+        """Number of resets so far. Time measured across a reset is dropped, see `record`."""
+        with self._lock:
+            return self._generation
+
+    def reset(self):
+        """Start accounting afresh, e.g. for a new night."""
+        with self._lock:
+            self._generation += 1
+            self._start_time = time.time()
+            self._start_monotonic = time.monotonic()
+            self._cameras = defaultdict(lambda: defaultdict(float))
+            self._states = defaultdict(lambda: defaultdict(float))
+            self._background = defaultdict(float)
+            self._state = None
+            self._state_start = None
+
+    def track_states(self, machine):
+        """Follow the states of a state machine, e.g. POCS, calling `enter_state` on each
+        transition.
+
+        Args:
+            machine (transitions.Machine): The state machine. It must send event data to its
+                callbacks, as POCS does.
+        """
+        callbacks = listify(machine.before_state_change)
+        if self._before_state_change not in callbacks:
+            machine.before_state_change = callbacks + [self._before_state_change]
+        self.enter_state(machine.state)
+
+    def _before_state_change(self, event_data):
+        # Called before the state's on_enter, which does all the state's work.
+        try:
+            self.enter_state(event_data.transition.dest)
+        except Exception as err:
+            self.logger.warning(f'Unable to track state change: {err!r}')
+
+    def enter_state(self, name):
+        """Record that the state machine has entered a state, ending the previous one."""
+        now = time.monotonic()
+        with self._lock:
+            if self._state is not None:
+                self._states[self._state]["total"] += now - self._state_start
+            self._state = name
+            self._state_start = now
+
+    def record(self, category, seconds, camera=None, background=False, generation=None):
+        """Record time spent on something.
+
+        Args:
+            category (str): What the time was spent on, e.g. `exposing` or `slewing`.
+            seconds (float): The time in seconds.
+            camera (str, optional): Name of the camera the time was spent by. If not given the
+                time is recorded for the current state.
+            background (bool, optional): If True the time was spent in the background, in
+                parallel with the state machine, default False.
+            generation (int, optional): The `generation` when the time started being measured.
+                If the tracker has been reset since, the time belongs to the previous report &
+                is dropped.
+        """
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return
+            if camera is not None:
+                self._cameras[camera][category] += seconds
+            elif background:
+                self._background[category] += seconds
+            else:
+                self._states[self._state][category] += seconds
+
+    @contextmanager
+    def timing(self, category, **kwargs):
+        """Context manager that records the time spent in its block, see `record`."""
+        generation = self.generation
+        start_time = time.monotonic()
+        try:
+            yield
+        finally:
+            self.record(category, time.monotonic() - start_time, generation=generation,
+                        **kwargs)
+
+    def track_event(self, event, camera, category="exposing", exptime=None, timeout=600):
+        """Record the time from now until an event is set for a camera.
+
+        Args:
+            event (threading.Event): The event, e.g. returned by `take_observation`.
+            camera (str): Name of the camera.
+            category (str, optional): What the time is spent on, default `exposing`.
+            exptime (float, optional): Exposure time in seconds. If given the time after the
+                exposure time is recorded as `readout`.
+            timeout (float, optional): Time in seconds, after the exposure time, to give up
+                waiting for the event, default 600. Nothing is recorded if it isn't set by then.
+        """
+        generation = self.generation
+        start_time = time.monotonic()
+        deadline = start_time + (exptime or 0) + timeout
+
+        def done():
+            now = time.monotonic()
+            if now > deadline:
+                return
+            elapsed = now - start_time
+            if exptime is None:
+                self.record(category, elapsed, camera=camera, generation=generation)
+            else:
+                exposing = min(exptime, elapsed)
+                self.record(category, exposing, camera=camera, generation=generation)
+                self.record("readout", elapsed - exposing, camera=camera,
+                            generation=generation)
+
+        # Events pushed by camera servers can call back when they are set. The others are
+        # checked by a single thread shared by all the events.
+        if getattr(event, "is_pushed", False):
+            event.add_callback(done)
+            return
+
+        with self._poll_condition:
+            self._polled.append((event, deadline, done))
+            if self._poll_thread is None:
+                self._poll_thread = Thread(target=self._poll, name="EfficiencyTracker",
+                                           daemon=True)
+                self._poll_thread.start()
+            self._poll_condition.notify()
+
+    def _poll(self):
+        while True:
+            with self._poll_condition:
+                while not self._polled:
+                    self._poll_condition.wait()
+                polled = list(self._polled)
+
+            # Identified by id() as tuples of events may not compare cheaply
+            finished = set()
+            for item in polled:
+                event, deadline, done = item
+                try:
+                    is_set = event.is_set()
+                except Exception as err:
+                    self.logger.debug(f"Unable to check tracked event: {err!r}")
+                    is_set = False
+                if is_set:
+                    done()
+                    finished.add(id(item))
+                elif time.monotonic() >= deadline:
+                    self.logger.debug("Gave up tracking an event that wasn't set in time.")
+                    finished.add(id(item))
+
+            with self._poll_condition:
+                self._polled = [item for item in self._polled if id(item) not in finished]
+            time.sleep(self.poll_interval)
+
+    def counters(self):
+        """Running totals, in seconds, of the time spent on each category tonight."""
+        report = self.report()
+        counters = defaultdict(float)
+        for times in report["cameras"].values():
+            for category, seconds in times.items():
+                if category != "shutter_open_fraction":
+                    counters[category] += seconds
+        for times in report["states"].values():
+            for category, seconds in times.items():
+                if category != "total":
+                    counters[category] += seconds
+        counters = dict(counters)
+        counters["elapsed"] = report["elapsed"]
+        counters["shutter_open_fraction"] = report["shutter_open_fraction"]
+        return counters
+
+    def report(self):
+        """Report of the time spent on each category, per camera & per state.
+
+        Returns:
+            dict: The start time, elapsed time in seconds, per camera times & fraction of the
+                elapsed time each shutter was open, per state times & the mean shutter open
+                fraction.
+        """
+        now = time.monotonic()
+        with self._lock:
+            elapsed = now - self._start_monotonic
+            cameras = {name: dict(times) for name, times in self._cameras.items()}
+            states = {str(name): dict(times) for name, times in self._states.items()}
+            if self._state is not None:
+                state = states.setdefault(str(self._state), dict())
+                state["total"] = state.get("total", 0) + now - self._state_start
+            background = dict(self._background)
+
+        for times in states.values():
+            total = times.get("total", 0)
+            times["idle"] = max(total - sum(seconds for category, seconds in times.items()
+                                            if category != "total"), 0)
+        for times in cameras.values():
+            times["shutter_open_fraction"] = times.get("exposing", 0) / elapsed if elapsed else 0
+
+        fractions = [times["shutter_open_fraction"] for times in cameras.values()]
+        return {"start_time": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(self._start_time)),
+                "elapsed": elapsed,
+                "shutter_open_fraction": sum(fractions) / len(fractions) if fractions else 0,
+                "cameras": cameras,
+                "states": states,
+                "background": background}
+
+    def save(self):
+        """Log a summary of the report & save it as JSON, named after the start time.
+
+        Returns:
+            dict: The report.
+        """
+        report = self.report()
+        counters = self.counters()
+        summary = ", ".join(f"{category} {seconds:.0f}s" for category, seconds in
+                            sorted(counters.items())
+                            if category not in ("elapsed", "shutter_open_fraction"))
+        self.logger.info(f"Efficiency: shutters open {report['shutter_open_fraction']:.1%} of"
+                         f" {report['elapsed'] / 3600:.2f} hours. {summary}.")
+
+        if self.directory is not None:
+            filename = os.path.join(self.directory,
+                                    f"efficiency_{report['start_time'].replace(':', '')}.json")
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                with open(filename, "w") as f:
+                    json.dump(report, f, indent=2)
+                self.logger.debug(f"Saved efficiency report to {filename}.")
+            except Exception as err:
+                self.logger.warning(f"Unable to save efficiency report to {filename}: {err!r}")
+        return report
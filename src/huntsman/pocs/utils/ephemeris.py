@@ -0,0 +1,144 @@
+from threading import Lock
+
+import numpy as np
+from astropy import units as u
+
+from pocs.utils import current_time, get_quantity_value
+from pocs.utils import logger as logger_module
+
+# Half a day in seconds. The nearest midnight is the right one within this time of it.
+_HALF_DAY = 43200.
+
+
+class NightEphemeris(object):
+    """Cache of the times of midnight & the sun crossing each horizon for the current night.
+
+    A night runs from 12 hours before midnight to 12 hours after it. Midnight & the crossing
+    times for each horizon are calculated once per night, so checking whether it is dark or past
+    midnight only needs a comparison of timestamps. Horizons that haven't been calculated yet are
+    calculated when first needed.
+
+    Args:
+        observer (astroplan.Observer): Observer used to calculate the sun's position.
+        horizons (list, optional): Horizons, in degrees, to calculate the crossing times of when
+            the night changes.
+        logger (logging.Logger, optional): logger to use for messages, if not given will
+            use the root logger.
+    """
+
+    def __init__(self, observer, horizons=None, logger=None):
+        if not logger:
+            logger = logger_module.get_root_logger()
+        self.logger = logger
+        self.observer = observer
+        self.horizons = [self._horizon_value(horizon) for horizon in horizons or []]
+        self._midnight = None
+        self._midnight_time = None
+        # Horizon in degrees: (unix time the sun sets below it, unix time it rises above it)
+        self._crossings = dict()
+        self._lock = Lock()
+
+    @property
+    def midnight(self):
+        """Unix time of midnight of the current night."""
+        return self._refresh(current_time())
+
+    def is_dark(self, horizon, time=None):
+        """True if the sun is below a horizon.
+
+        Args:
+            horizon (float|Quantity): The horizon, floats are in degrees.
+            time (astropy.time.Time, optional): The time, default now.
+        """
+        if time is None:
+            time = current_time()
+        sunset, sunrise = self.crossings(horizon, time)
+        return sunset <= time.unix < sunrise
+
+    def past_midnight(self, time=None):
+        """True if it is after midnight of the current night.
+
+        Args:
+            time (astropy.time.Time, optional): The time, default now.
+        """
+        if time is None:
+            time = current_time()
+        return self._refresh(time) < time.unix
+
+    def crossings(self, horizon, time=None):
+        """Unix times the sun sets below & rises above a horizon in the night containing a time.
+
+        If the sun stays below the horizon all night the sunset & sunrise are the start & end
+        of the night. If it stays above the horizon both are midnight.
+
+        Args:
+            horizon (float|Quantity): The horizon, floats are in degrees.
+            time (astropy.time.Time, optional): The time, default now.
+
+        Returns:
+            tuple: The sunset & sunrise unix times.
+        """
+        if time is None:
+            time = current_time()
+        horizon = self._horizon_value(horizon)
+        with self._lock:
+            self._refresh_locked(time)
+            if horizon not in self._crossings:
+                self._crossings[horizon] = self._calculate_crossings(horizon)
+            return self._crossings[horizon]
+
+    def next_crossing(self, horizon, time=None):
+        """Unix time of the next time the sun sets below or rises above a horizon.
+
+        Args:
+            horizon (float|Quantity): The horizon, floats are in degrees.
+            time (astropy.time.Time, optional): The time, default now.
+
+        Returns:
+            float: The unix time, or None if the sun doesn't cross the horizon again tonight.
+        """
+        if time is None:
+            time = current_time()
+        for crossing in self.crossings(horizon, time):
+            if crossing > time.unix:
+                return crossing
+        return None
+
+    def _refresh(self, time):
+        with self._lock:
+            return self._refresh_locked(time)
+
+    def _refresh_locked(self, time):
+        if self._midnight is not None and abs(time.unix - self._midnight) < _HALF_DAY:
+            return self._midnight
+        self._midnight_time = self.observer.midnight(time, which='nearest')
+        self._midnight = float(self._midnight_time.unix)
+        self._crossings = {horizon: self._calculate_crossings(horizon)
+                           for horizon in self.horizons}
+        self.logger.debug(f"Calculated ephemeris for night with midnight at {self._midnight}:"
+                          f" {self._crossings}")
+        return self._midnight
+
+    def _calculate_crossings(self, horizon):
+        midnight = self._midnight_time
+        sunset = self._unix(self.observer.sun_set_time(midnight, which='previous',
+                                                       horizon=horizon * u.deg))
+        sunrise = self._unix(self.observer.sun_rise_time(midnight, which='next',
+                                                         horizon=horizon * u.deg))
+        if sunset is None or sunrise is None:
+            if self.observer.sun_altaz(midnight).alt.to_value(u.deg) < horizon:
+                return self._midnight - _HALF_DAY, self._midnight + _HALF_DAY
+            return self._midnight, self._midnight
+        return sunset, sunrise
+
+    @staticmethod
+    def _unix(time):
+        """Unix time, or None if astroplan couldn't find the crossing."""
+        value = time.unix
+        if np.ma.is_masked(value) or not np.isfinite(value):
+            return None
+        return float(value)
+
+    @staticmethod
+    def _horizon_value(horizon):
+        return float(get_quantity_value(horizon, u.deg))
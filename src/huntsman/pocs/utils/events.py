@@ -0,0 +1,97 @@
+import time
+
+
+class EventGroup(object):
+    """A group of threading.Event-like objects that is set when all of its events are set.
+
+    Args:
+        events (dict): Dictionary of name: event pairs, e.g. camera name: exposure event.
+    """
+
+    def __init__(self, events):
+        self.events = dict(events)
+
+    def __len__(self):
+        return len(self.events)
+
+    def __contains__(self, name):
+        return name in self.events
+
+    def __getitem__(self, name):
+        return self.events[name]
+
+    def is_set(self):
+        """True if all of the events are set."""
+        return all(event.is_set() for event in self.events.values())
+
+    def wait(self, timeout=None):
+        """Block until all of the events are set, or the timeout expires.
+
+        Args:
+            timeout (float, optional): Timeout in seconds. If not given will wait indefinitely.
+
+        Returns:
+            bool: True if all of the events are set, False if the timeout expired first.
+        """
+        if timeout is not None:
+            deadline = time.monotonic() + timeout
+        for event in self.events.values():
+            remaining = None if timeout is None else max(deadline - time.monotonic(), 0)
+            if not event.wait(remaining):
+                return False
+        return True
+
+
+class ExposureGroup(EventGroup):
+    """Completion handle for exposures started on several cameras at once.
+
+    Args:
+        events (dict): Dictionary of camera name: exposure event pairs.
+        filenames (dict): Dictionary of camera name: filename pairs.
+        start_skew (dict): Dictionary of camera name: delay, in seconds, between the exposures
+            being dispatched and the camera acknowledging the start of its exposure.
+    """
+
+    def __init__(self, events, filenames, start_skew):
+        super().__init__(events)
+        self.filenames = dict(filenames)
+        self.start_skew = dict(start_skew)
+
+    @property
+    def max_start_skew(self):
+        """Largest start skew of any camera, in seconds."""
+        return max(self.start_skew.values(), default=0)
+
+
+def wait_for_all(events, timeout=None, heartbeat=None, heartbeat_interval=15):
+    """Block until all of the events are set, calling a heartbeat function periodically.
+
+    Unlike polling `is_set()` with a sleep, this returns as soon as the last event is set. The
+    heartbeat, e.g. `pocs.status`, is called on its own cadence while waiting.
+
+    Args:
+        events (dict|list|EventGroup): The events to wait for.
+        timeout (float, optional): Timeout in seconds. If not given will wait indefinitely.
+        heartbeat (callable, optional): Function called with no arguments every
+            `heartbeat_interval` seconds while waiting.
+        heartbeat_interval (float, optional): Seconds between heartbeat calls, default 15.
+
+    Returns:
+        bool: True if all of the events are set, False if the timeout expired first.
+    """
+    if not isinstance(events, EventGroup):
+        if not isinstance(events, dict):
+            events = dict(enumerate(events))
+        events = EventGroup(events)
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    while True:
+        wait_time = heartbeat_interval if heartbeat is not None else None
+        if deadline is not None:
+            remaining = max(deadline - time.monotonic(), 0)
+            wait_time = remaining if wait_time is None else min(wait_time, remaining)
+        if events.wait(wait_time):
+            return True
+        if deadline is not None and time.monotonic() >= deadline:
+            return False
+        heartbeat()
@@ -0,0 +1,175 @@
+"""Estimation of the count levels in flat field images.
+
+The autoflat loop only needs the typical level of each flat, not precise statistics, so it can use
+a fast estimator. Estimators are selected by name, see `get_estimator` & `frame_stats`:
+
+    sigma_clip: astropy.stats.sigma_clipped_stats on every pixel. Slow but exact.
+    histogram: Iteratively sigma clipped statistics of a histogram of a subsample of the pixels,
+        read from a memory map of the FITS file in its native integer type.
+"""
+import numpy as np
+from astropy.io import fits
+from astropy import stats
+
+
+def read_data(filename):
+    """Read the image data from a FITS file, falling back to the fpacked file if necessary."""
+    try:
+        return fits.getdata(filename)
+    except FileNotFoundError:
+        return fits.getdata(filename + '.fz')
+
+
+def subsample(data, stride=1, roi=None):
+    """Subsample an image without copying it.
+
+    Args:
+        data (numpy.ndarray): 2D image data.
+        stride (int, optional): Use every `stride`th pixel in each direction, default 1.
+        roi (float, optional): If given use only a central region of the image, with sides of
+            `roi` times the size of the image.
+
+    Returns:
+        numpy.ndarray: View of the subsampled data.
+    """
+    if roi is not None:
+        ny, nx = data.shape
+        dy, dx = int(ny * (1 - roi) / 2), int(nx * (1 - roi) / 2)
+        data = data[dy:ny - dy, dx:nx - dx]
+    return data[::stride, ::stride]
+
+
+class SigmaClipEstimator(object):
+    """Statistics of every pixel using astropy.stats.sigma_clipped_stats.
+
+    Args:
+        **kwargs: Passed to astropy.stats.sigma_clipped_stats.
+    """
+
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+    def __call__(self, filename, bias=0):
+        data = read_data(filename).astype('int32')
+        mean, median, std = stats.sigma_clipped_stats(data - bias, **self.kwargs)
+        return {"mean": float(mean), "median": float(median), "std": float(std)}
+
+
+class HistogramEstimator(object):
+    """Sigma clipped statistics of a subsample of the pixels, calculated from their histogram.
+
+    Uncompressed images are memory mapped without applying BZERO, so only the subsampled pixels
+    are read & converted. The histogram has one bin per integer count, so the clipped statistics
+    are the same as for the subsampled pixels themselves. Like sigma_clipped_stats the clipping
+    is about the median. Floating point images fall back to sigma_clipped_stats of the subsample.
+
+    Args:
+        stride (int, optional): Use every `stride`th pixel in each direction, default 4.
+        roi (float, optional): If given use only a central region of the image, with sides of
+            `roi` times the size of the image.
+        sigma (float, optional): Clipping threshold in standard deviations, default 3.
+        maxiters (int, optional): Maximum number of clipping iterations, default 5.
+    """
+
+    def __init__(self, stride=4, roi=None, sigma=3, maxiters=5):
+        self.stride = stride
+        self.roi = roi
+        self.sigma = sigma
+        self.maxiters = maxiters
+
+    def __call__(self, filename, bias=0):
+        try:
+            with fits.open(filename, memmap=True, do_not_scale_image_data=True) as hdus:
+                hdu = hdus[0]
+                values = self._read_values(hdu.data, hdu.header)
+        except FileNotFoundError:
+            with fits.open(filename + '.fz') as hdus:
+                values = self._read_values(hdus[1].data, {})
+
+        if values.dtype.kind == 'f':
+            mean, median, std = stats.sigma_clipped_stats(values - bias, sigma=self.sigma,
+                                                          maxiters=self.maxiters)
+        else:
+            mean, median, std = self.clipped_stats(values)
+            mean, median = mean - bias, median - bias
+        return {"mean": float(mean), "median": float(median), "std": float(std)}
+
+    def _read_values(self, data, header):
+        values = subsample(data, self.stride, self.roi)
+        bzero = header.get('BZERO', 0)
+        bscale = header.get('BSCALE', 1)
+        if values.dtype.kind in 'iu' and bscale == 1 and bzero == int(bzero):
+            # Only the subsample is copied, converting to native byte order & applying BZERO.
+            return values.astype(np.int64) + int(bzero)
+        return values * bscale + bzero
+
+    def clipped_stats(self, values):
+        """Sigma clipped mean, median & standard deviation of integer values.
+
+        Args:
+            values (numpy.ndarray): Integer values.
+
+        Returns:
+            tuple: The clipped mean, median & standard deviation.
+        """
+        values = values.ravel()
+        offset = values.min()
+        counts = np.bincount(values - offset)
+        levels = np.arange(len(counts), dtype=np.float64) + offset
+
+        # The histogram bins to keep are lower:upper, which only shrinks as it would when
+        # clipping the values themselves.
+        lower, upper = 0, len(counts)
+        for _ in range(self.maxiters):
+            _, median, std = self._histogram_stats(counts[lower:upper], levels[lower:upper])
+            new_lower = max(int(np.ceil(median - self.sigma * std - offset)), lower)
+            new_upper = min(int(np.floor(median + self.sigma * std - offset)) + 1, upper)
+            if (new_lower, new_upper) == (lower, upper) or new_upper <= new_lower:
+                break
+            lower, upper = new_lower, new_upper
+        return self._histogram_stats(counts[lower:upper], levels[lower:upper])
+
+    @staticmethod
+    def _histogram_stats(counts, levels):
+        n = counts.sum()
+        mean = np.dot(counts, levels) / n
+        std = np.sqrt(np.dot(counts, (levels - mean) ** 2) / n)
+        # Median, matching numpy for an even number of values.
+        cumulative = np.cumsum(counts)
+        lower_median = levels[np.searchsorted(cumulative, (n + 1) // 2)]
+        upper_median = levels[np.searchsorted(cumulative, n // 2 + 1)]
+        return mean, (lower_median + upper_median) / 2, std
+
+
+estimators = {"sigma_clip": SigmaClipEstimator,
+              "histogram": HistogramEstimator}
+
+
+def get_estimator(name="sigma_clip", **kwargs):
+    """Create a flat level estimator.
+
+    Args:
+        name (str, optional): Name of the estimator, one of `estimators`. Default `sigma_clip`.
+        **kwargs: Passed to the estimator class.
+    """
+    try:
+        estimator_class = estimators[name]
+    except KeyError:
+        raise ValueError(f"Unknown flat level estimator {name}, should be one of"
+                         f" {list(estimators.keys())}.")
+    return estimator_class(**kwargs)
+
+
+def frame_stats(filename, bias=0, estimator="sigma_clip", **kwargs):
+    """Calculate clipped statistics of the bias subtracted counts in an image.
+
+    Args:
+        filename (str): The filename containing the data.
+        bias (float, optional): The bias level to subtract from the image, default 0.
+        estimator (str, optional): Name of the estimator to use, default `sigma_clip`.
+        **kwargs: Passed to the estimator class.
+
+    Returns:
+        dict: The clipped `mean`, `median` & `std` of the counts.
+    """
+    return get_estimator(estimator, **kwargs)(filename, bias=bias)
@@ -0,0 +1,62 @@
+import time
+
+from astropy import units as u
+
+from pocs.utils import error
+from pocs.utils import get_quantity_value
+
+
+def wait_for_slew(mount, separation_limit=0.5 * u.degree, timeout=300, min_interval=0.1,
+                  max_interval=1, logger=None):
+    """Block until the mount is tracking or within a separation of its target.
+
+    The mount is polled more often as it gets closer to the target. The time until it is within
+    the separation limit is estimated from the rate the distance to the target is shrinking, and
+    the mount is polled again after half that time, between `min_interval` & `max_interval`.
+
+    Args:
+        mount (pocs.mount.AbstractMount): The mount, which should already be slewing.
+        separation_limit (float|Quantity, optional): Distance from the target at which the slew
+            is finished, default 0.5 degrees. Floats are in degrees.
+        timeout (float, optional): Timeout in seconds, default 300. If None will wait
+            indefinitely.
+        min_interval (float, optional): Minimum time in seconds between polls, default 0.1.
+        max_interval (float, optional): Maximum time in seconds between polls, default 1.
+        logger (logging.Logger, optional): logger to use for messages.
+
+    Returns:
+        float: The duration of the slew in seconds.
+
+    Raises:
+        pocs.utils.error.Timeout: If the slew doesn't finish before the timeout.
+    """
+    separation_limit = get_quantity_value(separation_limit, u.degree)
+    start_time = time.monotonic()
+    previous = None
+    while True:
+        if mount.is_tracking:
+            break
+        distance = get_quantity_value(mount.distance_from_target(), u.degree)
+        poll_time = time.monotonic()
+        if distance < separation_limit:
+            break
+
+        elapsed = poll_time - start_time
+        if timeout is not None and elapsed > timeout:
+            raise error.Timeout(f"Mount still {distance:.3f} degrees from target after"
+                                f" {elapsed:.1f} seconds.")
+
+        interval = min_interval
+        if previous is not None:
+            previous_time, previous_distance = previous
+            rate = (previous_distance - distance) / (poll_time - previous_time)
+            interval = max_interval
+            if rate > 0:
+                interval = min(max((distance - separation_limit) / rate / 2, min_interval),
+                               max_interval)
+        previous = (poll_time, distance)
+        if logger is not None:
+            logger.debug(f"Slewing to target, {distance:.3f} degrees to go.")
+        time.sleep(interval)
+
+    return time.monotonic() - start_time
@@ -0,0 +1,279 @@
+import os
+import re
+import time
+import zlib
+import sqlite3
+from threading import Condition, Lock, Thread
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from pocs.utils import logger as logger_module
+
+_uploader = None
+_uploader_lock = Lock()
+
+checksum_pattern = re.compile(r'Checksum="(-?\d+)"')
+checksum_plugin_pattern = re.compile(r'ChecksumPlugIn="(\w+)"')
+
+
+class NgasUploader(object):
+    """Pushes files to the NGAS server in the background.
+
+    Pushes are recorded in an SQLite journal & removed from it once the NGAS server has accepted
+    the file, so pending pushes survive a restart. A fixed number of worker threads make the
+    pushes, retrying failed ones with exponential backoff.
+
+    The workers share a single HTTP session so connections to the NGAS server are kept alive
+    & reused. Files are streamed in fixed size chunks with an explicit Content-Length, computing
+    their CRC32 checksum in the same pass, which is checked against the checksum the NGAS server
+    reports.
+
+    Args:
+        ngas_ip (str): IP address of the NGAS server.
+        journal (str): Filename of the SQLite journal, created if it doesn't exist.
+        port (int, optional): Port of the NGAS server, default 7778.
+        max_workers (int, optional): Number of worker threads, default 2.
+        max_attempts (int, optional): Number of attempts before a push is abandoned, default 10.
+        min_backoff (float, optional): Delay in seconds before the first retry, default 10. The
+            delay doubles after each further failure.
+        max_backoff (float, optional): Maximum delay in seconds between retries, default 600.
+        timeout (float, optional): HTTP timeout in seconds, default 60.
+        chunk_size (int, optional): Size in bytes of the chunks files are uploaded in, default
+            1 MiB.
+        logger (logging.Logger, optional): logger to use for messages, if not given will
+            use the root logger.
+    """
+
+    def __init__(self, ngas_ip, journal, port=7778, max_workers=2, max_attempts=10,
+                 min_backoff=10, max_backoff=600, timeout=60, chunk_size=2**20, logger=None):
+        if not logger:
+            logger = logger_module.get_root_logger()
+        self.logger = logger
+        self.ngas_ip = ngas_ip
+        self.port = port
+        self.max_workers = max_workers
+        self.max_attempts = max_attempts
+        self.min_backoff = min_backoff
+        self.max_backoff = max_backoff
+        self.timeout = timeout
+        self.chunk_size = chunk_size
+
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(max_workers, 1))
+        self._session.mount('http://', adapter)
+
+        os.makedirs(os.path.dirname(os.path.abspath(journal)), exist_ok=True)
+        self._db = sqlite3.connect(journal, check_same_thread=False, isolation_level=None)
+        self._db.execute("CREATE TABLE IF NOT EXISTS pushes ("
+                         "id INTEGER PRIMARY KEY AUTOINCREMENT, "
+                         "filename TEXT NOT NULL, "
+                         "filename_ngas TEXT NOT NULL, "
+                         "attempts INTEGER NOT NULL DEFAULT 0, "
+                         "next_attempt REAL NOT NULL, "
+                         "status TEXT NOT NULL DEFAULT 'pending', "
+                         "last_error TEXT)")
+        self._condition = Condition()
+        self._in_progress = set()
+        self._workers = list()
+        self._stopping = False
+
+        self._n_uploaded = 0
+        self._n_failed = 0
+        self._bytes_uploaded = 0
+        self._seconds_uploading = 0.
+        self._last_throughput = None
+
+        n_pending = self.queue_depth
+        if n_pending:
+            self.logger.info(f"Resuming {n_pending} pending NGAS pushes from {journal}.")
+
+    @property
+    def queue_depth(self):
+        """Number of pushes waiting to be made or in progress."""
+        with self._condition:
+            return self._db.execute(
+                "SELECT COUNT(*) FROM pushes WHERE status = 'pending'").fetchone()[0]
+
+    @property
+    def metrics(self):
+        """Dictionary of queue depth, upload counts & throughput in bytes per second."""
+        mean_throughput = None
+        if self._seconds_uploading > 0:
+            mean_throughput = self._bytes_uploaded / self._seconds_uploading
+        return {"queue_depth": self.queue_depth,
+                "in_progress": len(self._in_progress),
+                "n_uploaded": self._n_uploaded,
+                "n_failed": self._n_failed,
+                "bytes_uploaded": self._bytes_uploaded,
+                "mean_throughput": mean_throughput,
+                "last_throughput": self._last_throughput}
+
+    def enqueue(self, filename, filename_ngas):
+        """Add a push to the journal. Returns immediately.
+
+        Args:
+            filename (str): The name of the local file to be pushed.
+            filename_ngas (str): The NGAS filename.
+        """
+        with self._condition:
+            self._db.execute("INSERT INTO pushes (filename, filename_ngas, next_attempt) "
+                             "VALUES (?, ?, ?)", (filename, filename_ngas, time.time()))
+            self._condition.notify()
+        self.start()
+
+    def start(self):
+        """Start the worker threads, if they aren't already running."""
+        with self._condition:
+            self._stopping = False
+            while len(self._workers) < self.max_workers:
+                worker = Thread(target=self._run, name=f"NgasUploader-{len(self._workers)}",
+                                daemon=True)
+                self._workers.append(worker)
+                worker.start()
+
+    def stop(self, timeout=None):
+        """Stop the worker threads once their current pushes are done. The journal is kept."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+            workers, self._workers = self._workers, list()
+        for worker in workers:
+            worker.join(timeout)
+
+    def _next_push(self):
+        """Block until there is a push due, then claim it. Returns None when stopping."""
+        with self._condition:
+            while not self._stopping:
+                exclude = ",".join(str(push_id) for push_id in self._in_progress)
+                row = self._db.execute(
+                    "SELECT id, filename, filename_ngas, attempts, next_attempt FROM pushes "
+                    f"WHERE status = 'pending' AND id NOT IN ({exclude}) "
+                    "ORDER BY next_attempt LIMIT 1").fetchone()
+                if row is None:
+                    self._condition.wait()
+                    continue
+                delay = row[4] - time.time()
+                if delay > 0:
+                    self._condition.wait(delay)
+                    continue
+                self._in_progress.add(row[0])
+                return row[:4]
+
+    def _run(self):
+        while True:
+            push = self._next_push()
+            if push is None:
+                return
+            push_id, filename, filename_ngas, attempts = push
+            try:
+                self._push(filename, filename_ngas)
+            except Exception as err:
+                self._retry(push_id, filename, attempts + 1, err)
+            else:
+                with self._condition:
+                    self._db.execute("DELETE FROM pushes WHERE id = ?", (push_id,))
+            finally:
+                with self._condition:
+                    self._in_progress.discard(push_id)
+
+    def _retry(self, push_id, filename, attempts, err):
+        with self._condition:
+            if attempts >= self.max_attempts:
+                self._n_failed += 1
+                self._db.execute("UPDATE pushes SET status = 'failed', attempts = ?, "
+                                 "last_error = ? WHERE id = ?", (attempts, repr(err), push_id))
+                self.logger.error(f"Giving up NGAS push of {filename} after {attempts}"
+                                  f" attempts: {err!r}")
+                return
+            delay = min(self.min_backoff * 2 ** (attempts - 1), self.max_backoff)
+            self._db.execute("UPDATE pushes SET attempts = ?, next_attempt = ?, last_error = ? "
+                             "WHERE id = ?", (attempts, time.time() + delay, repr(err), push_id))
+        self.logger.warning(f"NGAS push of {filename} failed, retrying in {delay}s: {err!r}")
+
+    def _push(self, filename, filename_ngas):
+        # Images may have been compressed after the push was queued, so the filename is
+        # resolved on each attempt. A missing file is retried like any other failure.
+        if not os.path.exists(filename) and os.path.exists(filename + '.fz'):
+            filename += '.fz'
+            filename_ngas += '.fz'
+
+        url = (f'http://{self.ngas_ip}:{self.port}/QARCHIVE?filename={filename_ngas}'
+               '&ignore_arcfile=1')
+        self.logger.info(f'Pushing {filename} to NGAS as {filename_ngas}: {url}')
+
+        start_time = time.monotonic()
+        with open(filename, 'rb') as f:
+            chunks = _ChecksumChunks(f, self.chunk_size)
+            r = self._session.post(url, data=chunks, timeout=self.timeout)
+        checksum = chunks.checksum
+        size = chunks.size
+        self.logger.debug(f'NGAS response: {r.text}')
+        r.raise_for_status()
+        duration = time.monotonic() - start_time
+
+        # Older NGAS versions report signed CRC32s so compare them as unsigned.
+        checksum_match = checksum_pattern.search(r.text)
+        plugin_match = checksum_plugin_pattern.search(r.text)
+        if checksum_match and plugin_match and plugin_match.group(1) == 'crc32':
+            ngas_checksum = int(checksum_match.group(1)) & 0xffffffff
+            if ngas_checksum != checksum:
+                raise ValueError(f"NGAS checksum {ngas_checksum} of {filename} does not match"
+                                 f" local checksum {checksum}.")
+
+        throughput = size / duration if duration > 0 else None
+        if throughput:
+            self.logger.info(f'Pushed {filename} to NGAS: {size} bytes in {duration:.2f}s'
+                             f' ({throughput / 2**20:.1f} MiB/s), CRC32 {checksum}.')
+        with self._condition:
+            self._n_uploaded += 1
+            self._bytes_uploaded += size
+            self._seconds_uploading += duration
+            self._last_throughput = throughput
+
+
+class _ChecksumChunks(object):
+    """Iterates over the chunks of an open file, updating its CRC32 checksum as they are read.
+
+    Having a length makes requests send a Content-Length header, rather than uploading the file
+    with chunked transfer encoding, as the NGAS server needs the length of archived files.
+    """
+
+    def __init__(self, f, chunk_size):
+        self._file = f
+        self._chunk_size = chunk_size
+        self._length = os.fstat(f.fileno()).st_size - f.tell()
+        self.checksum = 0
+        self.size = 0
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        while True:
+            chunk = self._file.read(self._chunk_size)
+            if not chunk:
+                return
+            self.checksum = zlib.crc32(chunk, self.checksum)
+            self.size += len(chunk)
+            yield chunk
+
+
+def get_ngas_uploader(config, logger=None):
+    """Get the NgasUploader shared by everything in this process, creating it if necessary.
+
+    Args:
+        config (dict): The huntsman config. The NGAS server address is taken from `ngas_ip`,
+            other settings, e.g. `port`, from the optional `ngas` section.
+        logger (logging.Logger, optional): logger to use for messages.
+    """
+    global _uploader
+    with _uploader_lock:
+        if _uploader is None:
+            ngas_config = dict(config.get('ngas', {}))
+            journal = ngas_config.pop('journal', None)
+            if journal is None:
+                journal = os.path.join(config['directories']['data'], 'ngas_journal.sqlite')
+            _uploader = NgasUploader(config['ngas_ip'], journal, logger=logger, **ngas_config)
+            _uploader.start()
+    return _uploader
@@ -0,0 +1,101 @@
+import time
+from threading import Lock
+
+
+class PropertyCache(object):
+    """Client side cache of remote property values, each with its own time to live (TTL).
+
+    Used by the Pyro camera, focuser & filterwheel clients so that repeated reads of slowly
+    changing properties don't each require a network round trip.
+
+    Args:
+        ttls (dict, optional): Dictionary of property name: TTL (in seconds) pairs.
+        default_ttl (float, optional): TTL to use for properties that are not in `ttls`. The
+            default, 0, means that those properties are not cached.
+    """
+
+    def __init__(self, ttls=None, default_ttl=0):
+        self.ttls = dict(ttls) if ttls else dict()
+        self.default_ttl = default_ttl
+        self.hits = 0
+        self.misses = 0
+        self._values = dict()
+        # Incremented on every invalidation so that a fetch which started before an
+        # invalidation doesn't put a stale value back in the cache.
+        self._generation = 0
+        self._lock = Lock()
+
+    @property
+    def stats(self):
+        """Dictionary of hit & miss counts."""
+        return {"hits": self.hits, "misses": self.misses}
+
+    @property
+    def generation(self):
+        """Number of invalidations so far. Pass to `update` to drop values fetched before an
+        invalidation."""
+        with self._lock:
+            return self._generation
+
+    def ttl(self, name):
+        """Time to live for the named property, in seconds."""
+        return self.ttls.get(name, self.default_ttl)
+
+    def get(self, name, fetch):
+        """Get a property value, calling `fetch()` to get it if there is no unexpired value.
+
+        Args:
+            name (str): Name of the property.
+            fetch (callable): Function with no arguments that returns the current value.
+        """
+        with self._lock:
+            try:
+                value, expiry = self._values[name]
+            except KeyError:
+                pass
+            else:
+                if time.monotonic() < expiry:
+                    self.hits += 1
+                    return value
+            self.misses += 1
+            generation = self._generation
+
+        fetch_time = time.monotonic()
+        value = fetch()
+
+        ttl = self.ttl(name)
+        if ttl > 0:
+            with self._lock:
+                if generation == self._generation:
+                    self._values[name] = (value, fetch_time + ttl)
+        return value
+
+    def update(self, values, ttl=0, generation=None):
+        """Put several property values in the cache.
+
+        Args:
+            values (dict): Dictionary of property name: value pairs.
+            ttl (float, optional): Minimum time to live for these values, in seconds. Properties
+                with a longer configured TTL keep that instead.
+            generation (int, optional): The `generation` from before the values were fetched.
+                If the cache has been invalidated since, the values may be stale & are dropped.
+
+        Returns:
+            bool: True if the values were put in the cache.
+        """
+        now = time.monotonic()
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return False
+            for name, value in values.items():
+                self._values[name] = (value, now + max(ttl, self.ttl(name)))
+        return True
+
+    def invalidate(self, *names):
+        """Remove the named properties from the cache, or all properties if none are given."""
+        with self._lock:
+            self._generation += 1
+            if not names:
+                self._values.clear()
+            for name in names:
+                self._values.pop(name, None)
@@ -32,8 +32,10 @@ def run_camera_server(ignore_local=False, unmount_sshfs=True, logger=None, **kwa
     # Load the config file
     config = load_device_config(logger=logger, **kwargs)
 
-    # Mount the SSHFS images directory
-    mountpoint = sshfs.mount_images_dir(logger=logger, config=config)
+    # Mount the SSHFS images directory, unless images are streamed to the control computer
+    mountpoint = None
+    if config.get('image_transfer', {}).get('mode', 'sshfs') == 'sshfs':
+        mountpoint = sshfs.mount_images_dir(logger=logger, config=config)
 
     # Specify address
     host = config.get('host', None)
@@ -68,5 +70,5 @@ def run_camera_server(ignore_local=False, unmount_sshfs=True, logger=None, **kwa
             logger.info('Unregistered from name server')
 
             # Unmount the SSHFS
-            if unmount_sshfs:
+            if mountpoint and unmount_sshfs:
                 sshfs.unmount(mountpoint, logger=logger)
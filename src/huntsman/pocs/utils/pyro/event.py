@@ -1,29 +1,223 @@
-from threading import Event
+import time
+from threading import Event, Lock, Thread
+from warnings import warn
+
+import Pyro4
+
+from huntsman.pocs.utils import get_own_ip
 
 event_types = {"camera",
                "focuser",
                "filterwheel"}
 
+_listener = None
+_listener_lock = Lock()
+
 
 class RemoteEvent(Event):
     """Interface for threading.Events of a remote camera or its subcomponents.
-    
+
     Current supported types are: `camera`, `focuser`, `filterwheel`.
+
+    If an `EventListener` is given the camera server will push every transition of the remote
+    event to it, and the local copy of the event is used for `is_set()` and `wait()`. Otherwise
+    each call to `is_set()` or `wait()` is a remote call to the camera server.
+
+    The camera server drops listeners it can't reach. While the local copy is waiting to be set
+    the registration is checked every `heartbeat_interval` seconds, & renewed if the server has
+    dropped it. If it can't be renewed the event falls back to polling the camera server.
+
+    Args:
+        proxy (Pyro4.Proxy): Proxy for the remote CameraServer.
+        event_type (str): One of the supported event types.
+        listener (EventListener, optional): Listener that receives pushed event transitions.
+        key (str, optional): Key that the camera server uses to identify the event's camera when
+            pushing transitions. Required if `listener` is given.
+        heartbeat_interval (float, optional): Time in seconds between checks of the listener
+            registration, default 10.
     """
-    def __init__(self, proxy, event_type):
+    def __init__(self, proxy, event_type, listener=None, key=None, heartbeat_interval=10):
+        super().__init__()
         self._proxy = proxy
         if event_type not in event_types:
             raise ValueError(f"Event type {event_type} not one of allowed types: {event_types}")
         self._type = event_type
+        self._listener = listener
+        self._key = key
+        self.heartbeat_interval = heartbeat_interval
+        self._heartbeat_time = time.monotonic()
+        self._heartbeat_lock = Lock()
+        # Sequence number of the most recent transition, used to ignore out of order pushes.
+        self._sequence = -1
+        self._sequence_lock = Lock()
+        self._callbacks = list()
+
+        if self._listener is not None:
+            self._listener.add_event(key, self._type, self)
+            self.update(*self._proxy.event_state(self._type))
+
+    @property
+    def is_pushed(self):
+        """True if event transitions are pushed by the camera server."""
+        return self._listener is not None
 
     def set(self):
-        self._proxy.event_set(self._type)
+        self.update(*self._proxy.event_set(self._type))
 
     def clear(self):
-        self._proxy.event_clear(self._type)
+        self.update(*self._proxy.event_clear(self._type))
 
     def is_set(self):
-        return self._proxy.event_is_set(self._type)
+        if self.is_pushed:
+            if super().is_set():
+                return True
+            self._check_listener()
+        if self.is_pushed:
+            return super().is_set()
+        return self._polled(self._proxy.event_is_set(self._type))
 
     def wait(self, timeout=None):
-        return self._proxy.event_wait(self._type, timeout)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.is_pushed:
+            interval = self.heartbeat_interval
+            if deadline is not None:
+                interval = min(interval, max(deadline - time.monotonic(), 0))
+            if super().wait(interval):
+                return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            self._check_listener(force=True)
+        if deadline is not None:
+            timeout = max(deadline - time.monotonic(), 0)
+        return self._polled(self._proxy.event_wait(self._type, timeout))
+
+    def add_callback(self, callback):
+        """Add a function to be called, with no arguments, when the event is next set.
+
+        If the event is already set the function is called immediately. Events that are not
+        pushed by the camera server call the function once `is_set()` or `wait()` finds the
+        event set.
+        """
+        if not self.is_pushed:
+            with self._sequence_lock:
+                self._callbacks.append(callback)
+            self.is_set()
+            return
+        with self._sequence_lock:
+            if not super().is_set():
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def _check_listener(self, force=False):
+        """Check the camera server still pushes to the listener, at most once per heartbeat.
+
+        If the server has dropped the listener it is registered again & the local copy of the
+        event brought up to date. If that fails the event falls back to polling.
+        """
+        with self._heartbeat_lock:
+            now = time.monotonic()
+            if not self.is_pushed or (not force and
+                                      now - self._heartbeat_time < self.heartbeat_interval):
+                return
+            self._heartbeat_time = now
+            try:
+                if self._proxy.is_event_listener_registered(self._listener.uri, self._key):
+                    return
+                warn(f"Camera server dropped the {self._type} event listener, registering again.")
+                self._proxy.register_event_listener(self._listener.uri, self._key)
+                self.update(*self._proxy.event_state(self._type))
+                return
+            except Exception as err:
+                warn(f"Unable to renew {self._type} event listener, falling back to polling: "
+                     f"{err!r}")
+                self._listener = None
+
+        # Callbacks are only run for pushed events, so poll for them in the background instead.
+        with self._sequence_lock:
+            callbacks, self._callbacks = self._callbacks, list()
+        if callbacks:
+            Thread(target=self._run_callbacks, args=(callbacks,), daemon=True).start()
+
+    def _polled(self, is_set):
+        """Run the callbacks if polling the camera server found the event set."""
+        if is_set:
+            with self._sequence_lock:
+                callbacks, self._callbacks = self._callbacks, list()
+            for callback in callbacks:
+                callback()
+        return is_set
+
+    def _run_callbacks(self, callbacks):
+        while not self.wait(self.heartbeat_interval):
+            pass
+        for callback in callbacks:
+            callback()
+
+    def update(self, is_set, sequence, timestamp=None):
+        """Update the local copy of the event with a transition of the remote event.
+
+        Args:
+            is_set (bool): State of the remote event after the transition.
+            sequence (int): Sequence number of the transition.
+            timestamp (float, optional): Time of the transition on the camera server.
+        """
+        callbacks = list()
+        with self._sequence_lock:
+            if sequence <= self._sequence:
+                return
+            self._sequence = sequence
+            if is_set:
+                super().set()
+                callbacks, self._callbacks = self._callbacks, list()
+            else:
+                super().clear()
+        for callback in callbacks:
+            callback()
+
+
+@Pyro4.expose
+class EventListener(object):
+    """Client side callback object that receives event transitions pushed by camera servers."""
+
+    def __init__(self):
+        self.uri = None
+        self._events = dict()
+
+    def add_event(self, key, event_type, event):
+        """Add (or replace) the local RemoteEvent that transitions of a remote event update."""
+        self._events[(key, event_type)] = event
+
+    @Pyro4.oneway
+    def event_changed(self, key, event_type, is_set, sequence, timestamp):
+        """Called by the camera servers when one of their events is set or cleared."""
+        try:
+            event = self._events[(key, event_type)]
+        except KeyError:
+            return
+        event.update(is_set, sequence, timestamp)
+
+
+def get_event_listener(host=None, port=0):
+    """Get the EventListener for this process, starting its Pyro daemon if necessary.
+
+    Args:
+        host (str, optional): hostname or IP address to bind the listener daemon to. This must be
+            reachable from the camera servers. If not given then get_own_ip will be used.
+        port (int, optional): port number to bind the listener daemon to, default 0 which lets
+            Pyro choose a random port.
+
+    Returns:
+        EventListener: The listener, with its URI in the `uri` attribute.
+    """
+    global _listener
+    with _listener_lock:
+        if _listener is None:
+            if not host:
+                host = get_own_ip()
+            daemon = Pyro4.Daemon(host=host, port=port)
+            listener = EventListener()
+            listener.uri = str(daemon.register(listener))
+            Thread(target=daemon.requestLoop, name="EventListener", daemon=True).start()
+            _listener = listener
+    return _listener
@@ -0,0 +1,78 @@
+from threading import Lock, current_thread, local
+
+import Pyro4
+
+
+class ProxyPool(object):
+    """Thread safe stand-in for a Pyro4.Proxy, giving each thread its own proxy.
+
+    Pyro4 proxies should not be shared between threads, so remote calls made through a ProxyPool
+    use a proxy owned by the calling thread, created the first time that thread needs one. This
+    allows e.g. timeout watchers, status polling & commands to use the same remote object at the
+    same time without contention. The proxies of threads that have exited are released the next
+    time a proxy is created.
+
+    Args:
+        uri (str|Pyro4.URI): URI of the remote object.
+    """
+
+    def __init__(self, uri):
+        self._uri = uri
+        self._local = local()
+        self._lock = Lock()
+        self._n_created = 0
+        # Thread: proxy pairs, so the proxies of threads that have exited can be released
+        self._proxies = dict()
+
+    @property
+    def n_created(self):
+        """Number of proxies created by the pool so far."""
+        return self._n_created
+
+    @property
+    def n_open(self):
+        """Number of proxies currently held by the pool."""
+        with self._lock:
+            return len(self._proxies)
+
+    def claim(self):
+        """Get the calling thread's proxy, creating it if necessary."""
+        try:
+            return self._local.proxy
+        except AttributeError:
+            proxy = Pyro4.Proxy(self._uri)
+            # Set sync mode
+            Pyro4.asyncproxy(proxy, asynchronous=False)
+            self._local.proxy = proxy
+            with self._lock:
+                self._n_created += 1
+                self._proxies[current_thread()] = proxy
+                dead_threads = [thread for thread in self._proxies if not thread.is_alive()]
+                dead_proxies = [self._proxies.pop(thread) for thread in dead_threads]
+            for dead_proxy in dead_proxies:
+                dead_proxy._pyroRelease()
+            return proxy
+
+    def release(self):
+        """Release the calling thread's proxy, closing its connection."""
+        proxy = getattr(self._local, "proxy", None)
+        if proxy is not None:
+            del self._local.proxy
+            with self._lock:
+                self._proxies.pop(current_thread(), None)
+            proxy._pyroRelease()
+
+    def release_all(self):
+        """Release the proxies of all threads, closing their connections."""
+        with self._lock:
+            proxies, self._proxies = list(self._proxies.values()), dict()
+        # Threads that claim a proxy again create a new one
+        self._local = local()
+        for proxy in proxies:
+            proxy._pyroRelease()
+
+    def __getattr__(self, name):
+        # Don't recurse if called before __init__ has run, e.g. while unpickling.
+        if name in ("_uri", "_local", "_lock", "_n_created", "_proxies"):
+            raise AttributeError(name)
+        return getattr(self.claim(), name)
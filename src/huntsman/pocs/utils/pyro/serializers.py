@@ -2,14 +2,20 @@
 
 This needs to be done for the server and the client. Currently custom serializers
 included for astropy Quantities and the custom exceptions from POCS (pocs.utils.error).
+
+Scalar Quantities, e.g. exposure times & temperatures, are by far the most common astropy objects
+sent to & from the camera servers so they use a compact (value, unit string) encoding. Other
+astropy objects, e.g. array Quantities or Quantity subclasses, are encoded as YAML.
 """
 import re
 import sys
+from math import isfinite
 
 import Pyro4
 from Pyro4.util import SerializerBase
 from astropy import units as u
 from astropy.io.misc import yaml as ayaml
+import numpy as np
 
 from pocs.utils import error
 
@@ -19,6 +25,11 @@ sys.excepthook = Pyro4.util.excepthook
 # serializers/deserializers
 error_pattern = re.compile(r"error\.(\w+)'>$")
 
+# Unit: unit string pairs, None for units that don't survive a round trip through a string.
+_unit_strings = dict()
+# Unit string: Unit pairs, so that each unit string is only parsed once.
+_units = dict()
+
 
 def panerror_to_dict(obj):
     """Serialiser function for POCS custom exceptions."""
@@ -56,6 +67,54 @@ def dict_to_astropy(class_name, d):
     return ayaml.load(d["yaml_dump"])
 
 
+def _unit_to_string(unit):
+    try:
+        return _unit_strings[unit]
+    except KeyError:
+        pass
+    unit_string = unit.to_string()
+    try:
+        parsed_unit = u.Unit(unit_string)
+    except ValueError:
+        parsed_unit = None
+    if parsed_unit == unit and parsed_unit.to_string() == unit_string:
+        _units[unit_string] = parsed_unit
+    else:
+        unit_string = None
+    _unit_strings[unit] = unit_string
+    return unit_string
+
+
+def _string_to_unit(unit_string):
+    try:
+        return _units[unit_string]
+    except KeyError:
+        unit = u.Unit(unit_string)
+        _units[unit_string] = unit
+        return unit
+
+
+def quantity_to_dict(obj):
+    """Serializer function for Quantities.
+
+    Finite, scalar, double precision Quantities are encoded as a value & a unit string. Anything
+    else is passed to astropy_to_dict().
+    """
+    if type(obj) is u.Quantity and obj.isscalar and obj.dtype == np.float64:
+        value = obj.value.item()
+        unit_string = _unit_to_string(obj.unit)
+        if unit_string is not None and isfinite(value):
+            return {"__class__": "astropy_quantity",
+                    "value": value,
+                    "unit": unit_string}
+    return astropy_to_dict(obj)
+
+
+def dict_to_quantity(class_name, d):
+    """De-serialiser function for Quantities encoded by quantity_to_dict()."""
+    return u.Quantity(d["value"], _string_to_unit(d["unit"]))
+
+
 def value_error_to_dict(obj):
     """Serialiser function for ValueError."""
     return {"__class__": "ValueError",
@@ -67,7 +126,8 @@ def dict_to_value_error(class_name, d):
     return ValueError(*d["args"])
 
 
-SerializerBase.register_class_to_dict(u.Quantity, astropy_to_dict)
+SerializerBase.register_class_to_dict(u.Quantity, quantity_to_dict)
+SerializerBase.register_dict_to_class("astropy_quantity", dict_to_quantity)
 SerializerBase.register_dict_to_class("astropy_yaml", dict_to_astropy)
 
 SerializerBase.register_class_to_dict(error.PanError, panerror_to_dict)
@@ -0,0 +1,116 @@
+import heapq
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from threading import Condition, Lock, Thread
+
+from pocs.utils import logger as logger_module
+
+_scheduler = None
+_scheduler_lock = Lock()
+
+
+class TimeoutScheduler(object):
+    """Calls functions when their deadlines expire, using a single thread for all deadlines.
+
+    This replaces a `threading.Timer`, and therefore an OS thread, per deadline. Deadlines are
+    kept in a heap. Cancelled deadlines are discarded when they reach the top of the heap.
+
+    Functions are handed from the scheduler thread to a small pool of worker threads, so one
+    that blocks, e.g. on a remote call, doesn't delay the other deadlines. Exceptions that they
+    raise are logged.
+
+    Args:
+        max_workers (int, optional): Number of threads that functions are called on, default 4.
+        logger (logging.Logger, optional): logger to use for messages, if not given will
+            use the root logger.
+    """
+
+    def __init__(self, max_workers=4, logger=None):
+        if not logger:
+            logger = logger_module.get_root_logger()
+        self.logger = logger
+        self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                            thread_name_prefix="TimeoutCallback")
+        self._heap = list()
+        self._pending = dict()
+        self._handles = itertools.count()
+        self._condition = Condition()
+        self._thread = None
+
+    @property
+    def n_pending(self):
+        """Number of outstanding deadlines."""
+        with self._condition:
+            return len(self._pending)
+
+    def schedule(self, delay, function, *args, **kwargs):
+        """Call a function after a delay.
+
+        Args:
+            delay (float): Delay in seconds.
+            function (callable): Function to call.
+            *args, **kwargs: Arguments for the function.
+
+        Returns:
+            int: Handle that can be used to cancel the call.
+        """
+        handle = next(self._handles)
+        with self._condition:
+            heapq.heappush(self._heap, (time.monotonic() + delay, handle))
+            self._pending[handle] = (function, args, kwargs)
+            if self._thread is None:
+                self._thread = Thread(target=self._run, name="TimeoutScheduler", daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        return handle
+
+    def cancel(self, handle):
+        """Cancel a scheduled call.
+
+        Args:
+            handle (int): Handle returned by `schedule`.
+
+        Returns:
+            bool: True if the call was cancelled, False if it had already been made or cancelled.
+        """
+        with self._condition:
+            cancelled = self._pending.pop(handle, None) is not None
+            # Don't let cancelled deadlines accumulate in the heap.
+            if len(self._heap) > 2 * len(self._pending) + 100:
+                self._heap = [item for item in self._heap if item[1] in self._pending]
+                heapq.heapify(self._heap)
+        return cancelled
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    while self._heap and self._heap[0][1] not in self._pending:
+                        heapq.heappop(self._heap)
+                    if not self._heap:
+                        self._condition.wait()
+                        continue
+                    deadline, handle = self._heap[0]
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        heapq.heappop(self._heap)
+                        function, args, kwargs = self._pending.pop(handle)
+                        break
+                    self._condition.wait(remaining)
+            self._executor.submit(self._call, function, args, kwargs)
+
+    def _call(self, function, args, kwargs):
+        try:
+            function(*args, **kwargs)
+        except Exception as err:
+            self.logger.error(f"{function} raised an exception on timeout: {err!r}")
+
+
+def get_timeout_scheduler():
+    """Get the TimeoutScheduler shared by everything in this process."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = TimeoutScheduler()
+    return _scheduler
@@ -0,0 +1,212 @@
+"""Streaming of image files from the camera servers to the control computer.
+
+This is an alternative to writing the images directly to the control computer's images
+directory over SSHFS. The camera server writes each image to its local disk, then streams it
+over a plain TCP connection to an `ImageReceiver` running on the control computer.
+
+Each file is sent over its own connection as a single line JSON header, containing the path of
+the file relative to the images directory and its size in bytes, followed by the file contents.
+The receiver replies with a single line JSON status message.
+"""
+import os
+import json
+import time
+import socket
+import socketserver
+from threading import Thread
+
+from huntsman.pocs.utils import load_config, DummyLogger
+from huntsman.pocs.utils.config import query_config_server
+
+DEFAULT_PORT = 6570
+DEFAULT_CHUNK_SIZE = 2 ** 20
+
+
+class _ImageRequestHandler(socketserver.BaseRequestHandler):
+
+    def handle(self):
+        receiver = self.server.receiver
+        try:
+            header = json.loads(self._readline())
+            result = receiver.receive(self.request, header["path"], header["size"])
+            reply = {"status": "ok", **result}
+        except Exception as err:
+            receiver.logger.error(f"Error receiving image from {self.client_address}: {err!r}")
+            reply = {"status": "error", "message": str(err)}
+        self.request.sendall(json.dumps(reply).encode() + b"\n")
+
+    def _readline(self):
+        # Read byte by byte so that none of the file contents are consumed with the header.
+        line = bytearray()
+        while not line.endswith(b"\n"):
+            byte = self.request.recv(1)
+            if not byte:
+                raise ConnectionError("Connection closed while reading header.")
+            line += byte
+        return line.decode()
+
+
+class _ImageServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class ImageReceiver(object):
+    """Receives image files streamed from the camera servers.
+
+    Args:
+        images_dir (str): Directory that received files are written to. The paths sent by the
+            camera servers are relative to this directory.
+        host (str, optional): hostname or IP address to bind to, default all interfaces.
+        port (int, optional): port number to bind to, default 6570. Use 0 for a random port.
+        chunk_size (int, optional): size in bytes of the chunks the files are received in.
+        logger (logging.Logger, optional): logger to use for messages.
+    """
+
+    def __init__(self, images_dir, host='', port=DEFAULT_PORT, chunk_size=DEFAULT_CHUNK_SIZE,
+                 logger=None):
+        if logger is None:
+            logger = DummyLogger()
+        self.logger = logger
+        self.images_dir = os.path.abspath(images_dir)
+        self.chunk_size = chunk_size
+        self._server = _ImageServer((host, port), _ImageRequestHandler)
+        self._server.receiver = self
+        self._thread = None
+
+    @property
+    def address(self):
+        """(host, port) tuple that the receiver is bound to."""
+        return self._server.server_address
+
+    def start(self):
+        """Start receiving in a background thread."""
+        self._thread = Thread(target=self._server.serve_forever, name="ImageReceiver",
+                              daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def receive(self, sock, path, size):
+        """Receive a file from a socket & write it to the images directory.
+
+        The file is written to a temporary file, synced to disk & then renamed so that a partial
+        file is never visible under the final name.
+
+        Args:
+            sock (socket.socket): Socket to read the file contents from.
+            path (str): Path of the file, relative to the images directory.
+            size (int): Size of the file in bytes.
+
+        Returns:
+            dict: The number of bytes received, time taken & throughput in bytes per second.
+        """
+        filename = os.path.abspath(os.path.join(self.images_dir, path))
+        if os.path.commonpath([filename, self.images_dir]) != self.images_dir:
+            raise ValueError(f"Path {path} is outside the images directory.")
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+
+        start_time = time.monotonic()
+        buffer = memoryview(bytearray(self.chunk_size))
+        remaining = size
+        temp_filename = filename + '.part'
+        with open(temp_filename, 'wb') as f:
+            while remaining > 0:
+                n_bytes = sock.recv_into(buffer, min(remaining, self.chunk_size))
+                if n_bytes == 0:
+                    raise ConnectionError(f"Connection closed with {remaining} bytes remaining.")
+                f.write(buffer[:n_bytes])
+                remaining -= n_bytes
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_filename, filename)
+
+        duration = time.monotonic() - start_time
+        throughput = size / duration if duration > 0 else float('inf')
+        self.logger.info(f"Received {filename}: {size} bytes in {duration:.2f}s"
+                         f" ({throughput / 2**20:.1f} MiB/s).")
+        return {"bytes": size, "seconds": duration, "throughput": throughput}
+
+
+def send_file(filename, host, port=DEFAULT_PORT, images_dir=None, timeout=60, logger=None):
+    """Stream a file to an ImageReceiver.
+
+    Args:
+        filename (str): Name of the local file to send.
+        host (str): hostname or IP address of the receiver.
+        port (int, optional): port number of the receiver, default 6570.
+        images_dir (str, optional): Local images directory. The file will be written to the
+            same path relative to the receiver's images directory. If not given only the base
+            name of the file is used.
+        timeout (float, optional): Socket timeout in seconds, default 60.
+        logger (logging.Logger, optional): logger to use for messages.
+
+    Returns:
+        dict: The number of bytes sent, time taken & throughput in bytes per second.
+    """
+    if logger is None:
+        logger = DummyLogger()
+
+    if images_dir is None:
+        path = os.path.basename(filename)
+    else:
+        path = os.path.relpath(filename, images_dir)
+        if path.startswith(os.pardir):
+            raise ValueError(f"{filename} is not in the images directory {images_dir}.")
+    size = os.path.getsize(filename)
+
+    start_time = time.monotonic()
+    with socket.create_connection((host, port), timeout=timeout) as sock:
+        header = json.dumps({"path": path, "size": size}).encode() + b"\n"
+        sock.sendall(header)
+        with open(filename, 'rb') as f:
+            sock.sendfile(f)
+        with sock.makefile('rb') as reply_file:
+            reply = json.loads(reply_file.readline())
+    duration = time.monotonic() - start_time
+
+    if reply.get("status") != "ok":
+        raise RuntimeError(f"Failed to transfer {filename}: {reply.get('message')}")
+
+    throughput = size / duration if duration > 0 else float('inf')
+    logger.info(f"Sent {filename} to {host}:{port}: {size} bytes in {duration:.2f}s"
+                f" ({throughput / 2**20:.1f} MiB/s).")
+    return {"bytes": size, "seconds": duration, "throughput": throughput}
+
+
+def run_image_receiver(images_dir=None, host='', port=None, logger=None):
+    """
+    Runs an image receiver.
+
+    The image receiver should be run on the control computer if any of the camera servers use the
+    `stream` image transfer mode. It should be started before the camera servers.
+
+    Args:
+        images_dir (str, optional): Directory to write the images to. If not given the
+            `directories.images` entry of the huntsman config is used.
+        host (str, optional): hostname or IP address to bind to, default all interfaces.
+        port (int, optional): port number to bind to. If not given the `image_receiver_port`
+            entry of the `control` config is used, or 6570 if there isn't one.
+    """
+    if logger is None:
+        logger = DummyLogger()
+
+    if images_dir is None:
+        images_dir = load_config()['directories']['images']
+    if port is None:
+        control_config = query_config_server(key='control', logger=logger)
+        port = control_config.get('image_receiver_port', DEFAULT_PORT)
+
+    receiver = ImageReceiver(images_dir, host=host, port=port, logger=logger)
+    logger.info(f'Receiving images into {images_dir} on port {port}...'
+                ' (Control-C/Command-C to exit)')
+    try:
+        receiver.serve_forever()
+    finally:
+        logger.info('\nShutting down...')
+        receiver.stop()
@@ -0,0 +1,150 @@
+import os
+import json
+from collections import defaultdict, deque
+from threading import Lock
+
+import numpy as np
+from astropy import units as u
+
+from pocs.utils import logger as logger_module
+
+
+class TwilightModel(object):
+    """Model of the twilight sky brightness, used to predict flat field exposure times.
+
+    The log of the count rate is modelled as a linear function of the altitude of the sun,
+    separately for each camera & filter. The model is fitted to the most recent measurements from
+    the current session. The fitted coefficients are saved to a JSON file so they can be used
+    until there are enough measurements to fit in later sessions, with the intercept matched to
+    the latest measurement if there is one.
+
+    Args:
+        observer (astroplan.Observer): Observer used to calculate the altitude of the sun.
+        filename (str, optional): JSON file the coefficients are saved to & loaded from. If not
+            given the coefficients are not saved.
+        max_points (int, optional): Maximum number of recent measurements to fit, default 10.
+        min_alt_range (float, optional): Minimum range in sun altitude, in degrees, of the
+            measurements before the slope is fitted, default 0.05.
+        logger (logging.Logger, optional): logger to use for messages, if not given will
+            use the root logger.
+    """
+
+    def __init__(self, observer, filename=None, max_points=10, min_alt_range=0.05, logger=None):
+        if not logger:
+            logger = logger_module.get_root_logger()
+        self.logger = logger
+        self.observer = observer
+        self.filename = filename
+        self.min_alt_range = min_alt_range
+        self._measurements = defaultdict(lambda: deque(maxlen=max_points))
+        # Coefficients loaded from the file & fitted in this session
+        self._coefficients = dict()
+        self._fitted = dict()
+        self._lock = Lock()
+
+        if filename is not None and os.path.exists(filename):
+            try:
+                with open(filename) as f:
+                    self._coefficients = {key: (value["intercept"], value["slope"])
+                                          for key, value in json.load(f).items()}
+            except Exception as err:
+                self.logger.warning(f"Unable to load twilight model from {filename}: {err!r}")
+
+    def sun_altitude(self, time):
+        """Altitude of the sun in degrees at the given time."""
+        return self.observer.sun_altaz(time).alt.to_value(u.deg)
+
+    def add_measurement(self, camera_name, filter_name, time, count_rate):
+        """Add a measurement of the sky brightness & refit the model.
+
+        Args:
+            camera_name (str): Name of the camera.
+            filter_name (str): Name of the filter.
+            time (astropy.time.Time): Time of the middle of the exposure.
+            count_rate (float): Bias subtracted counts per second.
+        """
+        if count_rate <= 0:
+            return
+        key = self._key(camera_name, filter_name)
+        with self._lock:
+            self._measurements[key].append((self.sun_altitude(time), np.log(count_rate)))
+            coefficients = self._fit(key)
+            if coefficients is not None:
+                self._fitted[key] = coefficients
+
+    def coefficients(self, camera_name, filter_name):
+        """Intercept & slope of the model for a camera & filter, or None if there isn't one."""
+        key = self._key(camera_name, filter_name)
+        with self._lock:
+            if key in self._fitted:
+                return self._fitted[key]
+            coefficients = self._coefficients.get(key)
+            measurements = self._measurements.get(key)
+            # Until there is a fit use the saved slope, matched to the latest measurement.
+            if coefficients is not None and measurements:
+                alt, log_rate = measurements[-1]
+                slope = coefficients[1]
+                coefficients = (log_rate - slope * alt, slope)
+            return coefficients
+
+    def predict_exptime(self, camera_name, filter_name, target_counts, start_time,
+                        n_iterations=3):
+        """Predict the exposure time giving the target counts for an exposure starting at a time.
+
+        The count rate is evaluated at the middle of the exposure, so the prediction is iterated.
+
+        Args:
+            camera_name (str): Name of the camera.
+            filter_name (str): Name of the filter.
+            target_counts (float): Target bias subtracted counts.
+            start_time (astropy.time.Time): Expected start time of the exposure.
+            n_iterations (int, optional): Number of iterations, default 3.
+
+        Returns:
+            astropy.units.Quantity: The exposure time, or None if there is no model for the camera
+                & filter.
+        """
+        coefficients = self.coefficients(camera_name, filter_name)
+        if coefficients is None:
+            return None
+        intercept, slope = coefficients
+
+        exptime = 0 * u.second
+        for _ in range(n_iterations):
+            alt = self.sun_altitude(start_time + exptime / 2)
+            exptime = target_counts / np.exp(intercept + slope * alt) * u.second
+        return exptime
+
+    def save(self):
+        """Save the coefficients to the JSON file."""
+        if self.filename is None:
+            return
+        with self._lock:
+            self._coefficients.update(self._fitted)
+            coefficients = {key: {"intercept": intercept, "slope": slope}
+                            for key, (intercept, slope) in self._coefficients.items()}
+        try:
+            os.makedirs(os.path.dirname(os.path.abspath(self.filename)), exist_ok=True)
+            with open(self.filename, 'w') as f:
+                json.dump(coefficients, f, indent=2)
+        except Exception as err:
+            self.logger.warning(f"Unable to save twilight model to {self.filename}: {err!r}")
+
+    def _fit(self, key):
+        measurements = self._measurements[key]
+        if len(measurements) < 2:
+            return None
+        alts, log_rates = np.array(measurements).T
+        if alts.max() - alts.min() < self.min_alt_range:
+            return None
+        slope, intercept = np.polyfit(alts, log_rates, 1)
+        # The sky gets brighter as the sun rises, anything else is noise.
+        if slope <= 0:
+            return None
+        self.logger.debug(f"Twilight model for {key}: log(rate) = {intercept:.3f}"
+                          f" + {slope:.3f} * sun altitude.")
+        return float(intercept), float(slope)
+
+    @staticmethod
+    def _key(camera_name, filter_name):
+        return f"{camera_name}/{filter_name}"
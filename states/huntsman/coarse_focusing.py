@@ -16,8 +16,11 @@ def on_enter(event_data):
     # Do the autofocusing
     pocs.say("Coarse focusing all cameras.")
     autofocus_events = pocs.observatory.autofocus_cameras(coarse=True)
+    for cam_name, event in autofocus_events.items():
+        pocs.observatory.efficiency.track_event(event, cam_name, category='focusing')
     pocs.logger.debug("Waiting for coarse focus to finish.")
-    pocs.wait_for_events(list(autofocus_events.values()), coarse_focus_timeout)
+    with pocs.observatory.efficiency.timing('waiting'):
+        pocs.wait_for_events(list(autofocus_events.values()), coarse_focus_timeout)
 
     # Morning and not dark enough for observing...
     if pocs.observatory.past_midnight and not pocs.is_dark(horizon='observe'):
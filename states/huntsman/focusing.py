@@ -1,4 +1,6 @@
-from time import sleep
+from time import monotonic
+
+from huntsman.pocs.utils.events import wait_for_all
 
 wait_interval = 15.
 
@@ -15,14 +17,14 @@ def on_enter(event_data):
     try:
         pocs.say("Let's focus the cameras!")
         camera_events = pocs.observatory.autofocus_cameras()
-
-        wait_time = 0.
-        while not all([event.is_set() for event in camera_events.values()]):
-            pocs.logger.debug('Waiting for images: {} seconds'.format(wait_time))
-            pocs.status()
-
-            sleep(wait_interval)
-            wait_time += wait_interval
+        for cam_name, event in camera_events.items():
+            pocs.observatory.efficiency.track_event(event, cam_name, category='focusing')
+
+        start_time = monotonic()
+        pocs.logger.debug('Waiting for focusing.')
+        wait_for_all(camera_events, heartbeat=pocs.status, heartbeat_interval=wait_interval)
+        pocs.observatory.efficiency.record('waiting', monotonic() - start_time)
+        pocs.logger.debug('Focusing finished after {:.3f} seconds'.format(monotonic() - start_time))
 
         pocs.next_state = 'observing'
 
@@ -7,6 +7,13 @@ def on_enter(event_data):
 
     pocs.say("Recording all the data for the night (not really yet! TODO!!!).")
 
+    # Report where the time went tonight & start accounting for the next night
+    try:
+        pocs.observatory.efficiency.save()
+        pocs.observatory.efficiency.reset()
+    except Exception as e:
+        pocs.logger.warning('Problem with efficiency report: {}'.format(e))
+
     # Cleanup existing observations
     try:
         pocs.observatory.cleanup_observations()
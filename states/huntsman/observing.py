@@ -1,5 +1,11 @@
+from time import monotonic
+
+from astropy import units as u
+
 from pocs.utils import error
-from time import sleep
+from pocs.utils import get_quantity_value
+
+from huntsman.pocs.utils.events import wait_for_all
 
 wait_interval = 15.
 
@@ -13,14 +19,15 @@ def on_enter(event_data):
     try:
         # Start the observing
         camera_events = pocs.observatory.observe()
-
-        wait_time = 0.
-        while not all([event.is_set() for event in camera_events.values()]):
-            pocs.logger.debug('Waiting for images: {} seconds'.format(wait_time))
-            pocs.status()
-
-            sleep(wait_interval)
-            wait_time += wait_interval
+        exptime = get_quantity_value(pocs.observatory.current_observation.exptime, u.second)
+        for cam_name, event in camera_events.items():
+            pocs.observatory.efficiency.track_event(event, cam_name, exptime=exptime)
+
+        start_time = monotonic()
+        pocs.logger.debug('Waiting for images.')
+        wait_for_all(camera_events, heartbeat=pocs.status, heartbeat_interval=wait_interval)
+        pocs.observatory.efficiency.record('waiting', monotonic() - start_time)
+        pocs.logger.debug('Images finished after {:.3f} seconds'.format(monotonic() - start_time))
 
     except error.Timeout:
         pocs.logger.warning("Timeout while waiting for images. Something wrong with camera, going to park.")
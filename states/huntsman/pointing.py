@@ -1,10 +1,25 @@
-from time import sleep
+from functools import partial
+from time import monotonic
 
-from pocs.images import Image
+from huntsman.pocs.utils.events import wait_for_all
 
 wait_interval = 3.
 
 
+def log_pointing(pocs, pointing_path, solve_future):
+    """Log the result of plate solving the pointing image."""
+    if solve_future.cancelled():
+        return
+    try:
+        solve_info = solve_future.result()
+    except Exception as e:
+        pocs.logger.warning("Problem solving pointing image {}: {}".format(pointing_path, e))
+        return
+    pocs.logger.debug("Pointing file: {}".format(pointing_path))
+    pocs.logger.debug("Pointing Coords: {}".format(solve_info['pointing']))
+    pocs.logger.debug("Pointing Error: {}".format(solve_info['pointing_error']))
+
+
 def on_enter(event_data):
     """Pointing State
 
@@ -28,27 +43,25 @@ def on_enter(event_data):
         # Take pointing picture and wait for result
         camera_event = primary_camera.take_observation(
             observation, fits_headers, exptime=30., filename='pointing')
+        pocs.observatory.efficiency.track_event(camera_event, primary_camera.name, exptime=30.)
 
-        wait_time = 0.
-        while not camera_event.is_set():
-            pocs.logger.debug('Waiting for pointing image: {} seconds'.format(wait_time))
-            pocs.status()
-
-            sleep(wait_interval)
-            wait_time += wait_interval
+        start_time = monotonic()
+        pocs.logger.debug('Waiting for pointing image.')
+        wait_for_all([camera_event], heartbeat=pocs.status, heartbeat_interval=wait_interval)
+        pocs.observatory.efficiency.record('waiting', monotonic() - start_time)
+        pocs.logger.debug('Pointing image finished after {:.3f} seconds'.format(
+            monotonic() - start_time))
 
         # WARNING!! Need to do better error checking here to make sure
         # the "current" observation is actually the current observation
         pointing_metadata = pocs.db.get_current('observations')
-        pointing_image = Image(pointing_metadata['data']['file_path'])
-        pointing_image.solve_field()
-
-        pocs.logger.debug("Pointing file: {}".format(pointing_image))
+        pointing_path = pointing_metadata['data']['file_path']
 
-        pocs.say("Ok, I've got the pointing picture, let's see how close we are.")
+        # Plate solve in a worker process, the result is logged when it is ready.
+        solve_future = pocs.observatory.analysis.solve(pointing_path, key=observation)
+        solve_future.add_done_callback(partial(log_pointing, pocs, pointing_path))
 
-        pocs.logger.debug("Pointing Coords: {}".format(pointing_image.pointing))
-        pocs.logger.debug("Pointing Error: {}".format(pointing_image.pointing_error))
+        pocs.say("Ok, I've got the pointing picture, I'll see how close we are while we carry on.")
 
         pocs.next_state = 'tracking'
 
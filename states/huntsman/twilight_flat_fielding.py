@@ -3,20 +3,39 @@ State to handle the taking of calibration frames (evening and morning).
 """
 from functools import partial
 
+from pocs.utils import current_time
+
 
 def wait_for_twilight(pocs):
     '''
-    Wait for twilight. Temporary solution until something better is found.
+    Wait for twilight.
 
-    Twilight when Sun between flat and focus horizons.
+    Twilight when Sun between flat and focus horizons. In the evening sleeps until the Sun sets
+    below the flat horizon, in the morning until it rises above the focus horizon, waking at
+    least every `_safe_delay` seconds to check it is still safe.
     '''
     pocs.logger.debug('Waiting for twilight...')
-    while pocs.is_safe(horizon='flat'):
-        if pocs.is_dark(horizon='focus'):
-            pocs.sleep(delay=pocs._safe_delay)
-        else:
+    while True:
+        if not pocs.is_dark(horizon='flat'):
+            # Too light for flats. In the morning twilight has already finished.
+            if pocs.observatory.past_midnight or not pocs.is_weather_safe():
+                return False
+            horizon = 'flat'
+        elif not pocs.is_safe(horizon='flat'):
+            return False
+        elif not pocs.is_dark(horizon='focus'):
             return True
-    return False
+        else:
+            horizon = 'focus'
+        delay = pocs._safe_delay
+        crossing = pocs.observatory.ephemeris.next_crossing(
+            pocs.config['location'][f'{horizon}_horizon'])
+        if crossing is not None:
+            time_to_twilight = max(crossing - current_time().unix, 0)
+            pocs.logger.debug(f'Twilight starts in {time_to_twilight:.0f} seconds, when the Sun'
+                              f' crosses the {horizon} horizon.')
+            delay = min(time_to_twilight, delay)
+        pocs.sleep(delay=delay)
 
 
 def safety_func(pocs):